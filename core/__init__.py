@@ -1,3 +1,11 @@
-from .evm_core import EulerianVideoMagnification
+from .cancellation import CancellationToken, ProcessingCancelled
 
-__all__ = ['EulerianVideoMagnification']
\ No newline at end of file
+__all__ = ['EulerianVideoMagnification', 'CancellationToken', 'ProcessingCancelled']
+
+
+def __getattr__(name):
+    # 延迟导入处理器（cv2/numpy），使轻量模块和命令行帮助不承担其导入开销
+    if name == 'EulerianVideoMagnification':
+        from .evm_core import EulerianVideoMagnification
+        return EulerianVideoMagnification
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Batch Rendering
+批量渲染 - 从JSON/CSV清单或通配符读取任务，在进程池中并行处理并写出汇总报告
+
+用法:
+  evm batch jobs.json -o renders/ --memory-budget 8192
+  evm batch "clips/*.mp4" -o renders/ -m color -a 50 --retries 2
+"""
+
+import argparse
+import contextlib
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, asdict, fields
+from datetime import datetime
+
+
+# 每个工作进程至少分配的内存预算
+MIN_WORKER_BUDGET_BYTES = 512 * 1024 * 1024
+
+
+@dataclass
+class BatchJob:
+    """单个渲染任务（字段与命令行参数对应）"""
+    input: str
+    output: str = None
+    mode: str = 'motion'
+    freq_low: float = 0.4
+    freq_high: float = 3.0
+    amplification: float = 10.0
+    levels: int = 4
+    skip_levels: int = 2
+    blend: float = 1.0
+    max_frames: int = None
+    keep_audio: bool = False
+    output_format: str = 'mp4'
+    strategy: str = None
+    decimation: str = 'auto'
+    temporal_filter: str = 'auto'
+    split_scenes: bool = True
+    luma_only: bool = False
+    roi: str = None
+
+    @classmethod
+    def from_dict(cls, data, defaults=None):
+        """从清单中的一行构造任务，未知列会被拒绝，空值使用默认值"""
+        merged = dict(defaults or {})
+        merged.update({key: value for key, value in data.items() if value not in (None, '')})
+        known = {f.name: f for f in fields(cls)}
+        unknown = set(merged) - set(known)
+        if unknown:
+            raise ValueError(f"清单包含未知字段: {', '.join(sorted(unknown))}")
+        if 'input' not in merged:
+            raise ValueError("清单中的任务缺少input字段")
+
+        for name, value in list(merged.items()):
+            default = known[name].default
+            if isinstance(value, str) and name not in ('input', 'output', 'mode', 'output_format', 'strategy',
+                                                           'decimation', 'temporal_filter', 'roi'):
+                if isinstance(default, bool):
+                    merged[name] = value.strip().lower() in ('1', 'true', 'yes', 'y')
+                elif isinstance(default, int) or name == 'max_frames':
+                    merged[name] = int(value)
+                else:
+                    merged[name] = float(value)
+        return cls(**merged)
+
+
+def load_manifest(path, defaults=None):
+    """读取任务清单
+
+    JSON: 任务列表，或 {"defaults": {...}, "jobs": [...]}
+    CSV:  首行为字段名（至少包含input列）
+    相对路径的input/output相对于清单所在目录。
+    """
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = dict(defaults or {})
+
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            defaults.update(data.get('defaults', {}))
+            rows = data.get('jobs', [])
+        else:
+            rows = data
+
+    jobs = []
+    for row in rows:
+        job = BatchJob.from_dict(row, defaults)
+        job.input = os.path.join(base_dir, job.input)
+        if job.output:
+            job.output = os.path.join(base_dir, job.output)
+        # ROI掩码图像路径同样相对于清单目录（x,y,w,h形式保持不变）
+        if job.roi and os.path.exists(os.path.join(base_dir, job.roi)):
+            job.roi = os.path.join(base_dir, job.roi)
+        jobs.append(job)
+    return jobs
+
+
+def jobs_from_glob(patterns, defaults=None):
+    """由通配符匹配的输入文件生成任务（所有任务共用同一组参数）"""
+    paths = []
+    for pattern in patterns:
+        matched = sorted(glob.glob(pattern))
+        if not matched and os.path.isfile(pattern):
+            matched = [pattern]
+        paths.extend(path for path in matched if path not in paths)
+    return [BatchJob.from_dict({'input': path}, defaults) for path in paths]
+
+
+def assign_outputs(jobs, output_dir):
+    """为未指定输出的任务生成输出路径（<output_dir>/<输入文件名>.mp4）
+
+    不同目录下的同名输入（a/clip.mp4、b/clip.mp4）不会互相覆盖：重名时加上所在目录名前缀
+    （b_clip.mp4），仍重名时再加序号（b_clip_2.mp4）。显式指定的输出互相重复时报错。
+    """
+    def key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    taken = set()
+    for job in jobs:
+        if job.output:
+            if key(job.output) in taken:
+                raise ValueError(f"多个任务的输出路径相同: {job.output}")
+            taken.add(key(job.output))
+
+    for job in jobs:
+        if not job.output:
+            stem = os.path.splitext(os.path.basename(job.input))[0]
+            output = os.path.join(output_dir, f"{stem}.mp4")
+            if key(output) in taken:
+                parent = os.path.basename(os.path.dirname(os.path.abspath(job.input)))
+                stem = f"{parent}_{stem}" if parent else stem
+                output = os.path.join(output_dir, f"{stem}.mp4")
+            index = 2
+            while key(output) in taken:
+                output = os.path.join(output_dir, f"{stem}_{index}.mp4")
+                index += 1
+            job.output = output
+            taken.add(key(output))
+    return jobs
+
+
+def worker_count(num_jobs, memory_budget_bytes, max_workers=None):
+    """进程数：不超过CPU核数和任务数，且每个进程至少分到MIN_WORKER_BUDGET_BYTES内存"""
+    cores = os.cpu_count() or 1
+    by_memory = max(1, int(memory_budget_bytes // MIN_WORKER_BUDGET_BYTES))
+    return max(1, min(cores, num_jobs, by_memory, max_workers or cores))
+
+
+def render_job(job, memory_budget_bytes=None, cancel_token=None, progress_listener=None):
+    """按任务参数规划并渲染，返回 (evm, plan, 输出路径)（批量渲染和渲染服务共用）"""
+    from .evm_core import EulerianVideoMagnification
+    from .roi import resolve_roi
+
+    os.makedirs(os.path.dirname(os.path.abspath(job.output)), exist_ok=True)
+    evm = EulerianVideoMagnification(job.input, job.output, cancel_token=cancel_token,
+                                     progress_listener=progress_listener, keep_output_name=True)
+    evm.get_video_info()
+    roi = resolve_roi(job.roi, evm, job.freq_low, job.freq_high)
+    plan = evm.plan_execution(job.mode, job.freq_low, job.levels, job.skip_levels,
+                              max_frames=job.max_frames, memory_budget_bytes=memory_budget_bytes,
+                              strategy=job.strategy, freq_high=job.freq_high,
+                              decimation=job.decimation, temporal_filter=job.temporal_filter, roi=roi)
+    output_path = evm.render(
+        mode=job.mode,
+        freq_low=job.freq_low,
+        freq_high=job.freq_high,
+        amplification=job.amplification,
+        levels=job.levels,
+        skip_levels_at_top=job.skip_levels,
+        blend=job.blend,
+        audio_source=job.input if job.keep_audio else None,
+        output_format=job.output_format,
+        plan=plan,
+        split_scenes=job.split_scenes,
+        luma_only=job.luma_only,
+        roi=roi
+    )
+    return evm, plan, output_path
+
+
+def run_job(job, memory_budget_bytes=None, log_path=None):
+    """在当前进程中渲染一个任务，返回结果字典（在工作进程中调用）"""
+    start = time.perf_counter()
+    result = {'input': job.input, 'pid': os.getpid()}
+
+    log = open(log_path, 'a', encoding='utf-8') if log_path else open(os.devnull, 'w')
+    try:
+        with log, contextlib.redirect_stdout(log):
+            evm, plan, output_path = render_job(job, memory_budget_bytes)
+        result.update({
+            'status': 'ok',
+            'output': output_path,
+            'strategy': plan.strategy,
+            'frames': plan.frames,
+            'resolution': [evm.width, evm.height],
+            'predicted_peak_mb': round(plan.predicted_peak_mb, 1),
+        })
+    except Exception as e:
+        result.update({'status': 'failed', 'error': f"{type(e).__name__}: {e}"})
+    result['wall_time'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def _log_path(log_dir, index, job):
+    if not log_dir:
+        return None
+    stem = os.path.splitext(os.path.basename(job.input))[0]
+    return os.path.join(log_dir, f"{index:04d}_{stem}.log")
+
+
+def run_batch(jobs, memory_budget_bytes=None, max_workers=None, retries=1, log_dir=None,
+              report_path=None):
+    """在进程池中运行所有任务，失败的任务最多重试retries次，返回汇总报告"""
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from . import planner
+
+    if memory_budget_bytes is None:
+        memory_budget_bytes = planner.available_memory_bytes() * planner.DEFAULT_MEMORY_FRACTION
+    workers = worker_count(len(jobs), memory_budget_bytes, max_workers)
+    # 各进程平分内存预算，规划器据此为每个任务选择策略
+    per_worker_budget = memory_budget_bytes / workers
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+
+    print(f"批量处理: {len(jobs)} 个任务, {workers} 个进程, "
+          f"每进程内存预算 {per_worker_budget / 1024 / 1024:.0f} MB")
+
+    start = time.perf_counter()
+    results = [None] * len(jobs)
+    attempts = [0] * len(jobs)
+    interrupted = False
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def submit(index):
+            attempts[index] += 1
+            job = jobs[index]
+            return executor.submit(run_job, job, per_worker_budget, _log_path(log_dir, index, job))
+
+        pending = {submit(index): index for index in range(len(jobs))}
+        try:
+            while pending:
+                future = next(as_completed(pending))
+                index = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # 工作进程异常退出（如被系统杀死）
+                    result = {'input': jobs[index].input, 'status': 'failed',
+                              'error': f"{type(e).__name__}: {e}", 'wall_time': None}
+                result['attempts'] = attempts[index]
+                results[index] = result
+
+                done = sum(r is not None and (r['status'] == 'ok' or attempts[i] > retries)
+                           for i, r in enumerate(results))
+                if result['status'] == 'ok':
+                    print(f"[{done}/{len(jobs)}] ✅ {jobs[index].input} ({result['wall_time']:.1f}s, {result['strategy']})")
+                elif attempts[index] <= retries:
+                    print(f"[重试 {attempts[index]}/{retries}] {jobs[index].input}: {result['error']}")
+                    pending[submit(index)] = index
+                else:
+                    print(f"[{done}/{len(jobs)}] ❌ {jobs[index].input}: {result['error']}")
+        except KeyboardInterrupt:
+            interrupted = True
+            print("\n批量处理已中断，取消未开始的任务")
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    for index, job in enumerate(jobs):
+        if results[index] is None:
+            results[index] = {'input': job.input, 'status': 'cancelled', 'attempts': attempts[index]}
+        results[index]['job'] = asdict(job)
+
+    summary = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'total_wall_time': round(time.perf_counter() - start, 3),
+        'workers': workers,
+        'memory_budget_mb': round(memory_budget_bytes / 1024 / 1024, 1),
+        'retries': retries,
+        'interrupted': interrupted,
+        'counts': {status: sum(r['status'] == status for r in results)
+                   for status in ('ok', 'failed', 'cancelled')},
+        'jobs': results,
+    }
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"汇总报告已保存: {report_path}")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='evm batch',
+        description='欧拉视频放大 - 批量渲染',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+清单格式:
+  JSON: [{"input": "a.mp4", "mode": "color", "amplification": 50}, ...]
+        或 {"defaults": {"mode": "motion"}, "jobs": [...]}
+  CSV:  input,mode,freq_low,freq_high,amplification
+        """
+    )
+    parser.add_argument('inputs', nargs='+', help='任务清单(.json/.csv)或输入视频通配符')
+    parser.add_argument('-o', '--output-dir', default='batch_output', help='输出目录')
+    parser.add_argument('-m', '--mode', choices=['motion', 'color', 'hybrid'], help='默认处理模式')
+    parser.add_argument('-a', '--amplification', type=float, help='默认放大倍数')
+    parser.add_argument('-fl', '--freq-low', type=float, help='默认低频截止 (Hz)')
+    parser.add_argument('-fh', '--freq-high', type=float, help='默认高频截止 (Hz)')
+    parser.add_argument('-l', '--levels', type=int, help='默认金字塔层数')
+    parser.add_argument('-s', '--skip-levels', type=int, help='默认跳过顶层数量')
+    parser.add_argument('-f', '--max-frames', type=int, help='默认最大处理帧数')
+    parser.add_argument('--keep-audio', action='store_true', default=None, help='保留原视频音频')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='最大进程数（默认CPU核数）')
+    parser.add_argument('--memory-budget', type=float, default=None, metavar='MB',
+                        help='所有进程共用的内存预算 (MB)，默认为可用内存的60%%')
+    parser.add_argument('--retries', type=int, default=1, help='失败任务的重试次数')
+    parser.add_argument('--report', default=None, help='汇总报告路径（默认 <输出目录>/batch_report.json）')
+    args = parser.parse_args(argv)
+
+    defaults = {key: value for key, value in {
+        'mode': args.mode, 'amplification': args.amplification, 'freq_low': args.freq_low,
+        'freq_high': args.freq_high, 'levels': args.levels, 'skip_levels': args.skip_levels,
+        'max_frames': args.max_frames, 'keep_audio': args.keep_audio,
+    }.items() if value is not None}
+
+    jobs = []
+    patterns = []
+    for item in args.inputs:
+        if item.lower().endswith(('.json', '.csv')):
+            jobs.extend(load_manifest(item, defaults))
+        else:
+            patterns.append(item)
+    jobs.extend(jobs_from_glob(patterns, defaults))
+    if not jobs:
+        parser.error("没有找到任何任务")
+
+    try:
+        assign_outputs(jobs, args.output_dir)
+    except ValueError as e:
+        parser.error(str(e))
+    os.makedirs(args.output_dir, exist_ok=True)
+    memory_budget = args.memory_budget * 1024 * 1024 if args.memory_budget else None
+    summary = run_batch(jobs, memory_budget, args.workers, args.retries,
+                        log_dir=os.path.join(args.output_dir, 'logs'),
+                        report_path=args.report or os.path.join(args.output_dir, 'batch_report.json'))
+
+    counts = summary['counts']
+    print(f"完成: 成功 {counts['ok']}, 失败 {counts['failed']}, 取消 {counts['cancelled']}, "
+          f"总耗时 {summary['total_wall_time']:.1f}s")
+    if summary['interrupted']:
+        return 130
+    return 0 if counts['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
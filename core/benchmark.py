@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Reproducible Benchmark Suite
+可复现基准测试 - 使用合成视频测量各阶段吞吐量、峰值内存并验证放大倍数
+
+用法:
+  python -m core.benchmark --sizes 320x240,640x480 --frames 150 --modes motion,color -o bench.json
+  python -m core.benchmark --compare old.json new.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from .evm_core import EulerianVideoMagnification
+from .profiler import StageProfiler
+from .synthetic import generate_synthetic_frames, write_video, measure_gain
+
+
+@contextlib.contextmanager
+def _engine_settings(evm, **settings):
+    """临时修改处理器的滤波设置（时域滤波方式、降采样倍数）"""
+    previous = {name: getattr(evm, name) for name in settings}
+    for name, value in settings.items():
+        setattr(evm, name, value)
+    try:
+        yield evm
+    finally:
+        for name, value in previous.items():
+            setattr(evm, name, value)
+
+
+def _magnify_fft(evm, frames, fps, mode, freq_low, freq_high, amplification, levels, skip_levels_at_top):
+    """整段FFT引擎（与CLI/GUI相同的模式组合方式）"""
+    with _engine_settings(evm, temporal_filter='fft', decimation=1):
+        return evm.magnify_by_mode(frames, fps, mode, freq_low, freq_high, amplification, levels,
+                                   skip_levels_at_top)
+
+
+def _magnify_fft_decimated(evm, frames, fps, mode, freq_low, freq_high, amplification, levels, skip_levels_at_top):
+    """时间降采样FFT引擎：使用DECIMATION_OVERSAMPLE允许的最大降采样倍数（忽略auto阈值）"""
+    from .planner import DECIMATION_OVERSAMPLE
+
+    factor = max(2, int(fps // (DECIMATION_OVERSAMPLE * freq_high)))
+    with _engine_settings(evm, temporal_filter='fft', decimation=factor):
+        return evm.magnify_by_mode(frames, fps, mode, freq_low, freq_high, amplification, levels,
+                                   skip_levels_at_top)
+
+
+def _magnify_narrowband(evm, frames, fps, mode, freq_low, freq_high, amplification, levels, skip_levels_at_top):
+    """窄带DFT引擎：只计算频带内的DFT bin"""
+    with _engine_settings(evm, temporal_filter='narrowband', decimation=1):
+        return evm.magnify_by_mode(frames, fps, mode, freq_low, freq_high, amplification, levels,
+                                   skip_levels_at_top)
+
+
+def _magnify_fir(evm, frames, fps, mode, freq_low, freq_high, amplification, levels, skip_levels_at_top):
+    """线性相位FIR引擎（与流式处理相同的滤波器，序列两端有过渡）"""
+    with _engine_settings(evm, temporal_filter='fir', decimation=1):
+        return evm.magnify_by_mode(frames, fps, mode, freq_low, freq_high, amplification, levels,
+                                   skip_levels_at_top)
+
+
+# 可对比的处理引擎：名称 -> 函数(evm, frames, fps, mode, freq_low, freq_high, amplification, levels, skip)
+ENGINES = {
+    'fft': _magnify_fft,
+    'fft_decimated': _magnify_fft_decimated,
+    'narrowband': _magnify_narrowband,
+    'fir': _magnify_fir,
+}
+
+# FIR在序列两端有半个滤波器长度的过渡，增益校验使用更长的序列
+GAIN_CHECK_FRAMES = {'fir': 600}
+
+
+def expected_gain(mode, amplification):
+    """理想情况下频带内信号的总放大倍数"""
+    if mode == 'hybrid':
+        return (1 + amplification * 0.7) * (1 + amplification * 1.5)
+    return 1 + amplification
+
+
+def verify_gain(engine='fft', mode='motion', fps=30, freq=1.0, amplification=10, levels=4,
+                num_frames=120, size=(160, 120), tolerance=0.05):
+    """在小尺寸合成视频上验证实测放大倍数与设定值一致
+
+    不跳过顶层（skip_levels_at_top=0），使纹理能量全部位于被放大的层中。
+    """
+    kind = 'color' if mode == 'color' else 'motion'
+    # 混合模式放大倍数较高，减小运动幅度以保持线性近似
+    amplitude = 0.005 if mode == 'hybrid' else None
+    frames = generate_synthetic_frames(size[0], size[1], num_frames, fps, kind=kind, freq=freq,
+                                       amplitude=amplitude)
+    evm = EulerianVideoMagnification('synthetic')
+    output = ENGINES[engine](evm, frames, fps, mode, freq * 0.5, freq * 2.0, amplification,
+                             levels, 0)
+    measured = measure_gain(frames, output, fps, freq)
+    expected = expected_gain(mode, amplification)
+    rel_error = abs(measured - expected) / expected
+    return {
+        'measured': round(measured, 4),
+        'expected': round(expected, 4),
+        'rel_error': round(rel_error, 5),
+        'tolerance': tolerance,
+        'passed': bool(rel_error <= tolerance),
+    }
+
+
+def run_case(width, height, num_frames, fps=30, mode='motion', engine='fft', freq=1.0,
+             amplification=10, levels=4, skip_levels_at_top=2, workdir=None):
+    """运行单个基准用例，返回各阶段统计"""
+    kind = 'color' if mode == 'color' else 'motion'
+    frames = generate_synthetic_frames(width, height, num_frames, fps, kind=kind, freq=freq)
+
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        video_path = write_video(frames, os.path.join(tmp, 'synthetic.mp4'), fps)
+        del frames
+
+        profiler = StageProfiler()
+        evm = EulerianVideoMagnification(video_path, os.path.join(tmp, 'out.mp4'), profiler=profiler)
+        start = time.perf_counter()
+        evm.get_video_info()
+        decoded = evm.load_video(max_frames=num_frames)
+        output = ENGINES[engine](evm, decoded, evm.fps, mode, freq * 0.5, freq * 2.0, amplification,
+                                 levels, skip_levels_at_top)
+        evm.save_video_from_frames(output, mode=mode, freq_low=freq * 0.5, freq_high=freq * 2.0,
+                                   amplification=amplification)
+        total = time.perf_counter() - start
+        profiler.close()
+
+    frame_count = len(decoded)
+    stages = {}
+    for name, record in profiler.records.items():
+        data = record.to_dict()
+        data['fps'] = round(frame_count / record.wall_time, 2) if record.wall_time > 0 else None
+        stages[name] = data
+
+    return {
+        'width': width, 'height': height, 'frames': frame_count, 'fps': fps,
+        'mode': mode, 'engine': engine, 'levels': levels, 'skip_levels_at_top': skip_levels_at_top,
+        'amplification': amplification,
+        'total_time': round(total, 4),
+        'total_fps': round(frame_count / total, 2),
+        'peak_rss_mb': max((s['peak_rss_mb'] for s in stages.values()), default=0),
+        'stages': stages,
+        'timers': {name: round(seconds, 6) for name, seconds in profiler.timers.items()},
+    }
+
+
+def _git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmark(sizes, num_frames=150, modes=('motion',), engines=('fft',), fps=30, repeat=1,
+                  quiet=True, check_gain=True):
+    """运行完整基准测试，返回可JSON序列化的结果"""
+    import cv2
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'system': {
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'cpu_count': os.cpu_count(),
+        },
+        'cases': [],
+        'gain_checks': [],
+    }
+
+    # 屏蔽处理流程的逐帧日志，只保留基准测试输出
+    silence = contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+
+    for engine in engines:
+        for mode in modes:
+            if check_gain:
+                with silence:
+                    check = verify_gain(engine, mode, fps=fps, num_frames=GAIN_CHECK_FRAMES.get(engine, 120))
+                check.update({'engine': engine, 'mode': mode})
+                results['gain_checks'].append(check)
+                status = '通过' if check['passed'] else '失败'
+                print(f"[增益校验] {engine}/{mode}: 实测 {check['measured']:.3f}x, "
+                      f"期望 {check['expected']:.3f}x ({status})")
+
+            for width, height in sizes:
+                for run in range(repeat):
+                    with silence:
+                        case = run_case(width, height, num_frames, fps, mode, engine)
+                    case['run'] = run
+                    results['cases'].append(case)
+                    print(f"[基准] {engine}/{mode} {width}x{height}x{case['frames']}: "
+                          f"{case['total_time']:.2f}s ({case['total_fps']:.1f} FPS), "
+                          f"峰值RSS {case['peak_rss_mb']:.0f}MB")
+    return results
+
+
+def _case_key(case):
+    return (case['engine'], case['mode'], case['width'], case['height'], case['frames'])
+
+
+def compare_results(baseline, current):
+    """对比两份基准结果，返回每个用例各阶段的加速比（baseline耗时 / current耗时）"""
+    base_cases = {}
+    for case in baseline['cases']:
+        base_cases.setdefault(_case_key(case), case)
+
+    rows = []
+    for case in current['cases']:
+        base = base_cases.get(_case_key(case))
+        if base is None:
+            continue
+        speedups = {}
+        for name, stage in case['stages'].items():
+            base_stage = base['stages'].get(name)
+            if base_stage and stage['wall_time'] > 0:
+                speedups[name] = round(base_stage['wall_time'] / stage['wall_time'], 3)
+        rows.append({
+            'case': '{}/{} {}x{}x{}'.format(*_case_key(case)),
+            'total_speedup': round(base['total_time'] / case['total_time'], 3) if case['total_time'] else None,
+            'peak_rss_ratio': round(case['peak_rss_mb'] / base['peak_rss_mb'], 3) if base['peak_rss_mb'] else None,
+            'stages': speedups,
+        })
+    return rows
+
+
+def _parse_sizes(text):
+    sizes = []
+    for item in text.split(','):
+        width, height = item.lower().split('x')
+        sizes.append((int(width), int(height)))
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='欧拉视频放大 - 合成视频基准测试')
+    parser.add_argument('--sizes', default='320x240,640x480', help='分辨率列表，如 320x240,1280x720')
+    parser.add_argument('--frames', type=int, default=150, help='每个用例的帧数')
+    parser.add_argument('--fps', type=int, default=30, help='合成视频帧率')
+    parser.add_argument('--modes', default='motion,color', help='处理模式列表')
+    parser.add_argument('--engines', default='fft', help=f"处理引擎列表，可选: {','.join(ENGINES)}")
+    parser.add_argument('--repeat', type=int, default=1, help='每个用例重复次数')
+    parser.add_argument('--no-gain-check', action='store_true', help='跳过放大倍数校验')
+    parser.add_argument('-v', '--verbose', action='store_true', help='显示处理流程日志')
+    parser.add_argument('-o', '--output', default='bench_output.json', help='结果JSON路径')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='对比两份结果JSON而不运行基准')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0], encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.compare[1], encoding='utf-8') as f:
+            current = json.load(f)
+        for row in compare_results(baseline, current):
+            stages = ', '.join(f"{name} {ratio:.2f}x" for name, ratio in row['stages'].items())
+            print(f"{row['case']}: 总体 {row['total_speedup']:.2f}x, 内存 {row['peak_rss_ratio']:.2f}x | {stages}")
+        return 0
+
+    engines = [name.strip() for name in args.engines.split(',')]
+    unknown = [name for name in engines if name not in ENGINES]
+    if unknown:
+        parser.error(f"未知引擎: {', '.join(unknown)}")
+
+    results = run_benchmark(_parse_sizes(args.sizes), args.frames,
+                            modes=[m.strip() for m in args.modes.split(',')],
+                            engines=engines, fps=args.fps, repeat=args.repeat,
+                            quiet=not args.verbose, check_gain=not args.no_gain_check)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存: {args.output}")
+    return 0 if all(check['passed'] for check in results['gain_checks']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Cooperative Cancellation
+协作式取消 - 在各处理阶段的帧循环中检查取消请求
+"""
+
+import threading
+
+
+class ProcessingCancelled(Exception):
+    """处理被用户取消"""
+
+
+class CancellationToken:
+    """取消令牌 - 由调用方设置，由处理流程在每帧检查"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason="用户取消"):
+        """请求取消（线程安全，可重复调用）"""
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self):
+        """是否已请求取消"""
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """若已请求取消则抛出ProcessingCancelled"""
+        if self._event.is_set():
+            raise ProcessingCancelled(self.reason or "用户取消")
+
+    def wait(self, timeout=None):
+        """等待取消请求，返回是否已取消"""
+        return self._event.wait(timeout)
@@ -8,53 +8,104 @@ import numpy as np
 import cv2
 import subprocess
 import os
-from scipy import signal
+import math
 from collections import deque
-import concurrent.futures
 import threading
-import warnings
-warnings.filterwarnings('ignore')
-
-# 集成eulerian-magnification库用于频率分析
-try:
-    import eulerian_magnification as em
-    HAS_EM_LIB = True
-    print("eulerian-magnification库已加载")
-except ImportError:
-    HAS_EM_LIB = False
-    print("eulerian-magnification库未安装，频率分析功能不可用")
-
-# 启用numpy优化
-np.seterr(all='ignore')
+import time
+
+from .cancellation import CancellationToken, ProcessingCancelled
+from .progress import ProgressTracker
+from .profiler import NullProfiler
+from . import planner
+from . import fir
+from .scene import SceneCutDetector, segment_bounds
+from .roi import (composite, as_roi_list, propose_rois, prepare_rois, plan_size, plan_note, rois_mask,
+                  AUTO_ROI_SECONDS, AUTO_ROI_LEVEL, AUTO_ROI_MAX)
+from .vitals import (VitalSignExtractor, summarize_vitals, PULSE_BAND, RESPIRATION_BAND,
+                     VITALS_LEVEL)
+from .spectral import (block_grid, block_means, coarse_size, summarize_power, strongest_block,
+                       welch_segment_length, WelchPSD, StreamingSpectrogram, SPECTRAL_BLOCK, SPECTRAL_CHANNELS, SPECTRAL_LEVEL)
+
+
+# 像素主序FFT分块大小（字节）：每块 (像素, T) float32 不超过此值，保持在L2缓存内
+FFT_TILE_BYTES = 256 * 1024
+# 批量构建金字塔时每批的帧数（取消检查和进度更新的粒度）
+PYRAMID_BATCH_FRAMES = 50
+# 放大流程的局部浮点错误设置：大放大倍数下float32溢出为inf（随后被裁剪到[0, 1]）属于预期，
+# 只在渲染/扫描期间忽略溢出、下溢和由此产生的无效值；除零仍照常报告，不修改全局设置
+AMPLIFY_ERRSTATE = {'over': 'ignore', 'under': 'ignore', 'invalid': 'ignore'}
+
+
+def read_video_info(video_path):
+    """读取视频的帧率、尺寸和帧数（不创建处理器，供界面缓存）"""
+    cap = cv2.VideoCapture(video_path)
+    info = {
+        'fps': int(cap.get(cv2.CAP_PROP_FPS)),
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'total_frames': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+    }
+    cap.release()
+    return info
 
 
 class EulerianVideoMagnification:
     """欧拉视频放大核心类 - Windows兼容高性能版本"""
 
-    def __init__(self, video_path, output_path="output.mp4", buffer_size=150, num_workers=None):
+    def __init__(self, video_path, output_path="output.mp4", buffer_size=150, num_workers=None,
+                 cancel_token=None, progress_listener=None, profiler=None, keep_output_name=False):
         self.video_path = video_path
         self.output_path = output_path
+        # True时按output_path原样输出（只按输出格式调整扩展名），不生成带时间戳和参数的文件名
+        self.keep_output_name = keep_output_name
         self.fps = None
         self.width = None
         self.height = None
         self.total_frames = None
-        # 大幅减少缓冲区避免内存溢出 - 64GB都不够说明有严重问题
-        self.buffer_size = min(30, buffer_size)  # 最多30帧，防止内存爆炸
+        # 流式缓冲区大小，get_video_info中由规划器按可用内存收紧
+        self.buffer_size = buffer_size
         # 使用所有CPU核心，但在Windows上使用ThreadPoolExecutor更稳定
         import multiprocessing as mp
         self.num_workers = num_workers or mp.cpu_count()
         # 创建持久线程池避免重复创建开销
         self.executor = None
+        # 协作式取消令牌，各阶段帧循环中检查
+        self.cancel_token = cancel_token or CancellationToken()
+        # 结构化进度事件监听器，接收ProgressEvent
+        self.progress_listener = progress_listener
+        # 可选的分阶段性能分析器（core.profiler.StageProfiler）
+        self.profiler = profiler or NullProfiler()
+        # 执行计划（core.planner.ExecutionPlan），决定整段/分块/外存处理及金字塔精度
+        self.plan = None
+        self.precision = 'float32'
+        # 时间降采样倍数（1为不降采样）、时域滤波方式（auto/fft/narrowband/fir）和FIR抽头数，由执行计划设置
+        self.decimation = 1
+        self.temporal_filter = 'auto'
+        self.fir_taps = None
+        # 镜头切换分段：解码时累积帧差（core.scene.SceneCutDetector），各段独立并行处理
+        self.split_scenes = True
+        self.scene_detector = None
+        # 运动放大只在亮度通道上构建金字塔和滤波（内存和FFT计算量约为三通道的1/3）
+        self.luma_only = False
         print(f"初始化处理器，使用 {self.num_workers} 个工作线程")
 
     def __del__(self):
         """析构函数 - 确保线程池被清理"""
         self._cleanup_executor()
 
+    def cancel(self, reason="用户取消"):
+        """请求取消当前处理，在一帧之内生效"""
+        self.cancel_token.cancel(reason)
+
+    def _track(self, stage, total, unit='frame', detail=''):
+        """创建阶段进度跟踪器"""
+        return ProgressTracker(stage, total, self.progress_listener, unit=unit, detail=detail)
+
     def _init_executor(self):
         """初始化持久线程池"""
         if self.executor is None:
-            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.num_workers)
+            from concurrent.futures import ThreadPoolExecutor
+            self.executor = ThreadPoolExecutor(max_workers=self.num_workers)
 
     def _cleanup_executor(self):
         """清理线程池"""
@@ -64,12 +115,9 @@ class EulerianVideoMagnification:
 
     def get_video_info(self):
         """获取视频基本信息并检测超高分辨率"""
-        cap = cv2.VideoCapture(self.video_path)
-        self.fps = int(cap.get(cv2.CAP_PROP_FPS))
-        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        cap.release()
+        info = read_video_info(self.video_path)
+        self.fps, self.width, self.height = info['fps'], info['width'], info['height']
+        self.total_frames = info['total_frames']
 
         # 计算分辨率等级和内存需求
         total_pixels = self.width * self.height
@@ -78,123 +126,115 @@ class EulerianVideoMagnification:
         print(f"视频: {self.width}x{self.height}, {self.fps}FPS, {self.total_frames}帧")
         print(f"每帧内存: {frame_size_mb:.1f}MB")
 
-        # 超高分辨率检测和警告
-        if total_pixels > 33177600:  # 8K (7680x4320)
-            print(f"⚠️ 检测到超高分辨率视频 ({self.width}x{self.height})")
-            print("自动启用超高分辨率优化模式...")
-
-            # 强制减少缓冲区到最小
-            self.buffer_size = min(10, self.buffer_size)
-            self.is_ultra_high_res = True
+        # 流式缓冲区由可用内存决定
+        self.buffer_size = planner.streaming_buffer_size(self.width, self.height, requested=self.buffer_size)
 
-            if total_pixels > 100663296:  # 12K+
-                print("🚨 12K+分辨率检测！强制启用极限内存模式")
-                self.buffer_size = 5  # 最小缓冲区
-                self.extreme_mode = True
-        else:
-            self.is_ultra_high_res = False
-            self.extreme_mode = False
+        # 超高分辨率检测 - 仅影响编码器选择和FFmpeg参数，内存策略由规划器决定
+        self.is_ultra_high_res = total_pixels > 33177600  # 8K (7680x4320)
+        self.extreme_mode = total_pixels > 100663296  # 12K+
+        if self.extreme_mode:
+            print("🚨 12K+分辨率检测！启用极限编码参数")
+        elif self.is_ultra_high_res:
+            print(f"⚠️ 检测到超高分辨率视频 ({self.width}x{self.height})，启用高分辨率编码参数")
 
         return self.fps, self.width, self.height
 
-    def analyze_video_frequencies(self, max_frames=300):
-        """使用eulerian-magnification库分析视频频率"""
-        if not HAS_EM_LIB:
-            print("eulerian-magnification库未安装，无法进行频率分析")
-            return None
+    def analyze_video_frequencies(self, max_frames=None, freq_low=None, freq_high=None, reduced=True,
+                                  partial_callback=None, roi=None):
+        """流式分析视频频率：逐帧计算整帧平均亮度和按块YCrCb平均值，用Welch法累积功率谱
+
+        常驻内存只有一个Welch分段，与视频长度无关；max_frames为None时分析整段视频。
+        reduced时按粗糙层尺寸解码（见iter_frames），否则解码原尺寸后逐层pyrDown。
+        结果的'spectral_map'为空间频谱图，freq_low/freq_high为热力图的频带；
+        'spectrogram'为逐帧信号的短时傅里叶变换（时频图）。给出roi（单个或列表）时
+        整体频谱和时频图使用ROI内的平均亮度，否则使用整帧平均亮度（空间频谱图总是覆盖整帧）。
+        partial_callback(result) 在每个Welch分段完成时以当前的部分结果调用（结构与最终结果相同，'partial'为True）。
+        取消时抛出ProcessingCancelled。
+        """
+        if self.fps is None:
+            self.get_video_info()
 
         try:
+            total = self.total_frames if max_frames is None else min(max_frames, self.total_frames)
             print(f"\n开始频率分析...")
-            print(f"分析帧数: {min(max_frames, self.total_frames)} 帧")
-
-            # 使用OpenCV直接加载视频进行频率分析
-            cap = cv2.VideoCapture(self.video_path)
-            frames = []
-            frame_count = 0
-
-            while frame_count < max_frames:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-
-                # 转换为浮点数并归一化
-                frame_float = frame.astype(np.float32) / 255.0
-                frames.append(frame_float)
-                frame_count += 1
-
-            cap.release()
-
-            if len(frames) < 10:
-                print("视频帧数太少，无法进行频率分析")
-                return None
-
-            vid = np.array(frames)
-            print(f"视频数据: {vid.shape}, FPS: {self.fps}")
-
-            # 使用自定义频率分析函数（修复库的Python 3兼容性问题）
-            print("正在分析频率成分...")
-            frequency_data = self._analyze_frequencies_custom(vid, self.fps)
-
-            # 解析频率分析结果
-            if frequency_data is not None:
-                # 找到主要频率成分
-                dominant_frequencies = self._extract_dominant_frequencies(frequency_data, self.fps)
-
-                print(f"\n频率分析结果:")
-                for freq_info in dominant_frequencies:
-                    print(f"  主要频率: {freq_info['frequency']:.2f} Hz (强度: {freq_info['magnitude']:.3f})")
-
+            print(f"分析帧数: {total} 帧")
+
+            grid = block_grid(self.width, self.height)
+            size = coarse_size(self.width, self.height) if reduced else None
+            level = 0 if reduced else SPECTRAL_LEVEL
+            nperseg = welch_segment_length(self.fps, max(total, 2))
+            global_psd = WelchPSD(nperseg)
+            block_psd = WelchPSD(nperseg, (grid[1], grid[0], len(SPECTRAL_CHANNELS)))
+            spectrogram = StreamingSpectrogram.for_video(self.fps, max(total, 2))
+            thumbnail = None
+            rois = as_roi_list(roi)
+            signal_mask = rois_mask(rois, self.width, self.height, size) if rois else None
+            if rois:
+                print("  信号区域: " + "; ".join(item.describe() for item in rois))
+
+            def build_result(global_spectrum, block_spectrum, partial):
+                frequency_data = {
+                    'frequencies': global_spectrum[0],
+                    'magnitudes': np.sqrt(global_spectrum[1]),
+                    'segments': global_psd.segments
+                }
+                spectral = summarize_power(*block_spectrum, self.fps, freq_low, freq_high,
+                                           block_size=SPECTRAL_BLOCK * 2 ** SPECTRAL_LEVEL)
+                spectral['thumbnail'] = thumbnail
                 return {
                     'fps': self.fps,
-                    'dominant_frequencies': dominant_frequencies,
+                    'dominant_frequencies': self._extract_dominant_frequencies(frequency_data, self.fps),
                     'raw_data': frequency_data,
-                    'analyzed_frames': len(vid)
+                    'total_frames': self.total_frames,
+                    'analyzed_frames': global_psd.pushed,
+                    'spectral_map': spectral,
+                    'spectrogram': spectrogram.result(self.fps),
+                    'signal': 'roi' if rois else 'frame',
+                    'partial': partial
                 }
-            else:
-                print("频率分析失败")
+
+            started = time.time()
+            tracker = self._track('analyze', total, detail=f"Welch {nperseg} 帧/段")
+            for frame in self.iter_frames(size, total):
+                self.cancel_token.raise_if_cancelled()
+                # 整帧（或ROI内）平均亮度（各通道平均）
+                signal = float(frame[signal_mask].mean() if signal_mask is not None else frame.mean()) / 255.0
+                global_psd.push(signal)
+                spectrogram.push(signal)
+                segments = block_psd.segments
+                block_psd.push(block_means(frame, grid, level))
+                if thumbnail is None:
+                    thumbnail = cv2.resize(frame, (grid[0] * SPECTRAL_BLOCK, grid[1] * SPECTRAL_BLOCK),
+                                           interpolation=cv2.INTER_AREA)
+                tracker.update(advance=1)
+                if partial_callback is not None and block_psd.segments > segments:
+                    partial_callback(build_result(global_psd.current(self.fps), block_psd.current(self.fps), True))
+            tracker.finish()
+
+            if global_psd.pushed < 10:
+                print("视频帧数太少，无法进行频率分析")
                 return None
 
+            print(f"已分析 {global_psd.pushed} 帧，Welch分段 {nperseg} 帧 "
+                  f"（分辨率 {self.fps / nperseg:.2f} Hz），FPS: {self.fps}")
+            result = build_result(global_psd.finish(self.fps), block_psd.finish(self.fps), False)
+
+            print(f"\n频率分析结果:")
+            for freq_info in result['dominant_frequencies']:
+                print(f"  主要频率: {freq_info['frequency']:.2f} Hz (强度: {freq_info['magnitude']:.3f})")
+            row, col, peak_freq, _ = strongest_block(result['spectral_map'])
+            print(f"  空间频谱图: {grid[0]}x{grid[1]} 块，最强块 (行{row}, 列{col}) 主频率 {peak_freq:.2f} Hz")
+            print(f"  用时 {time.time() - started:.2f}s")
+            return result
+
+        except ProcessingCancelled:
+            raise
         except Exception as e:
             print(f"频率分析出错: {e}")
             import traceback
             traceback.print_exc()
             return None
 
-    def _analyze_frequencies_custom(self, vid, fps):
-        """自定义频率分析函数（修复Python 3兼容性问题）"""
-        try:
-            # 将视频转换为灰度并计算每个像素的时间序列
-            if len(vid.shape) == 4:  # (frames, height, width, channels)
-                # 转换为灰度
-                vid_gray = np.mean(vid, axis=3)
-            else:
-                vid_gray = vid
-
-            # 计算全局平均亮度的时间序列
-            temporal_signal = np.mean(vid_gray, axis=(1, 2))
-
-            # 应用FFT分析频率
-            n_frames = len(temporal_signal)
-            fft_result = np.fft.fft(temporal_signal)
-
-            # 计算频率轴（修复整数除法问题）
-            freqs = np.fft.fftfreq(n_frames, 1.0/fps)
-
-            # 只取正频率部分（修复slice indices问题）
-            positive_idx = n_frames // 2 + 1  # 使用整数除法
-            freqs = freqs[:positive_idx]
-            fft_magnitude = np.abs(fft_result[:positive_idx])
-
-            return {
-                'frequencies': freqs,
-                'magnitudes': fft_magnitude,
-                'temporal_signal': temporal_signal
-            }
-
-        except Exception as e:
-            print(f"自定义频率分析出错: {e}")
-            return None
-
     def _extract_dominant_frequencies(self, frequency_data, fps, top_n=5):
         """从频率数据中提取主要频率成分"""
         try:
@@ -279,10 +319,94 @@ class EulerianVideoMagnification:
             'confidence': 'high'
         }
 
+    def suggest_rois(self, freq_low, freq_high, seconds=AUTO_ROI_SECONDS, level=AUTO_ROI_LEVEL,
+                     max_rois=AUTO_ROI_MAX):
+        """自动ROI：取前seconds秒的第level层高斯金字塔（亮度），整段FFT带通后按块统计频带内功率
+
+        返回按频带内能量从大到小排列的RegionOfInterest列表；信号不集中时返回空列表（处理整帧）。
+        """
+        if self.fps is None:
+            self.get_video_info()
+        count = max(2, min(self.total_frames, int(round(seconds * self.fps))))
+        print(f"自动ROI: 分析前 {count} 帧的第 {level} 层 ({freq_low}-{freq_high} Hz)")
+
+        cap = cv2.VideoCapture(self.video_path)
+        coarse = []
+        try:
+            while len(coarse) < count:
+                self.cancel_token.raise_if_cancelled()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY).astype(np.float32) / 255.0
+                for _ in range(level):
+                    gray = cv2.pyrDown(gray)
+                coarse.append(gray)
+        finally:
+            cap.release()
+        if len(coarse) < 2:
+            return []
+
+        band = self.apply_temporal_bandpass_filter_fft(np.array(coarse), self.fps, freq_low, freq_high, 1)
+        power = np.mean(np.square(band), axis=0)
+        rois = propose_rois(power, 2 ** level, (self.width, self.height), max_rois)
+        if rois:
+            print("  建议ROI: " + "; ".join(roi.describe() for roi in rois))
+        else:
+            print("  频带内能量没有集中在局部区域，建议处理整帧")
+        return rois
+
+    def extract_vitals(self, rois, max_frames=None, level=VITALS_LEVEL, record_callback=None):
+        """生命体征提取：一次流式解码（不渲染），输出每个ROI的心率和呼吸频率时间序列
+
+        level为解码使用的高斯层（按该尺寸解码，见iter_frames）；record_callback(records)
+        在每个输出时刻以新记录调用。返回包含视频信息、ROI、汇总和记录的字典。
+        """
+        if self.fps is None:
+            self.get_video_info()
+        rois = as_roi_list(rois)
+        total = self.total_frames if max_frames is None else min(max_frames, self.total_frames)
+        size = coarse_size(self.width, self.height, level) if level else None
+        extractor = VitalSignExtractor(rois, self.fps, (self.width, self.height), size)
+        print(f"生命体征提取: {len(rois)} 个区域, {total} 帧"
+              f"{f' (按 {size[0]}x{size[1]} 解码)' if size else ''}")
+
+        started = time.time()
+        tracker = self._track('vitals', total)
+        for frame in self.iter_frames(size, total):
+            self.cancel_token.raise_if_cancelled()
+            records = extractor.push(frame)
+            if records and record_callback is not None:
+                record_callback(records)
+            tracker.update(advance=1)
+        tracker.finish()
+        elapsed = time.time() - started
+
+        summary = summarize_vitals(extractor.records, len(rois))
+        duration = extractor.frames / self.fps
+        print(f"  已分析 {extractor.frames} 帧 ({duration:.1f}s 视频)，用时 {elapsed:.2f}s "
+              f"({duration / max(elapsed, 1e-9):.0f}x 实时)")
+        for item, roi in zip(summary, rois):
+            bpm = f"{item['bpm']:.0f} BPM" if item['bpm'] is not None else "无读数（视频短于心率窗口）"
+            breaths = (f"{item['breaths_per_minute']:.0f} 次/分" if item['breaths_per_minute'] is not None
+                       else "无读数（视频短于呼吸窗口）")
+            print(f"  ROI {item['roi']} {roi.describe()}: 心率 {bpm}, 呼吸 {breaths}")
+
+        return {
+            'video': self.video_path,
+            'fps': self.fps,
+            'frames': extractor.frames,
+            'rois': [[roi.x, roi.y, roi.width, roi.height] for roi in rois],
+            'pulse_band': list(PULSE_BAND),
+            'respiration_band': list(RESPIRATION_BAND),
+            'summary': summary,
+            'records': extractor.records,
+        }
+
     def build_gaussian_pyramid(self, frame, levels=4):
         """构建高斯金字塔 - cv2优化版本"""
-        pyramid = [frame.astype(np.float32)]
-        current = frame.astype(np.float32)
+        current = frame.astype(np.float32, copy=False)
+        pyramid = [current]
 
         # 使用cv2.pyrDown，比scipy更快且更稳定
         for i in range(levels - 1):
@@ -292,89 +416,265 @@ class EulerianVideoMagnification:
 
     def build_laplacian_pyramid(self, frame, levels=4):
         """构建拉普拉斯金字塔 - 正确的运动放大方法"""
-        # 先构建高斯金字塔
-        gaussian_pyramid = self.build_gaussian_pyramid(frame, levels)
-
-        # 构建拉普拉斯金字塔
-        laplacian_pyramid = []
-
-        for i in range(levels - 1):
-            # 上采样下一层
-            size = (gaussian_pyramid[i].shape[1], gaussian_pyramid[i].shape[0])
-            upsampled = cv2.pyrUp(gaussian_pyramid[i + 1], dstsize=size)
-
-            # 拉普拉斯层 = 当前高斯层 - 上采样的下一层
-            laplacian = gaussian_pyramid[i] - upsampled
-            laplacian_pyramid.append(laplacian)
+        return [level[0] for level in self.build_laplacian_pyramid_batch(frame[np.newaxis], levels)]
+
+    @staticmethod
+    def pyramid_shapes(height, width, levels=4):
+        """各层的 (高, 宽)，与cv2.pyrDown的默认输出尺寸一致"""
+        shapes = [(height, width)]
+        for _ in range(levels - 1):
+            height, width = (height + 1) // 2, (width + 1) // 2
+            shapes.append((height, width))
+        return shapes
+
+    def build_laplacian_pyramid_batch(self, frames, levels=4, out=None, start=0):
+        """批量构建拉普拉斯金字塔：每层直接写入 (T, h, w, C) 层数组，不产生逐帧的金字塔列表和副本
+
+        frames[k] 的各层写入 out[level][start + k]；out默认新建float32层数组。
+        float32层由cv2.subtract直接写入目标帧，其他精度（float16）在相减时转换。
+        """
+        if out is None:
+            height, width = frames[0].shape[:2]
+            out = [np.empty((len(frames), h, w) + frames[0].shape[2:], dtype=np.float32)
+                   for h, w in self.pyramid_shapes(height, width, levels)]
+        direct = [level.dtype == np.float32 for level in out]
+        timed = self.profiler.enabled
+
+        for offset, frame in enumerate(frames):
+            index = start + offset
+            current = frame.astype(np.float32, copy=False)
+            for i in range(levels - 1):
+                if timed:
+                    level_start = time.perf_counter()
+                # 拉普拉斯层 = 当前高斯层 - 上采样的下一层
+                down = cv2.pyrDown(current)
+                upsampled = cv2.pyrUp(down, dstsize=(current.shape[1], current.shape[0]))
+                if direct[i]:
+                    cv2.subtract(current, upsampled, dst=out[i][index])
+                else:
+                    out[i][index] = current - upsampled
+                current = down
+                if timed:
+                    self.profiler.add_time(f'pyramid/level_{i}', time.perf_counter() - level_start)
 
-        # 最后一层就是高斯金字塔的最后一层（最粗糙的层）
-        laplacian_pyramid.append(gaussian_pyramid[-1])
+            # 最后一层就是高斯金字塔的最后一层（最粗糙的层）
+            out[-1][index] = current
 
-        return laplacian_pyramid
+        return out
 
     def apply_temporal_bandpass_filter_fft(self, data, fps, freq_low, freq_high, amplification=1):
-        """使用FFT进行时域带通滤波 - 参考eulerian_magnification库的正确实现"""
+        """使用FFT进行时域带通滤波 - 参考eulerian_magnification库的正确实现
+
+        层数据按时间主序 (T, H, W, C) 存放，沿axis 0做FFT时每个像素的样本间隔一整帧；
+        这里按像素分块转置为连续的 (像素, T) 小块（大小适配缓存），逐块滤波后写回。
+        """
         try:
-            # data shape: (frames, height, width, channels)
             print(f"应用FFT带通滤波: {freq_low}-{freq_high} Hz, 放大倍数: {amplification}x")
+            mask = self._temporal_band_mask(data.shape[0], fps, freq_low, freq_high)
+            return self._fft_bandpass_tiles(data, mask, amplification)
 
-            # 使用实数FFT（更高效）
-            fft = np.fft.rfft(data, axis=0)
-            frequencies = np.fft.fftfreq(data.shape[0], d=1.0 / fps)
-
-            # 找到频率边界的索引
-            bound_low = (np.abs(frequencies - freq_low)).argmin()
-            bound_high = (np.abs(frequencies - freq_high)).argmin()
-
-            # 创建带通滤波器：只保留指定频率范围
-            fft[:bound_low] = 0
-            fft[bound_high:-bound_high] = 0
-            fft[-bound_low:] = 0
-
-            # 逆FFT恢复时域信号
-            result = np.fft.irfft(fft, n=data.shape[0], axis=0)
-
-            # 应用放大系数
-            result = result.real * amplification
-
-            return result.astype(np.float32)
-
+        except ProcessingCancelled:
+            raise
         except Exception as e:
             print(f"FFT滤波出错: {e}")
             import traceback
             traceback.print_exc()
             return np.zeros_like(data)
 
-    def create_laplacian_video_pyramid(self, video_frames, levels=4):
-        """创建整个视频的拉普拉斯金字塔 - 参考库的正确实现"""
+    def _fft_bandpass_tiles(self, data, mask, amplification):
+        """按像素分块的FFT带通：每块转置为 (像素, T) 连续数组，沿最后一维做rfft/irfft
+
+        大层的分块数可达数百，每块之前检查一次取消。
+        """
+        num_frames = data.shape[0]
+        pixels = data.reshape(num_frames, -1)
+        result = np.empty(data.shape, dtype=np.float32)
+        out = result.reshape(num_frames, -1)
+
+        tile = max(1, FFT_TILE_BYTES // (num_frames * 4))
+        # 频带掩码是连续区间，按切片复制比花式索引快
+        keep = np.flatnonzero(mask)
+        band = slice(keep[0], keep[-1] + 1) if len(keep) else slice(0, 0)
+        block = np.empty((min(tile, pixels.shape[1]), num_frames), dtype=np.float32)
+        # 频带外的bin保持为0，每块只覆盖频带内的bin
+        spectrum = np.zeros((block.shape[0], len(mask)), dtype=np.complex64)
+        for start in range(0, pixels.shape[1], tile):
+            self.cancel_token.raise_if_cancelled()
+            end = min(start + tile, pixels.shape[1])
+            count = end - start
+            block[:count] = pixels[:, start:end].T
+            spectrum[:count, band] = np.fft.rfft(block[:count], axis=1)[:, band]
+            filtered = np.fft.irfft(spectrum[:count], n=num_frames, axis=1)
+            filtered *= amplification
+            out[:, start:end] = filtered.T
+        return result
+
+    def apply_temporal_bandpass_filter_narrowband(self, data, fps, freq_low, freq_high, amplification=1,
+                                                  bins=None):
+        """窄带时域滤波：只计算频带内的DFT bin（批量矩阵乘法），再由这些bin合成时域信号
+
+        与apply_temporal_bandpass_filter_fft使用同一频带掩码，结果在浮点误差内一致；
+        计算量与bin数成正比，而不是与整段FFT成正比。
+        """
+        num_frames = data.shape[0]
+        if bins is None:
+            bins = np.flatnonzero(self._temporal_band_mask(num_frames, fps, freq_low, freq_high))
+        print(f"应用窄带DFT滤波: {freq_low}-{freq_high} Hz, {len(bins)} 个频率bin, 放大倍数: {amplification}x")
+        if len(bins) == 0:
+            return np.zeros(data.shape, dtype=np.float32)
+
+        # 实数DFT基: 每个bin一行cos和一行sin
+        phase = 2 * np.pi * np.outer(bins, np.arange(num_frames)) / num_frames
+        basis = np.concatenate([np.cos(phase), np.sin(phase)]).astype(np.float32)
+        # irfft合成权重: 直流和奈奎斯特bin权重1，其余为2（共轭对称）
+        weights = np.where((bins == 0) | (2 * bins == num_frames), 1.0, 2.0) * amplification / num_frames
+        synthesis = (basis.T * np.tile(weights, 2).astype(np.float32)).astype(np.float32)
+
+        pixels = data.reshape(num_frames, -1)
+        coefficients = basis @ pixels.astype(np.float32, copy=False)
+        result = synthesis @ coefficients
+        return result.reshape(data.shape)
+
+    def apply_temporal_bandpass_filter_fir(self, data, fps, freq_low, freq_high, amplification=1,
+                                           num_taps=None):
+        """线性相位FIR带通（零相位对齐，序列外视为0），与流式处理逐帧结果一致"""
+        num_taps = self._fir_num_taps(fps, freq_low, freq_high, data.shape[0], num_taps)
+        print(f"应用FIR带通滤波: {freq_low}-{freq_high} Hz, {num_taps} 抽头, 放大倍数: {amplification}x")
+        taps = fir.design_bandpass(fps, freq_low, freq_high, num_taps) * np.float32(amplification)
+        return fir.fir_filter(data, taps)
+
+    def _fir_num_taps(self, fps, freq_low, freq_high, num_frames, num_taps=None):
+        """FIR抽头数：指定值或执行计划中的值，否则按频带选择；不超过帧数"""
+        num_taps = num_taps or self.fir_taps or fir.default_num_taps(fps, freq_low, freq_high)
+        return fir.default_num_taps(fps, freq_low, freq_high, max_taps=min(num_taps, num_frames))
+
+    def apply_temporal_bandpass_filter_decimated(self, data, fps, freq_low, freq_high, amplification=1,
+                                                 factor=2):
+        """时间降采样FFT带通滤波：低帧率下滤波，再把带通增量线性插值回原帧率
+
+        每factor帧取均值（盒式抗混叠）得到低帧率序列，FFT带通后按频率除以
+        盒式平均和线性插值的幅度响应进行补偿，使频带内增益与整段FFT一致。
+        """
+        num_frames = data.shape[0]
+        low = self._decimate_frames(data, factor)
+        print(f"应用降采样FFT带通滤波: {freq_low}-{freq_high} Hz, 降采样 {factor}x "
+              f"({num_frames} -> {len(low)} 帧), 放大倍数: {amplification}x")
+        band = self._decimated_band(low, fps, freq_low, freq_high, amplification, factor)
+        del low
+
+        result = np.empty(data.shape, dtype=np.float32)
+        for frame_idx, (k0, k1, weight) in enumerate(self._interpolation_taps(num_frames, factor)):
+            np.multiply(band[k0], 1 - weight, out=result[frame_idx])
+            result[frame_idx] += weight * band[k1]
+        return result
+
+    @staticmethod
+    def _decimate_frames(data, factor):
+        """盒式平均降采样：每factor帧取均值（最后一块可能不足factor帧）"""
+        num_frames = data.shape[0]
+        low_frames = -(-num_frames // factor)
+        full = num_frames // factor
+        low = np.empty((low_frames,) + data.shape[1:], dtype=np.float32)
+        if full:
+            low[:full] = data[:full * factor].reshape((full, factor) + data.shape[1:]).mean(axis=1, dtype=np.float32)
+        if low_frames > full:
+            low[full] = data[full * factor:].mean(axis=0, dtype=np.float32)
+        return low
+
+    def _decimated_band(self, low, fps, freq_low, freq_high, amplification, factor):
+        """低帧率序列的FFT带通，并补偿盒式平均和线性插值的幅度衰减（fps为原帧率）"""
+        low_frames = low.shape[0]
+        low_fps = fps / factor
+        fft = np.fft.rfft(low, axis=0)
+        frequencies = np.fft.rfftfreq(low_frames, d=1.0 / low_fps)
+        x = frequencies / fps
+        with np.errstate(divide='ignore', invalid='ignore'):
+            box = np.where(x > 0, np.sin(np.pi * x * factor) / (factor * np.sin(np.pi * x)), 1.0)
+        response = np.abs(box) * np.sinc(x * factor) ** 2
+        mask = self._temporal_band_mask(low_frames, low_fps, freq_low, freq_high)
+        gain = np.where(mask & (response > 1e-3), amplification / np.maximum(response, 1e-3), 0.0)
+        fft *= gain.astype(np.float32).reshape((-1,) + (1,) * (low.ndim - 1))
+        return np.fft.irfft(fft, n=low_frames, axis=0).astype(np.float32, copy=False)
+
+    @staticmethod
+    def _interpolation_taps(num_frames, factor):
+        """线性插值回原帧率的 (k0, k1, 权重)，低帧率样本k位于原帧 k*factor + (factor-1)/2"""
+        low_frames = -(-num_frames // factor)
+        taps = []
+        for frame_idx in range(num_frames):
+            position = (frame_idx - (factor - 1) / 2.0) / factor
+            k0 = min(max(int(math.floor(position)), 0), low_frames - 1)
+            k1 = min(k0 + 1, low_frames - 1)
+            taps.append((k0, k1, np.float32(min(max(position - k0, 0.0), 1.0))))
+        return taps
+
+    def _bandpass_level(self, data, fps, freq_low, freq_high, amplification):
+        """对一个金字塔层做时域带通：按self.temporal_filter和self.decimation选择FIR、降采样、窄带DFT或整段FFT"""
+        factor = 1
+        if self.temporal_filter != 'fir':
+            factor = planner.decimation_factor(fps, freq_high, data.shape[0], self.decimation)
+        if factor > 1:
+            return self.apply_temporal_bandpass_filter_decimated(data, fps, freq_low, freq_high,
+                                                                 amplification, factor)
+        return self._bandpass_full_rate(data, fps, freq_low, freq_high, amplification)
+
+    def _bandpass_full_rate(self, data, fps, freq_low, freq_high, amplification):
+        """不降采样的时域带通：FIR，或按频带bin数选择窄带DFT或整段FFT"""
+        if self.temporal_filter == 'fir':
+            return self.apply_temporal_bandpass_filter_fir(data, fps, freq_low, freq_high, amplification)
+        bins = np.flatnonzero(self._temporal_band_mask(data.shape[0], fps, freq_low, freq_high))
+        if planner.choose_temporal_filter(len(bins), self.temporal_filter) == 'narrowband':
+            return self.apply_temporal_bandpass_filter_narrowband(data, fps, freq_low, freq_high,
+                                                                  amplification, bins)
+        return self.apply_temporal_bandpass_filter_fft(data, fps, freq_low, freq_high, amplification)
+
+    @staticmethod
+    def _temporal_band_mask(num_frames, fps, freq_low, freq_high):
+        """rfft频率bin的带通掩码（True为保留）：保留最接近freq_low到最接近freq_high之前的bin
+
+        直流分量始终去除（否则会放大整帧亮度）。
+        """
+        frequencies = np.fft.rfftfreq(num_frames, d=1.0 / fps)
+
+        # 找到频率边界的索引
+        bound_low = (np.abs(frequencies - freq_low)).argmin()
+        bound_high = (np.abs(frequencies - freq_high)).argmin()
+
+        mask = np.zeros(len(frequencies), dtype=bool)
+        mask[max(bound_low, 1):bound_high] = True
+        return mask
+
+    def create_laplacian_video_pyramid(self, video_frames, levels=4, dtype=None):
+        """创建整个视频的拉普拉斯金字塔 - 参考库的正确实现
+
+        dtype为各层存储精度，默认取执行计划的精度（float32或float16）。
+        """
         print(f"构建拉普拉斯视频金字塔，层数: {levels}")
+        dtype = np.dtype(dtype or self.precision)
 
-        vid_pyramid = []
         frame_count = len(video_frames)
+        height, width = video_frames[0].shape[:2]
+        vid_pyramid = [np.empty((frame_count, h, w) + video_frames[0].shape[2:], dtype=dtype)
+                       for h, w in self.pyramid_shapes(height, width, levels)]
 
-        # 对每一帧构建金字塔
-        for frame_idx, frame in enumerate(video_frames):
-            frame_pyramid = self.build_laplacian_pyramid(frame, levels)
-
-            # 初始化金字塔结构
-            if frame_idx == 0:
-                for level in range(levels):
-                    h, w = frame_pyramid[level].shape[:2]
-                    vid_pyramid.append(np.zeros((frame_count, h, w, 3), dtype=np.float32))
+        tracker = self._track('pyramid', frame_count)
 
-            # 将当前帧的每层添加到对应的视频金字塔层
-            for level in range(levels):
-                vid_pyramid[level][frame_idx] = frame_pyramid[level]
+        # 每批帧直接写入各层数组
+        for start in range(0, frame_count, PYRAMID_BATCH_FRAMES):
+            self.cancel_token.raise_if_cancelled()
+            end = min(start + PYRAMID_BATCH_FRAMES, frame_count)
+            self.build_laplacian_pyramid_batch(video_frames[start:end], levels, out=vid_pyramid, start=start)
 
-            if (frame_idx + 1) % 50 == 0:
-                print(f"  已处理 {frame_idx + 1}/{frame_count} 帧")
+            tracker.update(end)
+            print(f"  已处理 {end}/{frame_count} 帧")
 
+        tracker.finish()
         return vid_pyramid
 
     def collapse_laplacian_pyramid(self, image_pyramid):
         """坍缩拉普拉斯金字塔为单张图像 - 参考库实现"""
-        # 从最粗糙的层开始
-        img = image_pyramid[-1].copy()
+        # 从最粗糙的层开始（float16存储的层需转换为float32供cv2使用）
+        img = image_pyramid[-1].astype(np.float32)
 
         # 逐层上采样并累加
         for level in range(len(image_pyramid) - 2, -1, -1):
@@ -390,8 +690,10 @@ class EulerianVideoMagnification:
         print("坍缩拉普拉斯视频金字塔...")
         frame_count = vid_pyramid[0].shape[0]
         result_frames = []
+        tracker = self._track('collapse', frame_count)
 
         for frame_idx in range(frame_count):
+            self.cancel_token.raise_if_cancelled()
             # 提取当前帧的所有金字塔层
             img_pyramid = [vid[frame_idx] for vid in vid_pyramid]
 
@@ -399,14 +701,19 @@ class EulerianVideoMagnification:
             collapsed = self.collapse_laplacian_pyramid(img_pyramid)
             result_frames.append(collapsed)
 
+            tracker.update(frame_idx + 1)
             if (frame_idx + 1) % 50 == 0:
                 print(f"  已坍缩 {frame_idx + 1}/{frame_count} 帧")
 
+        tracker.finish()
         return np.array(result_frames)
 
     def eulerian_magnification_correct(self, video_frames, fps, freq_low, freq_high,
-                                      amplification, levels=4, skip_levels_at_top=2):
-        """正确的欧拉视频放大实现 - 完全参考eulerian_magnification库"""
+                                      amplification, levels=4, skip_levels_at_top=2, clip=True):
+        """正确的欧拉视频放大实现 - 完全参考eulerian_magnification库
+
+        clip为False时不裁剪到[0, 1]（亮度通道放大在合成BGR后再裁剪）。
+        """
         print(f"\n=== 欧拉视频放大（正确实现） ===")
         print(f"帧数: {len(video_frames)}, FPS: {fps}")
         print(f"频率范围: {freq_low}-{freq_high} Hz")
@@ -414,30 +721,42 @@ class EulerianVideoMagnification:
         print(f"金字塔层数: {levels}, 跳过顶层: {skip_levels_at_top}")
 
         # 1. 构建拉普拉斯视频金字塔
-        vid_pyramid = self.create_laplacian_video_pyramid(video_frames, levels)
+        with self.profiler.stage('pyramid'):
+            vid_pyramid = self.create_laplacian_video_pyramid(video_frames, levels)
 
         # 2. 对每层金字塔进行时域带通滤波和放大
-        for level_idx in range(len(vid_pyramid)):
-            # 跳过顶层（噪声太多）和底层（高斯表示）
-            if level_idx < skip_levels_at_top or level_idx >= len(vid_pyramid) - 1:
-                print(f"  跳过第 {level_idx} 层")
-                continue
-
-            print(f"  处理第 {level_idx} 层...")
-
-            # 应用FFT带通滤波
-            bandpassed = self.apply_temporal_bandpass_filter_fft(
-                vid_pyramid[level_idx], fps, freq_low, freq_high, amplification
-            )
+        filter_levels = [idx for idx in range(len(vid_pyramid))
+                         if skip_levels_at_top <= idx < len(vid_pyramid) - 1]
+        tracker = self._track('filter', len(filter_levels), unit='level')
+        with self.profiler.stage('filter'):
+            for level_idx in range(len(vid_pyramid)):
+                # 跳过顶层（噪声太多）和底层（高斯表示）
+                if level_idx not in filter_levels:
+                    print(f"  跳过第 {level_idx} 层")
+                    continue
+
+                self.cancel_token.raise_if_cancelled()
+                print(f"  处理第 {level_idx} 层...")
+                tracker.update(tracker.done, detail=f"第 {level_idx} 层")
+
+                with self.profiler.stage(f'filter/level_{level_idx}'):
+                    # 应用FFT带通滤波
+                    bandpassed = self._bandpass_level(
+                        vid_pyramid[level_idx], fps, freq_low, freq_high, amplification
+                    )
 
-            # 将滤波后的信号加回原始金字塔层
-            vid_pyramid[level_idx] = vid_pyramid[level_idx] + bandpassed
+                    # 将滤波后的信号加回原始金字塔层
+                    vid_pyramid[level_idx] = vid_pyramid[level_idx] + bandpassed
+                tracker.update(advance=1)
+        tracker.finish()
 
         # 3. 坍缩金字塔重建视频
-        result_frames = self.collapse_laplacian_video_pyramid(vid_pyramid)
+        with self.profiler.stage('collapse'):
+            result_frames = self.collapse_laplacian_video_pyramid(vid_pyramid)
 
-        # 4. 裁剪到有效范围
-        result_frames = np.clip(result_frames, 0, 1)
+            # 4. 裁剪到有效范围
+            if clip:
+                result_frames = np.clip(result_frames, 0, 1)
 
         print("✅ 欧拉视频放大完成")
         return result_frames
@@ -512,6 +831,7 @@ class EulerianVideoMagnification:
             frame_batch = []
 
             while True:
+                self.cancel_token.raise_if_cancelled()
                 # 读取帧
                 ret, frame = cap.read()
                 if not ret:
@@ -610,7 +930,14 @@ class EulerianVideoMagnification:
                                 buf.clear()
 
         except KeyboardInterrupt:
-            print("\n用户中断处理")
+            print("\n用户中断处理，保留已写入的帧")
+        except ProcessingCancelled:
+            # 取消必须传给调用方：释放写入器后保留已写入的部分输出，再重新抛出
+            cap.release()
+            out.release()
+            print("\n处理已取消")
+            self._keep_partial_output(temp_video, self.output_path)
+            raise
         finally:
             cap.release()
             out.release()
@@ -686,6 +1013,9 @@ class EulerianVideoMagnification:
         }
 
         ext = format_extensions.get(output_format, 'mp4')
+        if self.keep_output_name:
+            self.output_path = f"{os.path.splitext(self.output_path)[0]}.{ext}"
+            return self.output_path
         filename = f"{base_name}_{timestamp}_{params}.{ext}"
 
         # 更新输出路径
@@ -694,6 +1024,55 @@ class EulerianVideoMagnification:
 
         return self.output_path
 
+    def _run_ffmpeg(self, cmd):
+        """运行FFmpeg，解析-progress输出上报编码进度，并在等待期间检查取消请求"""
+        import queue
+
+        # 在输出文件之前插入机器可读的进度输出参数
+        cmd = [cmd[0], '-progress', 'pipe:1', '-nostats', *cmd[1:]]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+        # 后台读取stdout/stderr避免管道阻塞
+        lines = queue.Queue()
+        stderr_chunks = []
+        stdout_reader = threading.Thread(target=lambda: [lines.put(line) for line in proc.stdout], daemon=True)
+        stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+        stdout_reader.start()
+        stderr_reader.start()
+
+        total = getattr(self, 'frames_written', None) or self.total_frames or 0
+        tracker = self._track('encode', total, detail='FFmpeg转码')
+        while proc.poll() is None or not lines.empty():
+            if self.cancel_token.cancelled:
+                proc.kill()
+                proc.wait()
+                raise ProcessingCancelled(self.cancel_token.reason or "用户取消")
+            try:
+                line = lines.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            key, _, value = line.strip().partition('=')
+            if key == 'frame' and value.isdigit():
+                tracker.update(int(value))
+
+        stdout_reader.join()
+        stderr_reader.join()
+        if proc.returncode == 0:
+            tracker.finish()
+        return subprocess.CompletedProcess(cmd, proc.returncode, '', ''.join(stderr_chunks))
+
+    def _keep_partial_output(self, temp_video_path, final_path):
+        """取消时保留已完整写入的临时视频段，否则删除临时文件"""
+        if not os.path.exists(temp_video_path):
+            return None
+        if self._validate_temp_video(temp_video_path):
+            partial_path = os.path.splitext(final_path)[0] + '_partial' + os.path.splitext(temp_video_path)[1]
+            os.replace(temp_video_path, partial_path)
+            print(f"已保留部分输出: {partial_path}")
+            return partial_path
+        os.remove(temp_video_path)
+        return None
+
     def _validate_temp_video(self, temp_video_path):
         """验证临时视频文件完整性"""
         try:
@@ -722,6 +1101,13 @@ class EulerianVideoMagnification:
     def save_video(self, temp_video_path, audio_source=None, output_format='mp4', mode='motion',
                    freq_low=0.4, freq_high=3.0, amplification=10):
         """保存最终视频（支持多种格式）"""
+        with self.profiler.stage('transcode'):
+            self._save_video(temp_video_path, audio_source, output_format, mode,
+                             freq_low, freq_high, amplification)
+
+    def _save_video(self, temp_video_path, audio_source, output_format, mode,
+                    freq_low, freq_high, amplification):
+        """FFmpeg转码为最终格式（save_video的实现）"""
 
         # 生成自定义文件名
         final_path = self.generate_output_filename(mode, freq_low, freq_high, amplification, output_format)
@@ -738,6 +1124,8 @@ class EulerianVideoMagnification:
         }
 
         try:
+            self.cancel_token.raise_if_cancelled()
+
             # 检测超高分辨率并添加FFmpeg优化参数
             is_ultra_high_res = hasattr(self, 'is_ultra_high_res') and self.is_ultra_high_res
             is_extreme_mode = hasattr(self, 'extreme_mode') and self.extreme_mode
@@ -804,7 +1192,7 @@ class EulerianVideoMagnification:
                     ]
 
             print(f"执行FFmpeg命令: {' '.join(cmd[:8])}...")  # 只显示前8个参数避免过长
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = self._run_ffmpeg(cmd)
 
             if result.returncode != 0:
                 print(f"FFmpeg错误: {result.stderr}")
@@ -824,7 +1212,7 @@ class EulerianVideoMagnification:
                             '-avoid_negative_ts', 'make_zero',
                             final_path
                         ]
-                        fallback_result = subprocess.run(fallback_cmd, capture_output=True, text=True)
+                        fallback_result = self._run_ffmpeg(fallback_cmd)
 
                         if fallback_result.returncode == 0:
                             print("✅ 备用转换成功")
@@ -853,6 +1241,12 @@ class EulerianVideoMagnification:
             if os.path.exists(temp_video_path):
                 os.remove(temp_video_path)
 
+        except ProcessingCancelled:
+            print("\n编码已取消，清理未完成的输出文件")
+            if os.path.exists(final_path):
+                os.remove(final_path)
+            self._keep_partial_output(temp_video_path, final_path)
+            raise
         except Exception as e:
             print(f"保存视频时出错: {e}")
             # 如果出错，尝试直接复制临时文件
@@ -869,39 +1263,130 @@ class EulerianVideoMagnification:
     # 保留旧的接口以兼容现有代码
     def load_video(self, max_frames=None):
         """加载视频帧到内存"""
+        with self.profiler.stage('decode'):
+            return self._load_video(max_frames)
+
+    def _load_video(self, max_frames=None):
+        """逐帧解码视频（load_video的实现）"""
         print(f"加载视频: {self.video_path}")
-        if max_frames and max_frames > 500:
-            print(f"⚠️ 帧数过多({max_frames})，强制限制为500帧以避免内存溢出")
-            max_frames = 500
+        if self.plan is not None:
+            # 帧数上限由执行计划决定
+            max_load = min(max_frames or self.plan.frames, self.plan.frames)
+        else:
+            if max_frames and max_frames > 500:
+                print(f"⚠️ 帧数过多({max_frames})，强制限制为500帧以避免内存溢出（可先调用plan_execution）")
+                max_frames = 500
+            max_load = max_frames if max_frames else min(500, self.total_frames)
 
         cap = cv2.VideoCapture(self.video_path)
-        frames = []
-        frame_count = 0
-        max_load = max_frames if max_frames else min(500, self.total_frames)
+        try:
+            frames = self._read_frames(cap, max_load)
+        finally:
+            cap.release()
+        print(f"✅ 加载完成: {len(frames)} 帧")
+        return frames
+
+    def _read_frames(self, cap, count, dtype=np.float32, crop=None):
+        """从已打开的capture顺序读取最多count帧到预分配数组
 
-        while True:
+        dtype为float32时归一化到[0, 1]，为uint8时保留原始像素；
+        crop=(x0, y0, x1, y1)时只保存该区域，为区域列表时返回对应的数组列表
+        （镜头切换检测仍使用整帧）。
+        """
+        crops = crop if isinstance(crop, list) else [crop or (0, 0, self.width, self.height)]
+        arrays = [np.empty((count, y1 - y0, x1 - x0, 3), dtype=dtype) for x0, y0, x1, y1 in crops]
+        frame_count = 0
+        tracker = self._track('decode', count)
+        while frame_count < count:
+            self.cancel_token.raise_if_cancelled()
             ret, frame = cap.read()
-            if not ret or frame_count >= max_load:
+            if not ret:
                 break
-            frame = frame.astype(np.float32) / 255.0
-            frames.append(frame)
+            if self.scene_detector is not None:
+                self.scene_detector.update(frame)
+            for (x0, y0, x1, y1), frames in zip(crops, arrays):
+                if dtype == np.uint8:
+                    frames[frame_count] = frame[y0:y1, x0:x1]
+                else:
+                    np.divide(frame[y0:y1, x0:x1], 255.0, out=frames[frame_count], casting='unsafe')
             frame_count += 1
 
+            tracker.update(frame_count)
             if frame_count % 50 == 0:
-                print(f"  已加载 {frame_count}/{max_load} 帧")
+                print(f"  已加载 {frame_count}/{count} 帧")
+        tracker.finish()
+        arrays = [frames[:frame_count] for frames in arrays]
+        return arrays if isinstance(crop, list) else arrays[0]
+
+    def iter_frames(self, size=None, max_frames=None):
+        """逐帧产生uint8 BGR帧；size=(宽, 高)时产生缩小的帧
+
+        有FFmpeg时由其在解码端缩放（面积插值）并通过管道输出原始像素，
+        避免把全分辨率帧转换为numpy数组；否则用OpenCV解码后缩小。
+        """
+        import shutil
+        if size is not None and shutil.which('ffmpeg'):
+            width, height = size
+            cmd = ['ffmpeg', '-v', 'error', '-i', self.video_path,
+                   '-vf', f'scale={width}:{height}:flags=area', '-an']
+            if max_frames is not None:
+                cmd += ['-frames:v', str(max_frames)]
+            cmd += ['-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1']
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            frame_bytes = width * height * 3
+            try:
+                while True:
+                    data = proc.stdout.read(frame_bytes)
+                    if len(data) < frame_bytes:
+                        break
+                    yield np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+            finally:
+                proc.kill()
+                proc.wait()
+            return
 
-        cap.release()
-        print(f"✅ 加载完成: {len(frames)} 帧")
-        return np.array(frames)
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            count = 0
+            while max_frames is None or count < max_frames:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if size is not None:
+                    frame = cv2.resize(frame, tuple(size), interpolation=cv2.INTER_AREA)
+                yield frame
+                count += 1
+        finally:
+            cap.release()
 
     def magnify_motion(self, frames, fps, freq_low=0.4, freq_high=3.0,
                        amplification=10, levels=4, skip_levels_at_top=2):
         """运动放大 - 使用正确的欧拉视频放大算法"""
         print(f"\n=== 运动放大 ===")
+        if self.luma_only:
+            return self._magnify_luma(frames, fps, freq_low, freq_high, amplification, levels,
+                                      skip_levels_at_top)
         return self.eulerian_magnification_correct(
             frames, fps, freq_low, freq_high, amplification, levels, skip_levels_at_top
         )
 
+    def _magnify_luma(self, frames, fps, freq_low, freq_high, amplification, levels, skip_levels_at_top):
+        """亮度通道运动放大：只对YCrCb的Y通道构建金字塔和滤波，再把放大后的亮度增量加回每一帧
+
+        YCrCb到BGR的逆变换中Y的系数均为1，在YCrCb中修改Y再转换回BGR
+        等价于把亮度增量同时加到B、G、R上，色度保持不变。
+        """
+        print("仅亮度通道（Y）")
+        luma = np.empty(frames.shape[:3], dtype=np.float32)
+        for index, frame in enumerate(frames):
+            cv2.cvtColor(frame.astype(np.float32, copy=False), cv2.COLOR_BGR2GRAY, dst=luma[index])
+        delta = self.eulerian_magnification_correct(luma, fps, freq_low, freq_high, amplification,
+                                                    levels, skip_levels_at_top, clip=False)
+        delta -= luma
+        del luma
+        result = frames + delta[..., np.newaxis]
+        return np.clip(result, 0, 1, out=result)
+
     def magnify_color(self, frames, fps, freq_low=0.4, freq_high=3.0,
                      amplification=20, levels=4, skip_levels_at_top=2):
         """色彩放大 - 使用正确的欧拉视频放大算法"""
@@ -911,31 +1396,809 @@ class EulerianVideoMagnification:
             frames, fps, freq_low, freq_high, amplification, levels, skip_levels_at_top
         )
 
-    def save_video_from_frames(self, frames, audio_source=None, output_format='mp4', mode='motion',
-                              freq_low=0.4, freq_high=3.0, amplification=10):
-        """从帧数组保存视频"""
-        print(f"\n保存视频...")
+    def magnify_by_mode(self, frames, fps, mode='motion', freq_low=0.4, freq_high=3.0,
+                        amplification=10, levels=4, skip_levels_at_top=2):
+        """按模式放大（motion / color / hybrid）"""
+        if mode == 'motion':
+            return self.magnify_motion(frames, fps, freq_low, freq_high, amplification,
+                                       levels, skip_levels_at_top)
+        if mode == 'color':
+            return self.magnify_color(frames, fps, freq_low, freq_high, amplification,
+                                      levels, skip_levels_at_top)
+
+        print("\n=== 混合模式 ===")
+        # 先运动放大，再色彩放大
+        motion_frames = self.magnify_motion(frames, fps, freq_low, freq_high, amplification * 0.7,
+                                            levels, skip_levels_at_top)
+        return self.magnify_color(motion_frames, fps, freq_low, freq_high, amplification * 1.5,
+                                  levels, skip_levels_at_top)
+
+    def _magnify_block(self, frames, mode, freq_low, freq_high, amplification, levels,
+                       skip_levels_at_top, blend=1.0, start=0):
+        """放大一段帧（整段、时间块或空间块）并与原始帧混合
+
+        start为该段第一帧在视频中的帧号；检测到镜头切换时各段独立处理。
+        """
+        cuts = []
+        if self.split_scenes and self.scene_detector is not None:
+            cuts = [cut - start for cut in self.scene_detector.cuts(self.fps, freq_low, start, start + len(frames))]
+        if cuts:
+            processed = self._magnify_segments(frames, cuts, mode, freq_low, freq_high, amplification,
+                                               levels, skip_levels_at_top)
+        else:
+            processed = self.magnify_by_mode(frames, self.fps, mode, freq_low, freq_high, amplification,
+                                             levels, skip_levels_at_top)
+        if blend < 1.0:
+            print(f"\n混合原始视频，比例: {blend}")
+            processed = processed * blend + frames * (1 - blend)
+            processed = np.clip(processed, 0, 1)
+        return processed
+
+    def _magnify_segments(self, frames, cuts, mode, freq_low, freq_high, amplification, levels,
+                          skip_levels_at_top):
+        """在镜头切换处分段，各段在线程池中独立放大后按顺序拼接"""
+        import copy
+        from concurrent.futures import as_completed
+
+        bounds = segment_bounds(len(frames), cuts)
+        print(f"\n检测到 {len(cuts)} 个镜头切换，分为 {len(bounds)} 段独立处理: "
+              + ", ".join(f"{s}-{e - 1}" for s, e in bounds))
+
+        def magnify_segment(bound):
+            # 每段使用独立的处理器副本，避免线程间共享分析器和进度状态
+            worker = copy.copy(self)
+            worker.profiler = NullProfiler()
+            worker.progress_listener = None
+            worker.executor = None
+            segment_start, segment_end = bound
+            return worker.magnify_by_mode(frames[segment_start:segment_end], self.fps, mode, freq_low,
+                                          freq_high, amplification, levels, skip_levels_at_top)
+
+        result = np.empty(frames.shape, dtype=np.float32)
+        tracker = self._track('filter', len(bounds), unit='segment', detail='分段处理')
+        self._init_executor()
+        with self.profiler.stage('filter'):
+            futures = {self.executor.submit(magnify_segment, bound): bound for bound in bounds}
+            try:
+                for future in as_completed(futures):
+                    segment_start, segment_end = futures[future]
+                    result[segment_start:segment_end] = future.result()
+                    tracker.update(advance=1)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        tracker.finish()
+        return result
+
+    def plan_execution(self, mode='motion', freq_low=0.4, levels=4, skip_levels_at_top=2,
+                       max_frames=None, memory_budget_bytes=None, strategy=None, use_calibration=True,
+                       freq_high=None, decimation='auto', temporal_filter='auto', roi=None):
+        """根据视频信息和可用内存生成执行计划并保存到self.plan
+
+        指定roi（core.roi.RegionOfInterest或其列表）时按加边距后的裁剪区域规划
+        （多个区域时按总像素数规划）。
+        """
+        if self.fps is None:
+            self.get_video_info()
+        frames = min(max_frames, self.total_frames) if max_frames else self.total_frames
+        rois = self._prepare_rois(roi, levels)
+        width, height = plan_size(rois, self.width, self.height, levels)
+        self.plan = planner.plan_execution(
+            width, height, frames, self.fps, levels=levels, mode=mode, freq_low=freq_low,
+            skip_levels_at_top=skip_levels_at_top, memory_budget_bytes=memory_budget_bytes,
+            use_calibration=use_calibration, strategy=strategy, freq_high=freq_high, decimation=decimation,
+            temporal_filter=temporal_filter
+        )
+        if rois:
+            self.plan.notes.append(plan_note(rois, width, height, self.width, self.height))
+        self.precision = self.plan.precision
+        self.decimation = self.plan.decimation
+        self.temporal_filter = self.plan.temporal_filter
+        self.fir_taps = self.plan.fir_taps
+        self.buffer_size = min(self.buffer_size, self.plan.buffer_size)
+        return self.plan
+
+    def render(self, mode='motion', freq_low=0.4, freq_high=3.0, amplification=10, levels=4,
+               skip_levels_at_top=2, blend=1.0, audio_source=None, output_format='mp4',
+               max_frames=None, plan=None, split_scenes=True, luma_only=False, roi=None):
+        """按执行计划完成 解码 -> 放大 -> 编码 的完整流程，返回最终输出路径
+
+        split_scenes为True时在镜头切换处分段处理（整段、时间分块和空间分块策略）；
+        luma_only为True时运动放大只处理亮度通道；
+        roi（core.roi.RegionOfInterest或其列表）只处理这些区域，计划应由plan_execution(roi=roi)生成。
+        """
+        with np.errstate(**AMPLIFY_ERRSTATE):
+            return self._render(mode, freq_low, freq_high, amplification, levels, skip_levels_at_top, blend,
+                                audio_source, output_format, max_frames, plan, split_scenes, luma_only, roi)
+
+    def _render(self, mode, freq_low, freq_high, amplification, levels, skip_levels_at_top, blend,
+                audio_source, output_format, max_frames, plan, split_scenes, luma_only, roi):
+        """渲染流程（render的实现）"""
+        if self.fps is None:
+            self.get_video_info()
+        self.split_scenes = split_scenes
+        self.luma_only = luma_only
+        self.scene_detector = SceneCutDetector() if split_scenes else None
+        if plan is not None:
+            self.plan = plan
+            self.precision = plan.precision
+            self.decimation = plan.decimation
+            self.temporal_filter = plan.temporal_filter
+            self.fir_taps = plan.fir_taps
+        elif self.plan is None:
+            self.plan_execution(mode, freq_low, levels, skip_levels_at_top, max_frames, freq_high=freq_high,
+                                roi=roi)
+        print(f"\n{self.plan.describe()}")
+
+        args = (mode, freq_low, freq_high, amplification, levels, skip_levels_at_top, blend)
+        rois = self._prepare_rois(roi, levels)
+        if rois:
+            if self.plan.strategy != 'in_memory':
+                raise ValueError(f"ROI处理只支持整段内存策略（当前计划: {self.plan.strategy}），请缩小ROI或减少帧数")
+            self._render_roi(*args, rois, audio_source, output_format)
+        elif self.plan.strategy == 'chunked':
+            self._render_chunked(*args, audio_source, output_format)
+        elif self.plan.strategy in ('tiled', 'out_of_core'):
+            self._render_tiled(*args, audio_source, output_format)
+        elif self.plan.strategy == 'two_pass':
+            self._render_two_pass(*args, audio_source, output_format)
+        elif self.plan.strategy == 'streaming':
+            self._render_streaming(*args, audio_source, output_format)
+        else:
+            frames = self.load_video(max_frames=self.plan.frames)
+            processed = self._magnify_block(frames, *args)
+            del frames
+            self.save_video_from_frames(processed, audio_source=audio_source, output_format=output_format,
+                                        mode=mode, freq_low=freq_low, freq_high=freq_high,
+                                        amplification=amplification)
+        return self.output_path
+
+    def _prepare_rois(self, roi, levels):
+        """ROI裁剪到画面内，并合并羽化区域会重叠的ROI"""
+        return prepare_rois(roi, self.width, self.height, levels)
+
+    def _render_roi(self, mode, freq_low, freq_high, amplification, levels, skip_levels_at_top,
+                    blend, rois, audio_source, output_format):
+        """ROI处理：第一遍只保存各ROI加边距的裁剪区域并分别放大，第二遍重新解码，把放大增量按羽化权重合成回整帧
+
+        金字塔和时域滤波只在裁剪区域上进行，ROI外的像素原样写出。
+        """
+        bounds = [roi.crop_bounds(self.width, self.height, levels) for roi in rois]
+        weights = [roi.blend_weights(crop, levels) for roi, crop in zip(rois, bounds)]
+        for roi, (x0, y0, x1, y1) in zip(rois, bounds):
+            print(f"\n只处理{roi.describe()}，裁剪区域 {x1 - x0}x{y1 - y0}（原始 {self.width}x{self.height}）")
+
+        with self.profiler.stage('decode'):
+            cap = cv2.VideoCapture(self.video_path)
+            try:
+                originals = self._read_frames(cap, self.plan.frames, crop=bounds)
+            finally:
+                cap.release()
+        count = len(originals[0])
+        if count == 0:
+            raise ValueError("无法读取视频帧")
+        processed = [self._magnify_block(crop, mode, freq_low, freq_high, amplification, levels,
+                                         skip_levels_at_top, blend) for crop in originals]
 
-        # 生成输出文件名
         final_path = self.generate_output_filename(mode, freq_low, freq_high, amplification, output_format)
+        out, temp_video = self._open_temp_writer(final_path)
+        cap = cv2.VideoCapture(self.video_path)
+        tracker = self._track('encode', count, detail='合成ROI')
+        written = 0
+        try:
+            while written < count:
+                self.cancel_token.raise_if_cancelled()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                with self.profiler.stage('encode'):
+                    for index in range(len(rois)):
+                        composite(frame, originals[index][written], processed[index][written], bounds[index],
+                                  weights[index])
+                    out.write(frame)
+                written += 1
+                tracker.update(written)
+        except ProcessingCancelled:
+            out.release()
+            print("\nROI处理已取消")
+            self._keep_partial_output(temp_video, final_path)
+            raise
+        finally:
+            # 其他异常（合成或写入失败）同样释放写入器，不留下打开的临时文件句柄
+            cap.release()
+            out.release()
+        tracker.finish()
+        self.frames_written = written
+        print(f"✅ 临时视频已创建: {temp_video} ({written} 帧)")
+        self.save_video(temp_video, audio_source=audio_source, output_format=output_format, mode=mode,
+                        freq_low=freq_low, freq_high=freq_high, amplification=amplification)
+
+    def _render_chunked(self, mode, freq_low, freq_high, amplification, levels, skip_levels_at_top,
+                        blend, audio_source, output_format):
+        """时间分块处理：相邻块交叠chunk_overlap帧，交叠区线性交叉淡化后写出"""
+        total = self.plan.frames
+        chunk = max(1, min(self.plan.chunk_frames, total))
+        overlap = min(self.plan.chunk_overlap, chunk - 1)
+        # 均衡各块长度，避免最后一块过短
+        num_chunks = max(1, math.ceil((total - overlap) / max(1, chunk - overlap)))
+        stride = math.ceil((total - overlap) / num_chunks)
 
-        # 创建临时视频文件
+        final_path = self.generate_output_filename(mode, freq_low, freq_high, amplification, output_format)
+        out, temp_video = self._open_temp_writer(final_path)
+        cap = cv2.VideoCapture(self.video_path)
+        tracker = self._track('encode', total, detail='写入临时文件')
+        written = 0
+        raw_tail = None
+        processed_tail = None
+        try:
+            for index in range(num_chunks):
+                print(f"\n--- 时间块 {index + 1}/{num_chunks} ---")
+                start = index * stride
+                end = total if index == num_chunks - 1 else min(total, start + stride + overlap)
+                # 交叠部分复用上一块末尾的原始帧，只解码新帧
+                new_frames = self._read_frames(cap, end - start - (0 if raw_tail is None else len(raw_tail)))
+                frames = new_frames if raw_tail is None else np.concatenate([raw_tail, new_frames])
+                if len(frames) == 0:
+                    break
+                processed = self._magnify_block(frames, mode, freq_low, freq_high, amplification,
+                                                levels, skip_levels_at_top, blend, start=start)
+
+                if processed_tail is not None:
+                    n = len(processed_tail)
+                    weights = (np.arange(1, n + 1, dtype=np.float32) / (n + 1))[:, None, None, None]
+                    processed[:n] = processed_tail * (1 - weights) + processed[:n] * weights
+
+                last = index == num_chunks - 1 or len(new_frames) < end - start - (0 if raw_tail is None else len(raw_tail))
+                keep = 0 if last else overlap
+                with self.profiler.stage('encode'):
+                    for frame in processed[:len(processed) - keep]:
+                        self.cancel_token.raise_if_cancelled()
+                        out.write(self._to_uint8(frame))
+                        written += 1
+                        tracker.update(written)
+                raw_tail = frames[len(frames) - keep:].copy() if keep else None
+                processed_tail = processed[len(processed) - keep:].copy() if keep else None
+                if last:
+                    break
+        except ProcessingCancelled:
+            out.release()
+            print("\n分块处理已取消")
+            self._keep_partial_output(temp_video, final_path)
+            raise
+        finally:
+            cap.release()
+
+        out.release()
+        tracker.finish()
+        self.frames_written = written
+        print(f"✅ 临时视频已创建: {temp_video} ({written} 帧)")
+        self.save_video(temp_video, audio_source=audio_source, output_format=output_format, mode=mode,
+                        freq_low=freq_low, freq_high=freq_high, amplification=amplification)
+
+    def _render_tiled(self, mode, freq_low, freq_high, amplification, levels, skip_levels_at_top,
+                      blend, audio_source, output_format):
+        """空间分块处理：uint8帧常驻内存（out_of_core时为磁盘memmap），逐块处理完整时间序列"""
+        import tempfile
+        import shutil
+
+        tile_w, tile_h = self.plan.tile_size
+        margin = self.plan.tile_margin
+        work_dir = None
+        try:
+            cap = cv2.VideoCapture(self.video_path)
+            if self.plan.strategy == 'out_of_core':
+                work_dir = tempfile.mkdtemp(prefix='evm_', dir=os.path.dirname(os.path.abspath(self.output_path)))
+                print(f"外存处理，临时目录: {work_dir}")
+                shape = (self.plan.frames, self.height, self.width, 3)
+                source = np.lib.format.open_memmap(os.path.join(work_dir, 'source.npy'), mode='w+',
+                                                   dtype=np.uint8, shape=shape)
+                count = 0
+                tracker = self._track('decode', self.plan.frames)
+                while count < self.plan.frames:
+                    self.cancel_token.raise_if_cancelled()
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    source[count] = frame
+                    if self.scene_detector is not None:
+                        self.scene_detector.update(frame)
+                    count += 1
+                    tracker.update(count)
+                tracker.finish()
+                source = source[:count]
+                result = np.lib.format.open_memmap(os.path.join(work_dir, 'result.npy'), mode='w+',
+                                                   dtype=np.uint8, shape=source.shape)
+            else:
+                source = self._read_frames(cap, self.plan.frames, dtype=np.uint8)
+                result = np.empty_like(source)
+            cap.release()
+
+            tiles = [(y, x) for y in range(0, self.height, tile_h) for x in range(0, self.width, tile_w)]
+            for index, (y0, x0) in enumerate(tiles):
+                self.cancel_token.raise_if_cancelled()
+                y1, x1 = min(y0 + tile_h, self.height), min(x0 + tile_w, self.width)
+                py0, px0 = max(0, y0 - margin), max(0, x0 - margin)
+                py1, px1 = min(self.height, y1 + margin), min(self.width, x1 + margin)
+                print(f"\n--- 空间块 {index + 1}/{len(tiles)}: ({x0}, {y0}) {x1 - x0}x{y1 - y0} ---")
+
+                block = source[:, py0:py1, px0:px1].astype(np.float32) / 255.0
+                processed = self._magnify_block(block, mode, freq_low, freq_high, amplification,
+                                                levels, skip_levels_at_top, blend)
+                del block
+                result[:, y0:y1, x0:x1] = self._to_uint8(processed[:, y0 - py0:y1 - py0, x0 - px0:x1 - px0])
+                del processed
+
+            del source
+            self.save_video_from_frames(result, audio_source=audio_source, output_format=output_format,
+                                        mode=mode, freq_low=freq_low, freq_high=freq_high,
+                                        amplification=amplification)
+        finally:
+            if work_dir is not None:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _render_two_pass(self, mode, freq_low, freq_high, amplification, levels, skip_levels_at_top,
+                         blend, audio_source, output_format):
+        """两遍处理：第一遍只累积滤波层（按时间降采样）并原地滤波，第二遍重新解码逐帧合成输出
+
+        金字塔坍缩是线性的，输出 = 原帧 + 坍缩(带通增量)，与eulerian_magnification_correct一致。
+        """
+        import tempfile
+        import shutil
+
+        if mode == 'hybrid':
+            raise ValueError("两遍处理不支持混合模式")
+        filter_levels = [idx for idx in range(levels) if skip_levels_at_top <= idx < levels - 1]
+        if not filter_levels:
+            raise ValueError("没有需要滤波的金字塔层，请增加层数或减少跳过的顶层数量")
+        total = self.plan.frames
+        factor = 1 if self.temporal_filter == 'fir' else planner.decimation_factor(self.fps, freq_high, total,
+                                                                                 self.decimation)
+        stored_frames = -(-total // factor)
+
+        shapes = [(self.height, self.width)]
+        for _ in range(filter_levels[-1]):
+            height, width = shapes[-1]
+            shapes.append(((height + 1) // 2, (width + 1) // 2))
+        luma = self.luma_only and mode == 'motion'
+        channels = () if luma else (3,)
+
+        work_dir = None
+        try:
+            if self.plan.spill_to_disk:
+                work_dir = tempfile.mkdtemp(prefix='evm_', dir=os.path.dirname(os.path.abspath(self.output_path)))
+                print(f"滤波层存放于磁盘，临时目录: {work_dir}")
+            store = {}
+            for idx in filter_levels:
+                shape = (stored_frames,) + shapes[idx] + channels
+                if work_dir is not None:
+                    store[idx] = np.lib.format.open_memmap(os.path.join(work_dir, f'level_{idx}.npy'),
+                                                           mode='w+', dtype=np.float32, shape=shape)
+                else:
+                    store[idx] = np.zeros(shape, dtype=np.float32)
+
+            # 第一遍：解码并累积滤波层（每factor帧取均值）
+            print(f"\n--- 第一遍: 累积 {len(filter_levels)} 个滤波层"
+                  f"{f'，时间降采样 {factor}x' if factor > 1 else ''} ---")
+            cap = cv2.VideoCapture(self.video_path)
+            count = 0
+            tracker = self._track('pyramid', total)
+            try:
+                with self.profiler.stage('pyramid'):
+                    while count < total:
+                        self.cancel_token.raise_if_cancelled()
+                        ret, frame = cap.read()
+                        if not ret:
+                            break
+                        bands = self._filter_level_bands(frame, filter_levels, luma)
+                        slot = count // factor
+                        for idx in filter_levels:
+                            if count % factor:
+                                store[idx][slot] += bands[idx]
+                            else:
+                                store[idx][slot] = bands[idx]
+                        count += 1
+                        tracker.update(count)
+            finally:
+                cap.release()
+            tracker.finish()
+            if count == 0:
+                raise ValueError("无法读取视频帧")
+            stored_frames = -(-count // factor)
+            last_block = count - (stored_frames - 1) * factor
+            for idx in filter_levels:
+                store[idx] = store[idx][:stored_frames]
+                if factor > 1:
+                    store[idx][:-1] /= factor
+                    store[idx][-1] /= last_block
+
+            # 原地滤波：时域滤波对每个像素独立，按行条带处理以限制临时内存
+            with self.profiler.stage('filter'):
+                strip_budget = max(self.plan.budget_mb * 0.25 * 1024 * 1024, 64 * 1024 * 1024)
+                for idx in filter_levels:
+                    level = store[idx]
+                    row_bytes = stored_frames * level.shape[2] * int(np.prod(channels)) * 4 * 6
+                    rows = max(1, int(strip_budget // max(row_bytes, 1)))
+                    print(f"  处理第 {idx} 层: {level.shape[2]}x{level.shape[1]}, 每条带 {rows} 行")
+                    for row in range(0, level.shape[1], rows):
+                        self.cancel_token.raise_if_cancelled()
+                        strip = np.ascontiguousarray(level[:, row:row + rows])
+                        if factor > 1:
+                            level[:, row:row + rows] = self._decimated_band(strip, self.fps, freq_low, freq_high,
+                                                                            amplification, factor)
+                        else:
+                            level[:, row:row + rows] = self._bandpass_full_rate(strip, self.fps, freq_low,
+                                                                                freq_high, amplification)
+
+            # 第二遍：重新解码，逐帧插值增量、坍缩并写出
+            print("\n--- 第二遍: 重新解码并合成输出 ---")
+            final_path = self.generate_output_filename(mode, freq_low, freq_high, amplification, output_format)
+            out, temp_video = self._open_temp_writer(final_path)
+            taps = self._interpolation_taps(count, factor) if factor > 1 else None
+            cap = cv2.VideoCapture(self.video_path)
+            tracker = self._track('collapse', count)
+            written = 0
+            try:
+                while written < count:
+                    self.cancel_token.raise_if_cancelled()
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    with self.profiler.stage('collapse'):
+                        delta = None
+                        for idx in range(filter_levels[-1], -1, -1):
+                            if delta is not None:
+                                height, width = shapes[idx]
+                                delta = cv2.pyrUp(delta, dstsize=(width, height))
+                            if idx not in store:
+                                continue
+                            if taps is None:
+                                band = store[idx][written]
+                            else:
+                                k0, k1, weight = taps[written]
+                                band = store[idx][k0] * (1 - weight) + store[idx][k1] * weight
+                            delta = band if delta is None else delta + band
+                        if luma:
+                            delta = delta[..., np.newaxis]
+                        source = frame.astype(np.float32) / 255.0
+                        processed = np.clip(source + delta, 0, 1)
+                        if blend < 1.0:
+                            processed = np.clip(processed * blend + source * (1 - blend), 0, 1)
+                    with self.profiler.stage('encode'):
+                        out.write(self._to_uint8(processed))
+                    written += 1
+                    tracker.update(written)
+            except ProcessingCancelled:
+                out.release()
+                print("\n两遍处理已取消")
+                self._keep_partial_output(temp_video, final_path)
+                raise
+            finally:
+                cap.release()
+            out.release()
+            tracker.finish()
+            self.frames_written = written
+            print(f"✅ 临时视频已创建: {temp_video} ({written} 帧)")
+        finally:
+            store = None
+            if work_dir is not None:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        self.save_video(temp_video, audio_source=audio_source, output_format=output_format, mode=mode,
+                        freq_low=freq_low, freq_high=freq_high, amplification=amplification)
+
+    def _render_streaming(self, mode, freq_low, freq_high, amplification, levels, skip_levels_at_top,
+                          blend, audio_source, output_format):
+        """流式FIR处理：逐帧构建滤波层送入按块卷积的FIR，输出延迟 (taps-1)/2 帧
+
+        内存只包含每个滤波层的滑动窗口和延迟期间的uint8原帧，结果与整段FIR滤波一致。
+        """
+        if mode == 'hybrid':
+            raise ValueError("流式处理不支持混合模式")
+        filter_levels = [idx for idx in range(levels) if skip_levels_at_top <= idx < levels - 1]
+        if not filter_levels:
+            raise ValueError("没有需要滤波的金字塔层，请增加层数或减少跳过的顶层数量")
+        total = self.plan.frames
+        num_taps = self._fir_num_taps(self.fps, freq_low, freq_high, total)
+        taps = fir.design_bandpass(self.fps, freq_low, freq_high, num_taps) * np.float32(amplification)
+
+        shapes = [(self.height, self.width)]
+        for _ in range(filter_levels[-1]):
+            height, width = shapes[-1]
+            shapes.append(((height + 1) // 2, (width + 1) // 2))
+        luma = self.luma_only and mode == 'motion'
+        channels = () if luma else (3,)
+        filters = {idx: fir.StreamingFIR(taps, shapes[idx] + channels) for idx in filter_levels}
+        print(f"\n流式FIR: {num_taps} 抽头, 输出延迟 {(num_taps - 1) // 2} 帧, 块大小 {filters[filter_levels[0]].block} 帧")
+
+        final_path = self.generate_output_filename(mode, freq_low, freq_high, amplification, output_format)
+        out, temp_video = self._open_temp_writer(final_path)
+        cap = cv2.VideoCapture(self.video_path)
+        # 等待滤波输出的原帧（uint8）
+        pending = deque()
+        tracker = self._track('encode', total, detail='流式写入')
+        written = 0
+
+        def write_outputs(outputs):
+            nonlocal written
+            for level_frames in zip(*(outputs[idx] for idx in filter_levels)):
+                bands = dict(zip(filter_levels, level_frames))
+                delta = None
+                for idx in range(filter_levels[-1], -1, -1):
+                    if delta is not None:
+                        height, width = shapes[idx]
+                        delta = cv2.pyrUp(delta, dstsize=(width, height))
+                    if idx in bands:
+                        delta = bands[idx] if delta is None else delta + bands[idx]
+                if luma:
+                    delta = delta[..., np.newaxis]
+                source = pending.popleft().astype(np.float32) / 255.0
+                processed = np.clip(source + delta, 0, 1)
+                if blend < 1.0:
+                    processed = np.clip(processed * blend + source * (1 - blend), 0, 1)
+                with self.profiler.stage('encode'):
+                    out.write(self._to_uint8(processed))
+                written += 1
+                tracker.update(written)
+
+        try:
+            count = 0
+            while count < total:
+                self.cancel_token.raise_if_cancelled()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                pending.append(frame)
+                count += 1
+                with self.profiler.stage('filter'):
+                    bands = self._filter_level_bands(frame, filter_levels, luma)
+                    outputs = {idx: filters[idx].push(bands[idx]) for idx in filter_levels}
+                write_outputs(outputs)
+            with self.profiler.stage('filter'):
+                outputs = {idx: filters[idx].finish() for idx in filter_levels}
+            write_outputs(outputs)
+        except ProcessingCancelled:
+            out.release()
+            print("\n流式处理已取消")
+            self._keep_partial_output(temp_video, final_path)
+            raise
+        finally:
+            cap.release()
+
+        out.release()
+        tracker.finish()
+        self.frames_written = written
+        print(f"✅ 临时视频已创建: {temp_video} ({written} 帧)")
+        self.save_video(temp_video, audio_source=audio_source, output_format=output_format, mode=mode,
+                        freq_low=freq_low, freq_high=freq_high, amplification=amplification)
+
+    def _filter_level_bands(self, frame, filter_levels, luma=False):
+        """单帧只计算需要滤波的拉普拉斯层（与build_laplacian_pyramid的对应层一致）
+
+        luma为True时只计算亮度通道（与_magnify_luma一致）。
+        """
+        frame = frame.astype(np.float32) / 255.0
+        if luma:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gaussian = self.build_gaussian_pyramid(frame, filter_levels[-1] + 2)
+        bands = {}
+        for idx in filter_levels:
+            size = (gaussian[idx].shape[1], gaussian[idx].shape[0])
+            bands[idx] = gaussian[idx] - cv2.pyrUp(gaussian[idx + 1], dstsize=size)
+        return bands
+
+    def sweep(self, frames, fps, grid, levels=4, skip_levels_at_top=2, mode='motion',
+              audio_source=None, output_format='mp4', contact_sheet=False, sheet_width=1920,
+              blend=1.0, luma_only=False):
+        """参数扫描：一次解码、一次金字塔、一次正向FFT，为grid中每个(freq_low, freq_high, amplification)输出一个视频
+
+        带通滤波和金字塔坍缩都是线性的，因此每个频带只需 掩码 + 逆FFT + 坍缩增量 一次，
+        同一频带的不同放大倍数只是对增量视频的缩放。
+        混合模式是两次串联放大，无法共享一次正向FFT，因此不支持。
+        blend和luma_only与render相同；解码时检测到镜头切换（self.scene_detector）时各段独立做FFT，
+        切换点按网格中的最低频率确定。重复的网格点只输出一次。
+        返回 {'outputs': [(freq_low, freq_high, amplification, 路径), ...], 'contact_sheet': 路径或None}
+        """
+        with np.errstate(**AMPLIFY_ERRSTATE):
+            return self._sweep(frames, fps, grid, levels, skip_levels_at_top, mode, audio_source, output_format,
+                               contact_sheet, sheet_width, blend, luma_only)
+
+    def _sweep(self, frames, fps, grid, levels, skip_levels_at_top, mode, audio_source, output_format,
+               contact_sheet, sheet_width, blend, luma_only):
+        """参数扫描（sweep的实现）"""
+        if mode not in ('motion', 'color'):
+            raise ValueError("参数扫描只支持motion和color模式")
+        points = [(float(fl), float(fh), float(amp)) for fl, fh, amp in grid]
+        grid = list(dict.fromkeys(points))
+        if not grid:
+            raise ValueError("参数网格为空")
+        if len(grid) < len(points):
+            print(f"⚠️ 忽略 {len(points) - len(grid)} 个重复的网格点")
+
+        print(f"\n=== 参数扫描: {len(grid)} 个变体 ===")
+        num_frames = len(frames)
+        # 亮度通道运动放大：只对Y构建金字塔，增量加回每个通道（同magnify_motion）
+        luma = luma_only and mode == 'motion'
+        source = frames
+        if luma:
+            print("仅亮度通道（Y）")
+            source = np.empty(frames.shape[:3], dtype=np.float32)
+            for index, frame in enumerate(frames):
+                cv2.cvtColor(frame.astype(np.float32, copy=False), cv2.COLOR_BGR2GRAY, dst=source[index])
+
+        cuts = []
+        if self.scene_detector is not None:
+            cuts = self.scene_detector.cuts(fps, min(fl for fl, _, _ in grid), 0, num_frames)
+        bounds = segment_bounds(num_frames, cuts)
+        if cuts:
+            print(f"检测到 {len(cuts)} 个镜头切换，分为 {len(bounds)} 段独立滤波")
+
+        # 1. 构建金字塔并对需要滤波的层做一次正向FFT（每段一次）
+        with self.profiler.stage('pyramid'):
+            vid_pyramid = self.create_laplacian_video_pyramid(source, levels)
+        if luma:
+            del source
+        filter_levels = [idx for idx in range(len(vid_pyramid))
+                         if skip_levels_at_top <= idx < len(vid_pyramid) - 1]
+        shapes = [level.shape[1:3] for level in vid_pyramid]
+        spectra = {}
+        with self.profiler.stage('filter'):
+            for idx in filter_levels:
+                for bound in bounds:
+                    self.cancel_token.raise_if_cancelled()
+                    spectra[idx, bound] = np.fft.rfft(vid_pyramid[idx][bound[0]:bound[1]], axis=0)
+        del vid_pyramid
+
+        # 2. 联系表：每个变体缩放到一个单元格
+        sheet = sheet_layout = None
+        if contact_sheet:
+            columns = math.ceil(math.sqrt(len(grid)))
+            rows = math.ceil(len(grid) / columns)
+            cell_w = max(2, min(self.width, sheet_width // columns) // 2 * 2)
+            cell_h = max(2, int(round(self.height * cell_w / self.width)) // 2 * 2)
+            sheet = np.zeros((num_frames, rows * cell_h, columns * cell_w, 3), dtype=np.uint8)
+            sheet_layout = (columns, cell_w, cell_h)
+
+        bands = {}
+        for index, (freq_low, freq_high, amplification) in enumerate(grid):
+            bands.setdefault((freq_low, freq_high), []).append((index, amplification))
+
+        outputs = [None] * len(grid)
+        tracker = self._track('filter', len(grid), unit='variant')
+        for (freq_low, freq_high), variants in bands.items():
+            self.cancel_token.raise_if_cancelled()
+            print(f"\n--- 频带 {freq_low}-{freq_high} Hz ({len(variants)} 个放大倍数) ---")
+
+            delta = None
+            for segment_start, segment_end in bounds:
+                length = segment_end - segment_start
+                # 3. 掩码 + 逆FFT（未放大的带通信号）
+                mask = self._temporal_band_mask(length, fps, freq_low, freq_high)
+                with self.profiler.stage('filter'):
+                    bandpassed = {}
+                    for idx in filter_levels:
+                        self.cancel_token.raise_if_cancelled()
+                        spectrum = spectra[idx, (segment_start, segment_end)]
+                        bandpassed[idx] = np.fft.irfft(spectrum * mask.reshape(-1, *[1] * (spectrum.ndim - 1)),
+                                                       n=length, axis=0).astype(np.float32)
+
+                # 4. 只坍缩增量层：输出 = 原始帧 + 放大倍数 * 坍缩(增量)
+                with self.profiler.stage('collapse'):
+                    segment_delta = self._collapse_delta_video(bandpassed, shapes, length)
+                del bandpassed
+                if delta is None:
+                    delta = np.empty((num_frames,) + segment_delta.shape[1:], dtype=np.float32)
+                delta[segment_start:segment_end] = segment_delta
+                del segment_delta
+            if luma:
+                delta = delta[..., np.newaxis]
+
+            for index, amplification in variants:
+                print(f"\n变体 {index + 1}/{len(grid)}: {freq_low}-{freq_high} Hz, 放大倍数 {amplification}x")
+                output = np.clip(frames + delta * amplification, 0, 1)
+                if blend < 1.0:
+                    output = np.clip(output * blend + frames * (1 - blend), 0, 1)
+                outputs[index] = (freq_low, freq_high, amplification, self.save_video_from_frames(
+                    output, audio_source=audio_source, output_format=output_format, mode=mode,
+                    freq_low=freq_low, freq_high=freq_high, amplification=amplification))
+                if sheet is not None:
+                    self._draw_contact_cell(sheet, sheet_layout, index, output,
+                                            f"{freq_low}-{freq_high}Hz x{amplification:g}")
+                del output
+                tracker.update(advance=1)
+            del delta
+        tracker.finish()
+
+        sheet_path = None
+        if sheet is not None:
+            print("\n保存联系表...")
+            low = min(fl for fl, _, _ in grid)
+            high = max(fh for _, fh, _ in grid)
+            gains = sorted({amp for _, _, amp in grid})
+            sheet_path = self.save_video_from_frames(
+                sheet, audio_source=audio_source, output_format=output_format, mode=f"{mode}_sweep",
+                freq_low=low, freq_high=high, amplification=f"{gains[0]:g}-{gains[-1]:g}")
+
+        print(f"✅ 参数扫描完成: {len(grid)} 个输出")
+        return {'outputs': outputs, 'contact_sheet': sheet_path}
+
+    def _collapse_delta_video(self, level_deltas, shapes, num_frames):
+        """坍缩只包含增量层（其余层为零）的视频金字塔，从最粗的增量层开始上采样"""
+        coarsest = max(level_deltas)
+        channels = level_deltas[coarsest].shape[3:]
+        result = np.empty((num_frames, shapes[0][0], shapes[0][1], *channels), dtype=np.float32)
+        tracker = self._track('collapse', num_frames)
+        for frame_idx in range(num_frames):
+            self.cancel_token.raise_if_cancelled()
+            img = level_deltas[coarsest][frame_idx]
+            for level in range(coarsest - 1, -1, -1):
+                height, width = shapes[level]
+                img = cv2.pyrUp(img, dstsize=(width, height))
+                if level in level_deltas:
+                    img = img + level_deltas[level][frame_idx]
+            result[frame_idx] = img
+            tracker.update(frame_idx + 1)
+        tracker.finish()
+        return result
+
+    def _draw_contact_cell(self, sheet, layout, index, frames, label):
+        """把一个变体缩放后写入联系表的对应单元格并标注参数"""
+        columns, cell_w, cell_h = layout
+        y0, x0 = (index // columns) * cell_h, (index % columns) * cell_w
+        for frame_idx in range(len(sheet)):
+            cell = cv2.resize(self._to_uint8(frames[frame_idx]), (cell_w, cell_h), interpolation=cv2.INTER_AREA)
+            cv2.putText(cell, label, (4, 14), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
+            sheet[frame_idx, y0:y0 + cell_h, x0:x0 + cell_w] = cell
+
+    def _open_temp_writer(self, final_path, frame_size=None):
+        """为最终输出路径创建临时视频写入器（frame_size默认为原视频尺寸）"""
         temp_video = final_path.replace('.mp4', '_temp.mp4').replace('.mov', '_temp.mov')
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(temp_video, fourcc, self.fps, (self.width, self.height))
+        out = cv2.VideoWriter(temp_video, fourcc, self.fps, frame_size or (self.width, self.height))
 
         if not out.isOpened():
             raise ValueError(f"无法创建临时视频文件: {temp_video}")
+        return out, temp_video
 
-        # 写入帧
-        for idx, frame in enumerate(frames):
-            output_uint8 = np.clip(frame * 255, 0, 255).astype(np.uint8)
-            out.write(output_uint8)
+    @staticmethod
+    def _to_uint8(frame):
+        """float帧([0, 1])转换为uint8，uint8帧原样返回"""
+        if frame.dtype == np.uint8:
+            return frame
+        return np.clip(frame * 255, 0, 255).astype(np.uint8)
 
-            if (idx + 1) % 50 == 0:
-                print(f"  已写入 {idx + 1}/{len(frames)} 帧")
+    def save_video_from_frames(self, frames, audio_source=None, output_format='mp4', mode='motion',
+                              freq_low=0.4, freq_high=3.0, amplification=10):
+        """从帧数组保存视频（float帧取值[0, 1]，也接受uint8帧）"""
+        print(f"\n保存视频...")
+
+        # 生成输出文件名
+        final_path = self.generate_output_filename(mode, freq_low, freq_high, amplification, output_format)
+
+        # 创建临时视频文件（尺寸取自帧，联系表等输出可与原视频尺寸不同）
+        frame_size = (frames[0].shape[1], frames[0].shape[0]) if len(frames) else None
+        out, temp_video = self._open_temp_writer(final_path, frame_size)
+
+        # 写入帧
+        tracker = self._track('encode', len(frames), detail='写入临时文件')
+        try:
+            with self.profiler.stage('encode'):
+                for idx, frame in enumerate(frames):
+                    self.cancel_token.raise_if_cancelled()
+                    out.write(self._to_uint8(frame))
+
+                    tracker.update(idx + 1)
+                    if (idx + 1) % 50 == 0:
+                        print(f"  已写入 {idx + 1}/{len(frames)} 帧")
+        except ProcessingCancelled:
+            out.release()
+            print("\n写入已取消")
+            self._keep_partial_output(temp_video, final_path)
+            raise
 
         out.release()
+        tracker.finish()
+        self.frames_written = len(frames)
         print(f"✅ 临时视频已创建: {temp_video}")
 
         # 使用FFmpeg转换为最终格式
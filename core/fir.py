@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Temporal FIR Filters
+时域FIR滤波 - 线性相位加窗sinc带通，以及按块FFT卷积（overlap-save）的流式实现
+
+FIR带通的相位是线性的：输出对齐到滤波器中心（延迟 (taps-1)/2 帧）后即为零相位，
+不会像IIR那样使不同频率的运动错位；与整段FFT不同，流式实现只需保存一个滑动窗口。
+"""
+
+import math
+
+import numpy as np
+
+
+# 汉明窗的过渡带宽约为 3.3 * fps / taps
+HAMMING_TRANSITION = 3.3
+
+
+def default_num_taps(fps, freq_low, freq_high, max_taps=None):
+    """按过渡带宽（取freq_low与带宽中较小者）选择抽头数，结果为奇数且不超过max_taps"""
+    transition = min(freq_low, freq_high - freq_low) if freq_low > 0 else freq_high - freq_low
+    taps = int(math.ceil(HAMMING_TRANSITION * fps / max(transition, 1e-3)))
+    if max_taps is not None:
+        taps = min(taps, max_taps)
+    taps = taps if taps % 2 else taps - 1
+    return max(3, taps)
+
+
+def design_bandpass(fps, freq_low, freq_high, num_taps):
+    """汉明窗sinc带通（两个低通之差），归一化为频带中心增益为1"""
+    if num_taps % 2 == 0:
+        raise ValueError(f"FIR抽头数必须为奇数: {num_taps}")
+    n = np.arange(num_taps) - (num_taps - 1) / 2.0
+
+    def lowpass(cutoff):
+        return 2 * cutoff / fps * np.sinc(2 * cutoff / fps * n)
+
+    taps = (lowpass(freq_high) - lowpass(freq_low)) * np.hamming(num_taps)
+    center = (freq_low + freq_high) / 2.0
+    gain = abs(np.sum(taps * np.exp(-2j * np.pi * center * n / fps)))
+    return (taps / max(gain, 1e-12)).astype(np.float32)
+
+
+def _fft_size(length):
+    return 1 << max(0, int(math.ceil(math.log2(length))))
+
+
+def fir_filter(data, taps):
+    """整段零相位FIR滤波（沿axis 0，序列外视为0），结果与StreamingFIR逐帧输出一致"""
+    num_frames = data.shape[0]
+    delay = (len(taps) - 1) // 2
+    nfft = _fft_size(num_frames + len(taps) - 1)
+    spectrum = np.fft.rfft(taps, nfft).astype(np.complex64)
+    result = np.fft.rfft(data, nfft, axis=0)
+    result *= spectrum.reshape((-1,) + (1,) * (data.ndim - 1))
+    return np.fft.irfft(result, nfft, axis=0)[delay:delay + num_frames].astype(np.float32, copy=False)
+
+
+class StreamingFIR:
+    """沿时间轴的流式FIR（overlap-save块卷积）
+
+    push(frame) 每次输入一帧，返回已完成滤波的帧列表（每凑满block帧计算一次）；
+    finish() 以零补齐尾部并返回剩余输出。输出已对齐到滤波器中心（零相位），
+    第k个输出对应第k个输入；常驻内存为 (taps - 1 + block) 帧。
+    """
+
+    def __init__(self, taps, frame_shape, block=None):
+        self.num_taps = len(taps)
+        self.delay = (self.num_taps - 1) // 2
+        self.block = block or max(self.num_taps - 1, 1)
+        self.nfft = _fft_size(self.num_taps - 1 + self.block)
+        self.spectrum = np.fft.rfft(taps, self.nfft).astype(np.complex64).reshape((-1,) + (1,) * len(frame_shape))
+        self.window = np.zeros((self.num_taps - 1 + self.block,) + tuple(frame_shape), dtype=np.float32)
+        self.filled = 0
+        # 前delay个卷积输出属于序列开始之前，丢弃
+        self.to_skip = self.delay
+        self.pushed = 0
+        self.emitted = 0
+
+    def push(self, frame):
+        self.window[self.num_taps - 1 + self.filled] = frame
+        self.filled += 1
+        self.pushed += 1
+        if self.filled == self.block:
+            return self._convolve()
+        return []
+
+    def finish(self):
+        """输入结束：补零直到所有输入帧都有输出"""
+        outputs = []
+        while self.emitted < self.pushed:
+            self.window[self.num_taps - 1 + self.filled] = 0
+            self.filled += 1
+            if self.filled == self.block:
+                outputs.extend(self._convolve())
+        return outputs
+
+    def _convolve(self):
+        count = self.filled
+        segment = self.window[:self.num_taps - 1 + count]
+        result = np.fft.irfft(np.fft.rfft(segment, self.nfft, axis=0) * self.spectrum, self.nfft, axis=0)
+        valid = result[self.num_taps - 1:self.num_taps - 1 + count]
+        # 滑动窗口：保留最后 taps-1 帧作为下一块的历史
+        if self.num_taps > 1:
+            self.window[:self.num_taps - 1] = segment[count:count + self.num_taps - 1]
+        self.filled = 0
+
+        skip = min(self.to_skip, count)
+        self.to_skip -= skip
+        outputs = [frame.astype(np.float32) for frame in valid[skip:]]
+        outputs = outputs[:self.pushed - self.emitted]
+        self.emitted += len(outputs)
+        return outputs
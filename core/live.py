@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Live Magnification
+实时放大 - 从采集设备或本地流读取帧，逐层因果IIR带通滤波后实时输出
+
+批处理使用整段FFT（非因果），实时模式改用每层两个一阶低通之差的IIR带通，
+每帧只需构建到最粗的滤波层、更新滤波状态并坍缩增量层，延迟与帧数无关。
+采集线程只保留最新一帧，处理跟不上时丢弃旧帧而不是累积延迟。
+
+用法:
+  evm live --device 0 -a 20 -fl 0.8 -fh 3.0
+  evm live --source rtsp://127.0.0.1:8554/cam --record monitor.mp4 --no-window
+"""
+
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import cv2
+
+from .cancellation import CancellationToken
+from .evm_core import AMPLIFY_ERRSTATE
+
+
+class LiveMagnifier:
+    """因果逐帧放大器
+
+    每个被滤波的拉普拉斯层维护两个一阶低通状态（截止频率freq_high和freq_low），
+    带通信号为二者之差；输出 = 原帧 + amplification * 坍缩(带通增量)。
+    """
+
+    def __init__(self, fps, freq_low=0.4, freq_high=3.0, amplification=10, levels=4,
+                 skip_levels_at_top=2):
+        self.fps = fps
+        self.amplification = amplification
+        self.levels = levels
+        # 与批处理一致：跳过顶层，最后一层为高斯残差不滤波
+        self.filter_levels = [idx for idx in range(levels) if skip_levels_at_top <= idx < levels - 1]
+        if not self.filter_levels:
+            raise ValueError("没有需要滤波的金字塔层，请增加层数或减少跳过的顶层数量")
+        self.set_band(freq_low, freq_high)
+        self.reset()
+
+    def set_band(self, freq_low, freq_high):
+        """修改频带（运行中可调，滤波状态保留）"""
+        self.freq_low = freq_low
+        self.freq_high = freq_high
+        self.alpha_low = 1.0 - math.exp(-2 * math.pi * freq_low / self.fps)
+        self.alpha_high = 1.0 - math.exp(-2 * math.pi * freq_high / self.fps)
+
+    def reset(self):
+        """清空滤波状态（分辨率改变或重新开始时调用）"""
+        self.lowpass_low = {}
+        self.lowpass_high = {}
+        self.frames_seen = 0
+
+    def _band_levels(self, frame):
+        """只构建到最粗的滤波层所需的高斯层，返回 {层号: 拉普拉斯层} 和各层尺寸
+
+        不滤波的顶层只用于下采样，保持uint8以节省全分辨率的类型转换；
+        从第一个滤波层起转为float32。
+        """
+        first, coarsest = self.filter_levels[0], self.filter_levels[-1]
+        gaussian = [frame]
+        for idx in range(coarsest + 1):
+            if idx == first:
+                gaussian[-1] = gaussian[-1].astype(np.float32) * (1.0 / 255.0)
+            gaussian.append(cv2.pyrDown(gaussian[-1]))
+        shapes = [level.shape[:2] for level in gaussian]
+        laplacian = {}
+        for idx in self.filter_levels:
+            height, width = shapes[idx]
+            laplacian[idx] = gaussian[idx] - cv2.pyrUp(gaussian[idx + 1], dstsize=(width, height))
+        return laplacian, shapes
+
+    def process(self, frame):
+        """处理一帧（uint8 BGR），返回放大后的uint8帧"""
+        laplacian, shapes = self._band_levels(frame)
+
+        delta = None
+        with np.errstate(**AMPLIFY_ERRSTATE):
+            for idx in range(self.filter_levels[-1], -1, -1):
+                if delta is not None:
+                    height, width = shapes[idx]
+                    delta = cv2.pyrUp(delta, dstsize=(width, height))
+                if idx not in laplacian:
+                    continue
+                level = laplacian[idx]
+                if idx not in self.lowpass_low:
+                    self.lowpass_low[idx] = level.copy()
+                    self.lowpass_high[idx] = level.copy()
+                else:
+                    # 一阶IIR低通: y += alpha * (x - y)
+                    self.lowpass_low[idx] += self.alpha_low * (level - self.lowpass_low[idx])
+                    self.lowpass_high[idx] += self.alpha_high * (level - self.lowpass_high[idx])
+                # 在粗尺度上乘放大倍数（线性运算，与坍缩后再乘等价）
+                band = (self.lowpass_high[idx] - self.lowpass_low[idx]) * (self.amplification * 255.0)
+                delta = band if delta is None else delta + band
+
+        self.frames_seen += 1
+        # 饱和加法直接得到uint8输出
+        return cv2.add(frame, delta, dtype=cv2.CV_8U)
+
+
+class LatestFrameSource:
+    """采集线程：持续读取设备/流，只保留最新一帧及其采集时间"""
+
+    def __init__(self, source, width=None, height=None, fps=None):
+        self.source = source
+        self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise ValueError(f"无法打开采集源: {source}")
+        if width and height:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+        # 尽量减小驱动端缓冲（部分后端不支持）
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or 30
+        # 本地文件按帧率节流，模拟实时采集
+        self.paced = isinstance(source, str) and os.path.isfile(source)
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.dropped = 0
+        self.ended = False
+        self._frame = None
+        self._timestamp = None
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _read_loop(self):
+        interval = 1.0 / self.fps
+        next_time = time.perf_counter()
+        while not self._stop.is_set():
+            ret, frame = self.cap.read()
+            timestamp = time.perf_counter()
+            if not ret:
+                break
+            with self._condition:
+                if self._frame is not None:
+                    self.dropped += 1
+                self._frame, self._timestamp = frame, timestamp
+                self._condition.notify()
+            if self.paced:
+                next_time += interval
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        with self._condition:
+            self.ended = True
+            self._condition.notify_all()
+
+    def read(self, timeout=1.0):
+        """取出最新一帧，返回 (帧, 采集时间)；超时或采集结束返回 (None, None)"""
+        with self._condition:
+            if self._frame is None and not self.ended:
+                self._condition.wait(timeout)
+            frame, timestamp = self._frame, self._timestamp
+            self._frame = self._timestamp = None
+            return frame, timestamp
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self.cap.release()
+
+
+class LatencyMeter:
+    """端到端延迟（采集到输出）与处理帧率的滑动统计"""
+
+    def __init__(self, fps, window=60):
+        self.fps = fps
+        self.latencies = deque(maxlen=window)
+        self.frame_times = deque(maxlen=window)
+
+    def add(self, capture_time, output_time=None):
+        output_time = output_time or time.perf_counter()
+        self.latencies.append(output_time - capture_time)
+        self.frame_times.append(output_time)
+
+    def stats(self):
+        if not self.latencies:
+            return {'latency_ms': None, 'latency_frames': None, 'fps': 0.0}
+        latency = sum(self.latencies) / len(self.latencies)
+        span = self.frame_times[-1] - self.frame_times[0]
+        fps = (len(self.frame_times) - 1) / span if span > 0 else 0.0
+        return {
+            'latency_ms': round(latency * 1000, 1),
+            'latency_frames': round(latency * self.fps, 2),
+            'fps': round(fps, 1),
+        }
+
+
+class LiveSession:
+    """实时处理循环：采集 -> 放大 -> 回调显示 / 可选录制
+
+    frame_callback(output, capture_time) 在处理线程中调用；
+    显示端可在真正绘制后调用 meter.add() 记录端到端延迟（默认在回调返回后记录）。
+    """
+
+    def __init__(self, source, freq_low=0.4, freq_high=3.0, amplification=10, levels=4,
+                 skip_levels_at_top=2, width=None, height=None, fps=None, record_path=None,
+                 cancel_token=None):
+        self.source = LatestFrameSource(source, width, height, fps)
+        self.magnifier = LiveMagnifier(self.source.fps, freq_low, freq_high, amplification, levels,
+                                       skip_levels_at_top)
+        self.meter = LatencyMeter(self.source.fps)
+        self.cancel_token = cancel_token or CancellationToken()
+        self.record_path = record_path
+        self.writer = None
+        self.frames = 0
+
+    def start_recording(self, path):
+        """开始录制放大后的画面"""
+        self.stop_recording()
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), self.source.fps,
+                                 (self.source.width, self.source.height))
+        if not writer.isOpened():
+            raise ValueError(f"无法创建录制文件: {path}")
+        self.record_path = path
+        self.writer = writer
+
+    def stop_recording(self):
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+
+    def run(self, frame_callback=None, max_frames=None, record_latency=True):
+        """运行直到取消、采集结束或达到max_frames"""
+        self.source.start()
+        if self.record_path:
+            self.start_recording(self.record_path)
+        try:
+            while not self.cancel_token.cancelled:
+                frame, capture_time = self.source.read()
+                if frame is None:
+                    if self.source.ended:
+                        break
+                    continue
+                if frame.shape[1] != self.source.width or frame.shape[0] != self.source.height:
+                    self.source.width, self.source.height = frame.shape[1], frame.shape[0]
+                    self.magnifier.reset()
+
+                output = self.magnifier.process(frame)
+                if self.writer is not None:
+                    self.writer.write(output)
+                if frame_callback is not None:
+                    frame_callback(output, capture_time)
+                if record_latency:
+                    self.meter.add(capture_time)
+
+                self.frames += 1
+                if max_frames and self.frames >= max_frames:
+                    break
+        finally:
+            self.stop_recording()
+            self.source.stop()
+        return self.stats()
+
+    def stats(self):
+        data = self.meter.stats()
+        data.update({'frames': self.frames, 'dropped': self.source.dropped,
+                     'resolution': [self.source.width, self.source.height]})
+        return data
+
+
+def _parse_source(args):
+    if args.source is not None:
+        return args.source
+    return args.device
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='evm live', description='欧拉视频放大 - 实时模式')
+    parser.add_argument('--device', type=int, default=0, help='采集设备编号')
+    parser.add_argument('--source', default=None, help='本地流地址或视频文件（代替--device）')
+    parser.add_argument('-a', '--amplification', type=float, default=10, help='放大倍数')
+    parser.add_argument('-fl', '--freq-low', type=float, default=0.4, help='低频截止 (Hz)')
+    parser.add_argument('-fh', '--freq-high', type=float, default=3.0, help='高频截止 (Hz)')
+    parser.add_argument('-l', '--levels', type=int, default=4, help='金字塔层数')
+    parser.add_argument('-s', '--skip-levels', type=int, default=2, help='跳过金字塔顶层数量')
+    parser.add_argument('--size', default=None, help='请求的采集分辨率，如 1280x720')
+    parser.add_argument('--fps', type=float, default=None, help='请求的采集帧率')
+    parser.add_argument('--record', default=None, metavar='PATH', help='录制放大后的画面')
+    parser.add_argument('--no-window', action='store_true', help='不显示窗口，只在终端输出延迟统计')
+    parser.add_argument('-f', '--max-frames', type=int, default=None, help='处理指定帧数后停止')
+    args = parser.parse_args(argv)
+
+    width = height = None
+    if args.size:
+        width, height = (int(value) for value in args.size.lower().split('x'))
+    params = dict(source=_parse_source(args), freq_low=args.freq_low, freq_high=args.freq_high,
+                  amplification=args.amplification, levels=args.levels,
+                  skip_levels_at_top=args.skip_levels, width=width, height=height, fps=args.fps,
+                  record_path=args.record)
+
+    if not args.no_window:
+        from ui.live_window import run_live_window
+        return run_live_window(params, max_frames=args.max_frames)
+
+    session = LiveSession(**params)
+    print(f"实时放大: {session.source.width}x{session.source.height} @ {session.source.fps:g} FPS, "
+          f"频带 {args.freq_low}-{args.freq_high} Hz, 放大倍数 {args.amplification}x (Ctrl-C 停止)")
+    last_report = [time.perf_counter()]
+
+    def report(output, capture_time):
+        now = time.perf_counter()
+        if now - last_report[0] >= 1.0:
+            last_report[0] = now
+            stats = session.stats()
+            print(f"[实时] {stats['fps']:.1f} FPS, 延迟 {stats['latency_ms']} ms "
+                  f"({stats['latency_frames']} 帧), 丢帧 {stats['dropped']}")
+
+    try:
+        stats = session.run(report, max_frames=args.max_frames)
+    except KeyboardInterrupt:
+        session.cancel_token.cancel()
+        stats = session.stats()
+    print(f"结束: {stats['frames']} 帧, 平均 {stats['fps']:.1f} FPS, 延迟 {stats['latency_ms']} ms, "
+          f"丢帧 {stats['dropped']}")
+    if args.record:
+        print(f"录制已保存: {args.record}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Memory and Runtime Planner
+内存与耗时规划器 - 根据分辨率、帧数、金字塔层数、模式和可用内存选择执行策略
+
+策略:
+  in_memory   整段视频解码到内存后一次处理（频率分辨率最好）
+  chunked     按时间分块处理，相邻块交叠并交叉淡化
+  tiled       uint8帧保存在内存中，按空间分块（带边距）处理完整时间序列
+  out_of_core 与tiled相同，但uint8输入/输出帧存放在磁盘memmap中
+  streaming   流式FIR：逐帧构建滤波层，线性相位FIR按块卷积，输出延迟半个滤波器长度（只需滑动窗口）
+  two_pass    两遍解码：第一遍只累积（降采样后的）滤波层并原地滤波，第二遍重新解码并逐帧合成输出；
+              滤波层放不进内存时存放在磁盘memmap中（不支持混合模式）
+
+时间降采样（decimation）与策略正交：频带上限远低于帧率时，滤波层先按时间降采样，
+在低帧率下做FFT带通，再把带通增量插值回原帧率。
+"""
+
+import math
+import time
+from dataclasses import dataclass, field, asdict
+
+
+# 可用内存中分配给处理流程的比例
+DEFAULT_MEMORY_FRACTION = 0.6
+# 分块处理时每块至少覆盖最低频率的周期数
+MIN_CYCLES_PER_CHUNK = 4
+# 未校准时使用的经验常数
+DEFAULT_BYTES_PER_SAMPLE = 24.0       # 每个(帧, 像素)的峰值字节数，含金字塔和FFT临时数组
+DEFAULT_SECONDS_PER_SAMPLE = 4e-8     # 每个(帧, 像素)的处理耗时
+# 时间降采样：降采样后的帧率至少为freq_high的DECIMATION_OVERSAMPLE倍
+DECIMATION_OVERSAMPLE = 4
+# auto模式下降采样倍数低于此值时不降采样（收益太小）
+MIN_AUTO_DECIMATION = 4
+# 降采样后至少保留的帧数
+MIN_DECIMATED_FRAMES = 32
+# 窄带滤波：频带内的DFT bin数不超过此值时auto选择矩阵乘法DFT
+NARROWBAND_MAX_BINS = 32
+TEMPORAL_FILTERS = ('auto', 'fft', 'narrowband', 'fir')
+STRATEGIES = ('in_memory', 'chunked', 'tiled', 'out_of_core', 'two_pass', 'streaming')
+
+_calibration_cache = {}
+
+
+@dataclass
+class ExecutionPlan:
+    """执行计划"""
+    strategy: str
+    width: int
+    height: int
+    frames: int
+    fps: float
+    levels: int
+    mode: str
+    precision: str = 'float32'
+    chunk_frames: int = None
+    chunk_overlap: int = 0
+    tile_size: tuple = None
+    tile_margin: int = 0
+    spill_to_disk: bool = False
+    buffer_size: int = 30
+    decimation: int = 1
+    temporal_filter: str = 'auto'
+    fir_taps: int = None
+    predicted_peak_mb: float = 0.0
+    predicted_runtime_s: float = 0.0
+    budget_mb: float = 0.0
+    available_mb: float = 0.0
+    calibrated: bool = False
+    notes: list = field(default_factory=list)
+
+    def to_dict(self):
+        return asdict(self)
+
+    def describe(self):
+        """人类可读的计划说明"""
+        names = {
+            'in_memory': '整段内存处理',
+            'chunked': '时间分块处理',
+            'tiled': '空间分块处理',
+            'out_of_core': '磁盘外存处理',
+            'two_pass': '两遍重解码处理',
+            'streaming': '流式FIR处理',
+        }
+        lines = [
+            f"执行策略: {names.get(self.strategy, self.strategy)} ({self.strategy})",
+            f"视频: {self.width}x{self.height}, {self.frames} 帧 @ {self.fps:g} FPS, 模式 {self.mode}, 金字塔 {self.levels} 层",
+            f"精度: {self.precision}",
+        ]
+        if self.strategy == 'chunked':
+            lines.append(f"分块: 每块 {self.chunk_frames} 帧, 交叠 {self.chunk_overlap} 帧")
+        if self.strategy in ('tiled', 'out_of_core'):
+            lines.append(f"分块: {self.tile_size[0]}x{self.tile_size[1]} 像素, 边距 {self.tile_margin} 像素")
+        if self.strategy == 'two_pass':
+            lines.append(f"滤波层存放于: {'磁盘memmap' if self.spill_to_disk else '内存'}")
+        if self.temporal_filter != 'auto':
+            lines.append(f"时域滤波: {self.temporal_filter}")
+        if self.fir_taps:
+            delay = (self.fir_taps - 1) // 2
+            lines.append(f"FIR: {self.fir_taps} 抽头，输出延迟 {delay} 帧 ({delay / self.fps:.1f} 秒)")
+        if self.decimation > 1:
+            lines.append(f"时间降采样: {self.decimation}x（滤波层在 {self.fps / self.decimation:g} FPS 下滤波）")
+        lines.append(f"预计峰值内存: {self.predicted_peak_mb:.0f} MB (预算 {self.budget_mb:.0f} MB, 可用 {self.available_mb:.0f} MB)")
+        lines.append(f"预计处理耗时: {self.predicted_runtime_s:.1f} 秒{'' if self.calibrated else ' (未校准)'}")
+        for note in self.notes:
+            lines.append(f"注意: {note}")
+        return '\n'.join(lines)
+
+
+def available_memory_bytes():
+    """当前可用物理内存（psutil）"""
+    import psutil
+    return psutil.virtual_memory().available
+
+
+def calibrate(mode='motion', levels=4, skip_levels_at_top=2, size=(160, 120), num_frames=48):
+    """微基准校准：在小尺寸合成视频上测量每(帧, 像素)的耗时和峰值分配字节数
+
+    结果按参数缓存，同一进程内只运行一次。
+    """
+    key = (mode, levels, skip_levels_at_top)
+    if key in _calibration_cache:
+        return _calibration_cache[key]
+
+    import contextlib
+    import io
+    import tracemalloc
+
+    from .evm_core import EulerianVideoMagnification
+    from .synthetic import generate_synthetic_frames
+
+    frames = generate_synthetic_frames(size[0], size[1], num_frames, 30, kind='motion')
+    samples = num_frames * size[0] * size[1]
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    # 处理器的构造和放大过程都会打印日志，校准时全部丢弃
+    with contextlib.redirect_stdout(io.StringIO()):
+        evm = EulerianVideoMagnification('calibration')
+        evm.magnify_by_mode(frames, 30, mode, 0.5, 2.0, 10, levels, skip_levels_at_top)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - base
+    if started:
+        tracemalloc.stop()
+
+    # 输入帧本身(12字节/样本)计入峰值
+    result = {
+        'bytes_per_sample': peak / samples + 12.0,
+        'seconds_per_sample': elapsed / samples,
+    }
+    _calibration_cache[key] = result
+    return result
+
+
+def streaming_buffer_size(width, height, levels=4, requested=150, available_bytes=None,
+                          memory_fraction=0.25):
+    """流式处理的金字塔缓冲帧数：由可用内存决定，而非固定上限"""
+    if available_bytes is None:
+        available_bytes = available_memory_bytes()
+    # 每帧拉普拉斯金字塔约为原帧的4/3（float32 RGB）
+    pyramid_bytes = width * height * 3 * 4 * 4 / 3
+    affordable = int(available_bytes * memory_fraction / max(pyramid_bytes, 1))
+    return max(1, min(requested, affordable))
+
+
+def decimation_factor(fps, freq_high, frames, requested='auto'):
+    """时间降采样倍数
+
+    requested: 'off'/None -> 1；'auto' -> fps/(DECIMATION_OVERSAMPLE*freq_high)，
+    不足MIN_AUTO_DECIMATION时不降采样；整数 -> 指定倍数。
+    结果受奈奎斯特条件（降采样后帧率 > 2*freq_high）和MIN_DECIMATED_FRAMES限制。
+    """
+    if requested in (None, 'off') or not freq_high or freq_high <= 0:
+        return 1
+    if requested == 'auto':
+        factor = int(fps // (DECIMATION_OVERSAMPLE * freq_high))
+    else:
+        try:
+            factor = int(requested)
+        except (TypeError, ValueError):
+            raise ValueError(f"无效的时间降采样设置: {requested}（应为 off、auto 或正整数）")
+        if factor < 1:
+            raise ValueError(f"无效的时间降采样设置: {requested}（应为 off、auto 或正整数）")
+    nyquist_limit = int(math.ceil(fps / (2 * freq_high))) - 1
+    factor = min(factor, nyquist_limit, frames // MIN_DECIMATED_FRAMES)
+    if requested == 'auto' and factor < MIN_AUTO_DECIMATION:
+        return 1
+    return max(1, factor)
+
+
+def choose_temporal_filter(num_bins, requested='auto'):
+    """选择时域滤波实现：'fft'（整段rfft/irfft）、'narrowband'（只计算频带内的DFT bin）或 'fir'（线性相位FIR）"""
+    if requested not in TEMPORAL_FILTERS:
+        raise ValueError(f"未知的时域滤波方式: {requested}")
+    if requested == 'auto':
+        return 'narrowband' if num_bins <= NARROWBAND_MAX_BINS else 'fft'
+    return requested
+
+
+def filtered_levels_bytes(width, height, frames, levels=4, skip_levels_at_top=2, decimation=1):
+    """两遍处理中常驻的滤波层字节数（float32，按时间降采样后的帧数）"""
+    stored_frames = -(-frames // max(1, decimation))
+    total = 0
+    level_w, level_h = width, height
+    for idx in range(levels - 1):
+        if idx >= skip_levels_at_top:
+            total += level_w * level_h * 3 * 4
+        level_w, level_h = (level_w + 1) // 2, (level_h + 1) // 2
+    return total * stored_frames
+
+
+def plan_execution(width, height, frames, fps, levels=4, mode='motion', freq_low=0.4,
+                   skip_levels_at_top=2, available_bytes=None, memory_budget_bytes=None,
+                   memory_fraction=DEFAULT_MEMORY_FRACTION, use_calibration=True, strategy=None,
+                   freq_high=None, decimation='auto', temporal_filter='auto'):
+    """选择执行策略并预测峰值内存与耗时
+
+    strategy可强制指定策略（仍会计算分块参数和预测值）。
+    给出freq_high时按decimation（off/auto/整数）确定时间降采样倍数。
+    temporal_filter（auto/fft/narrowband/fir）在滤波时按实际频带bin数解析；
+    fir和streaming策略不做时间降采样。
+    """
+    if available_bytes is None:
+        available_bytes = available_memory_bytes()
+    budget = memory_budget_bytes or available_bytes * memory_fraction
+
+    if use_calibration:
+        cal = calibrate(mode, levels, skip_levels_at_top)
+    else:
+        cal = {'bytes_per_sample': DEFAULT_BYTES_PER_SAMPLE, 'seconds_per_sample': DEFAULT_SECONDS_PER_SAMPLE}
+    bytes_per_sample = cal['bytes_per_sample']
+    seconds_per_sample = cal['seconds_per_sample']
+
+    pixels = width * height
+    notes = []
+    plan = ExecutionPlan(strategy='in_memory', width=width, height=height, frames=frames, fps=fps,
+                         levels=levels, mode=mode, budget_mb=budget / 1024 / 1024,
+                         available_mb=available_bytes / 1024 / 1024, calibrated=use_calibration,
+                         notes=notes)
+    plan.buffer_size = streaming_buffer_size(width, height, levels, available_bytes=available_bytes)
+    if temporal_filter not in TEMPORAL_FILTERS:
+        raise ValueError(f"未知的时域滤波方式: {temporal_filter}")
+    if strategy == 'streaming':
+        temporal_filter = 'fir'
+    plan.temporal_filter = temporal_filter
+    if temporal_filter == 'fir':
+        if not freq_high:
+            raise ValueError("FIR滤波需要指定freq_high")
+        from .fir import default_num_taps
+        plan.fir_taps = default_num_taps(fps, freq_low, freq_high, max_taps=frames)
+    else:
+        plan.decimation = decimation_factor(fps, freq_high, frames, decimation)
+
+    def in_memory_peak(num_frames, precision):
+        # float16存储金字塔可节省约1/3的峰值（金字塔约占每样本字节数的1/3）
+        scale = 1.0 if precision == 'float32' else 2.0 / 3.0
+        return num_frames * pixels * bytes_per_sample * scale
+
+    # 每块至少覆盖MIN_CYCLES_PER_CHUNK个最低频率周期
+    min_chunk = int(math.ceil(MIN_CYCLES_PER_CHUNK * fps / max(freq_low, 1e-3)))
+    min_chunk = max(16, min(min_chunk, frames))
+
+    # 1. 整段内存处理（先float32，再尝试float16金字塔）
+    chosen = None
+    for precision in ('float32', 'float16'):
+        if in_memory_peak(frames, precision) <= budget:
+            chosen = ('in_memory', precision)
+            break
+
+    # 2. 时间分块：一块至少min_chunk帧
+    if chosen is None and in_memory_peak(min_chunk, 'float32') <= budget:
+        chosen = ('chunked', 'float32')
+
+    # 3. 空间分块：输入输出uint8帧常驻内存
+    store_bytes = 2 * frames * pixels * 3
+    if chosen is None and store_bytes < budget * 0.5:
+        chosen = ('tiled', 'float32')
+
+    # 4. 两遍处理：只有滤波层常驻内存（混合模式需要两级放大，无法两遍完成）
+    level_bytes = filtered_levels_bytes(width, height, frames, levels, skip_levels_at_top, plan.decimation)
+    two_pass_working = pixels * bytes_per_sample
+    if chosen is None and mode != 'hybrid' and level_bytes + two_pass_working <= budget * 0.5:
+        chosen = ('two_pass', 'float32')
+
+    # 5. 外存：uint8帧存放在磁盘memmap中
+    if chosen is None:
+        chosen = ('out_of_core', 'float32')
+
+    if strategy is not None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"未知的执行策略: {strategy}")
+        if strategy in ('two_pass', 'streaming') and mode == 'hybrid':
+            raise ValueError("两遍处理和流式处理不支持混合模式")
+        notes.append(f"策略由用户指定（规划器建议 {chosen[0]}）")
+        chosen = (strategy, chosen[1] if strategy == chosen[0] else 'float32')
+
+    plan.strategy, plan.precision = chosen
+    runtime = frames * pixels * seconds_per_sample
+
+    if plan.strategy == 'in_memory':
+        plan.predicted_peak_mb = in_memory_peak(frames, plan.precision) / 1024 / 1024
+        if plan.precision == 'float16':
+            notes.append("金字塔以float16存储以降低内存占用")
+    elif plan.strategy == 'chunked':
+        chunk = int(budget // (pixels * bytes_per_sample))
+        chunk = max(min_chunk, min(chunk, frames))
+        overlap = min(chunk // 4, int(math.ceil(fps / max(freq_low, 1e-3))))
+        plan.chunk_frames = chunk
+        plan.chunk_overlap = overlap
+        plan.predicted_peak_mb = in_memory_peak(chunk, 'float32') / 1024 / 1024
+        stride = max(1, chunk - overlap)
+        runtime *= (frames + overlap * math.ceil(frames / stride)) / frames
+        notes.append(f"每块 {chunk / fps:.1f} 秒，最低可分辨频率约 {fps / chunk:.2f} Hz")
+    elif plan.strategy == 'two_pass':
+        plan.spill_to_disk = level_bytes + two_pass_working > budget * 0.5
+        resident = 0 if plan.spill_to_disk else level_bytes
+        # 滤波按行条带原地进行，每条带的临时数组不超过预算的1/4
+        plan.predicted_peak_mb = (resident + two_pass_working + budget * 0.25) / 1024 / 1024
+        # 解码两次
+        runtime *= 1.3
+        notes.append(f"滤波层共 {level_bytes / 1024 / 1024:.0f} MB，源视频解码两次")
+    elif plan.strategy == 'streaming':
+        # 每个滤波层保存 (taps-1+block) 帧的滑动窗口（block=taps-1），另需缓存延迟期间的uint8原帧
+        window_frames = 2 * (plan.fir_taps - 1) + 1
+        window_bytes = filtered_levels_bytes(width, height, window_frames, levels, skip_levels_at_top)
+        delay_bytes = window_frames * pixels * 3
+        plan.predicted_peak_mb = (window_bytes * 3 + delay_bytes + pixels * bytes_per_sample) / 1024 / 1024
+        notes.append(f"输出相对输入延迟 {(plan.fir_taps - 1) // 2} 帧")
+    else:
+        margin = 2 ** levels * 2
+        resident = store_bytes if plan.strategy == 'tiled' else 0
+        tile_budget = max(budget - resident, budget * 0.25)
+        tile_pixels = int(tile_budget // (frames * bytes_per_sample))
+        side = int(math.sqrt(max(tile_pixels, 1))) - 2 * margin
+        side = max(64, min(side, max(width, height)))
+        tile_w, tile_h = min(side, width), min(side, height)
+        plan.tile_size = (tile_w, tile_h)
+        plan.tile_margin = margin
+        padded = (tile_w + 2 * margin) * (tile_h + 2 * margin)
+        plan.predicted_peak_mb = (resident + frames * padded * bytes_per_sample) / 1024 / 1024
+        tiles = math.ceil(width / tile_w) * math.ceil(height / tile_h)
+        runtime *= tiles * padded / pixels
+        if frames * padded * bytes_per_sample > budget:
+            notes.append("单个分块仍超出内存预算，请减少帧数或金字塔层数")
+
+    plan.predicted_runtime_s = runtime
+    return plan
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Per-Stage Profiler
+分阶段性能分析器 - 记录各阶段墙钟时间、CPU时间、峰值内存和分配字节数
+"""
+
+import json
+import os
+import platform
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+
+# 批处理流程中可分析的顶层阶段
+PROFILE_STAGES = ['decode', 'pyramid', 'filter', 'collapse', 'encode', 'transcode']
+
+class StageRecord:
+    """单个阶段的累计统计（同名阶段多次进入时累加）"""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_rss = 0
+        self.rss_delta = 0
+        self.alloc_peak = 0
+        # 运行中的临时状态
+        self._running_peak_rss = 0
+        self._running_alloc_peak = 0
+        self._alloc_base = 0
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'wall_time': round(self.wall_time, 6),
+            'cpu_time': round(self.cpu_time, 6),
+            'peak_rss_mb': round(self.peak_rss / 1024 / 1024, 2),
+            'rss_delta_mb': round(self.rss_delta / 1024 / 1024, 2),
+            'alloc_peak_mb': round(self.alloc_peak / 1024 / 1024, 2),
+        }
+
+
+class NullProfiler:
+    """关闭性能分析时使用的空实现"""
+
+    enabled = False
+
+    def stage(self, name):
+        return nullcontext()
+
+    def add_time(self, name, seconds):
+        pass
+
+
+class StageProfiler:
+    """分阶段性能分析器
+
+    stage(name)为上下文管理器，名称中的'/'表示子阶段（如'filter/level_2'）。
+    峰值RSS由后台线程按sample_interval采样，分配字节数来自tracemalloc
+    （numpy数组分配会上报给tracemalloc）。cprofile_stage指定的阶段会额外用cProfile分析。
+    """
+
+    enabled = True
+
+    def __init__(self, cprofile_stage=None, trace_allocations=True, sample_interval=0.02):
+        import psutil
+
+        self.process = psutil.Process()
+        self.cprofile_stage = cprofile_stage
+        self.trace_allocations = trace_allocations
+        self.sample_interval = sample_interval
+        self.records = {}
+        self.timers = {}
+        self.cprofile_stats = None
+        self._active = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._sampler = None
+        self._started_tracemalloc = False
+        self._start_time = time.perf_counter()
+
+    def _rss(self):
+        return self.process.memory_info().rss
+
+    def _sample_loop(self):
+        """后台采样RSS并更新所有活动阶段的峰值"""
+        while not self._stop_event.wait(self.sample_interval):
+            rss = self._rss()
+            with self._lock:
+                for record in self._active:
+                    record._running_peak_rss = max(record._running_peak_rss, rss)
+
+    def _ensure_started(self):
+        if self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+            self._sampler.start()
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def _update_alloc_peaks(self):
+        """把自上次重置以来的分配峰值计入所有活动阶段"""
+        if not tracemalloc.is_tracing():
+            return
+        _, peak = tracemalloc.get_traced_memory()
+        for record in self._active:
+            record._running_alloc_peak = max(record._running_alloc_peak, peak - record._alloc_base)
+
+    @contextmanager
+    def stage(self, name):
+        """记录一个阶段"""
+        self._ensure_started()
+        record = self.records.setdefault(name, StageRecord(name))
+
+        rss_start = self._rss()
+        with self._lock:
+            self._update_alloc_peaks()
+            record._running_peak_rss = rss_start
+            record._running_alloc_peak = 0
+            record._alloc_base = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+            self._active.append(record)
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+
+        profile = None
+        if self.cprofile_stage == name:
+            import cProfile
+            profile = cProfile.Profile()
+            profile.enable()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            if profile is not None:
+                profile.disable()
+                self._collect_cprofile(profile)
+
+            rss_end = self._rss()
+            with self._lock:
+                self._update_alloc_peaks()
+                self._active.remove(record)
+                record._running_peak_rss = max(record._running_peak_rss, rss_end)
+
+            record.calls += 1
+            record.wall_time += wall
+            record.cpu_time += cpu
+            record.peak_rss = max(record.peak_rss, record._running_peak_rss)
+            record.rss_delta += rss_end - rss_start
+            record.alloc_peak = max(record.alloc_peak, record._running_alloc_peak)
+
+    def add_time(self, name, seconds):
+        """累加细粒度计时（如每帧内各金字塔层的耗时）"""
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    def _collect_cprofile(self, profile):
+        """保存cProfile统计摘要"""
+        import io
+        import pstats
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stream)
+        stats.sort_stats('cumulative').print_stats(25)
+        self.cprofile_stats = stats
+        self.cprofile_text = stream.getvalue()
+
+    def close(self):
+        """停止采样线程和tracemalloc"""
+        self._stop_event.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def report(self, metadata=None):
+        """生成报告字典"""
+        import numpy as np
+
+        return {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'total_wall_time': round(time.perf_counter() - self._start_time, 6),
+            'system': {
+                'platform': platform.platform(),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'cpu_count': os.cpu_count(),
+            },
+            'metadata': metadata or {},
+            'stages': {name: record.to_dict() for name, record in self.records.items()},
+            'timers': {name: round(seconds, 6) for name, seconds in self.timers.items()},
+            'cprofile_stage': self.cprofile_stage,
+        }
+
+    def write_report(self, path, metadata=None):
+        """写出JSON报告；若启用了cProfile，同时写出.prof文件"""
+        self.close()
+        report = self.report(metadata)
+        if self.cprofile_stats is not None:
+            prof_path = os.path.splitext(path)[0] + '.prof'
+            self.cprofile_stats.dump_stats(prof_path)
+            report['cprofile_file'] = prof_path
+            report['cprofile_top'] = self.cprofile_text
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
+
+    def summary(self):
+        """人类可读的分阶段摘要"""
+        lines = [f"{'阶段':<24}{'次数':>6}{'墙钟(s)':>10}{'CPU(s)':>10}{'峰值RSS(MB)':>14}{'分配峰值(MB)':>14}"]
+        for name, record in self.records.items():
+            data = record.to_dict()
+            lines.append(f"{name:<24}{data['calls']:>6}{data['wall_time']:>10.3f}{data['cpu_time']:>10.3f}"
+                         f"{data['peak_rss_mb']:>14.1f}{data['alloc_peak_mb']:>14.1f}")
+        for name, seconds in self.timers.items():
+            lines.append(f"{name:<24}{'':>6}{seconds:>10.3f}")
+        return '\n'.join(lines)
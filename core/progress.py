@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Structured Progress Reporting
+结构化进度事件 - 各处理阶段统一上报完成量、吞吐量和剩余时间
+"""
+
+import json
+import time
+from dataclasses import dataclass, asdict
+
+
+# 阶段名称（事件中的stage字段）及其显示名称
+STAGE_LABELS = {
+    'decode': '解码',
+    'analyze': '频率分析',
+    'vitals': '生命体征',
+    'pyramid': '构建金字塔',
+    'filter': '时域滤波',
+    'collapse': '坍缩金字塔',
+    'encode': '编码',
+}
+
+
+@dataclass
+class ProgressEvent:
+    """单个进度事件"""
+    stage: str
+    done: int
+    total: int
+    unit: str = 'frame'
+    elapsed: float = 0.0
+    rate: float = 0.0          # 每秒完成的单位数
+    eta: float = None          # 预计剩余秒数，未知时为None
+    detail: str = ''
+    finished: bool = False
+
+    @property
+    def fraction(self):
+        """完成比例 (0-1)"""
+        if not self.total:
+            return 0.0
+        return min(1.0, self.done / self.total)
+
+    def to_dict(self):
+        """转换为可JSON序列化的字典"""
+        data = asdict(self)
+        data['fraction'] = round(self.fraction, 4)
+        data['elapsed'] = round(self.elapsed, 3)
+        data['rate'] = round(self.rate, 3)
+        data['eta'] = None if self.eta is None else round(self.eta, 3)
+        return data
+
+    def to_json(self):
+        """单行JSON（用于JSON-lines输出）"""
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+
+def format_progress(event):
+    """格式化为人类可读的单行进度文本"""
+    label = STAGE_LABELS.get(event.stage, event.stage)
+    if event.detail:
+        label = f"{label} ({event.detail})"
+    text = f"{label}: {event.done}/{event.total} ({event.fraction * 100:.1f}%)"
+    if event.rate > 0:
+        text += f" - {event.rate:.1f} {event.unit}/s"
+    if event.eta is not None and not event.finished:
+        text += f" - ETA: {event.eta:.0f}s"
+    return text
+
+
+class ProgressTracker:
+    """单个阶段的进度跟踪器，计算吞吐量和ETA并按时间间隔节流上报"""
+
+    def __init__(self, stage, total, listener=None, unit='frame', detail='', min_interval=0.25):
+        self.stage = stage
+        self.total = int(total or 0)
+        self.listener = listener
+        self.unit = unit
+        self.detail = detail
+        self.min_interval = min_interval
+        self.done = 0
+        self.start_time = time.perf_counter()
+        self._last_emit = None
+        self._finished = False
+
+    def update(self, done=None, advance=1, detail=None):
+        """更新完成量（done为绝对值，否则累加advance）"""
+        self.done = done if done is not None else self.done + advance
+        if detail is not None:
+            self.detail = detail
+        if self.listener is None:
+            return
+        now = time.perf_counter()
+        if self._last_emit is not None and now - self._last_emit < self.min_interval:
+            return
+        self._emit(now)
+
+    def finish(self):
+        """阶段结束时上报最终事件（总是发送）"""
+        if self._finished:
+            return
+        self._finished = True
+        if self.total == 0 or self.done > self.total:
+            self.total = self.done
+        if self.listener is not None:
+            self._emit(time.perf_counter(), finished=True)
+
+    def _emit(self, now, finished=False):
+        """构造并发送事件"""
+        self._last_emit = now
+        elapsed = now - self.start_time
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate > 0 and self.total else None
+        self.listener(ProgressEvent(
+            stage=self.stage, done=self.done, total=self.total, unit=self.unit,
+            elapsed=elapsed, rate=rate, eta=eta, detail=self.detail, finished=finished
+        ))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 只有正常结束时才上报完成事件
+        if exc_type is None:
+            self.finish()
+        return False
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Region of Interest
+感兴趣区域 - 只对ROI（矩形或掩码）加边距后的裁剪区域构建金字塔和滤波，
+放大增量以羽化边缘合成回整帧，计算量与ROI面积而不是整帧面积成正比
+
+自动ROI: 在粗糙高斯层上统计每块的频带内功率，把能量集中的块合并为一个或多个ROI。
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import cv2
+
+
+# 自动ROI: 功率不低于峰值块此比例的块视为有信号
+AUTO_ROI_FRACTION = 0.25
+# 峰值块功率至少为中位数的倍数，否则认为信号不集中（返回空列表，处理整帧）
+AUTO_ROI_CONTRAST = 4.0
+# 统计功率的块大小（粗糙层像素）
+AUTO_ROI_BLOCK = 2
+AUTO_ROI_MAX = 3
+# 预分析时长（秒）和使用的高斯层（第3层为1/8分辨率）
+AUTO_ROI_SECONDS = 5.0
+AUTO_ROI_LEVEL = 3
+
+
+def roi_padding(levels):
+    """裁剪边距（像素）：覆盖最粗层滤波核经pyrUp放大后的影响范围"""
+    return 2 ** (levels + 1)
+
+
+@dataclass
+class RegionOfInterest:
+    """感兴趣区域：矩形 (x, y, width, height)，可选整帧大小的掩码（True为区域内）"""
+    x: int
+    y: int
+    width: int
+    height: int
+    mask: Optional[np.ndarray] = None
+
+    @classmethod
+    def parse(cls, text):
+        """解析 'x,y,w,h'"""
+        parts = [part.strip() for part in text.split(',')]
+        if len(parts) != 4 or not all(re.fullmatch(r'\d+', part) for part in parts):
+            raise ValueError(f"ROI格式应为 x,y,w,h（非负整数）: {text}")
+        x, y, width, height = (int(part) for part in parts)
+        if width <= 0 or height <= 0:
+            raise ValueError(f"ROI宽高必须为正: {text}")
+        return cls(x, y, width, height)
+
+    @classmethod
+    def from_mask(cls, mask):
+        """由整帧掩码（非零为区域内）创建，矩形取掩码的外接框"""
+        mask = np.asarray(mask) > 0
+        if not mask.any():
+            raise ValueError("ROI掩码为空")
+        x, y, width, height = cv2.boundingRect(mask.astype(np.uint8))
+        return cls(x, y, width, height, mask)
+
+    @classmethod
+    def from_mask_file(cls, path, frame_size=None):
+        """读取掩码图像（灰度，>127为区域内），frame_size=(宽, 高)时缩放到视频尺寸"""
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise ValueError(f"无法读取ROI掩码图像: {path}")
+        if frame_size is not None and (image.shape[1], image.shape[0]) != tuple(frame_size):
+            image = cv2.resize(image, tuple(frame_size), interpolation=cv2.INTER_NEAREST)
+        return cls.from_mask(image > 127)
+
+    def clipped(self, frame_width, frame_height):
+        """裁剪到画面范围内的ROI；与画面不相交时报错"""
+        x0, y0 = max(0, self.x), max(0, self.y)
+        x1, y1 = min(frame_width, self.x + self.width), min(frame_height, self.y + self.height)
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError(f"ROI ({self.x},{self.y},{self.width},{self.height}) "
+                             f"不在画面 {frame_width}x{frame_height} 内")
+        if self.mask is not None and self.mask.shape[:2] != (frame_height, frame_width):
+            raise ValueError(f"ROI掩码尺寸 {self.mask.shape[1]}x{self.mask.shape[0]} "
+                             f"与视频 {frame_width}x{frame_height} 不一致")
+        return RegionOfInterest(x0, y0, x1 - x0, y1 - y0, self.mask)
+
+    def crop_bounds(self, frame_width, frame_height, levels=4):
+        """加边距后的裁剪区域 (x0, y0, x1, y1)，不超出画面"""
+        pad = roi_padding(levels)
+        return (max(0, self.x - pad), max(0, self.y - pad),
+                min(frame_width, self.x + self.width + pad), min(frame_height, self.y + self.height + pad))
+
+    def blend_weights(self, bounds, levels=4):
+        """裁剪区域内的合成权重 (h, w, 1)：ROI内为1，在ROI外半个边距内线性羽化到0"""
+        x0, y0, x1, y1 = bounds
+        if self.mask is not None:
+            inside = self.mask[y0:y1, x0:x1]
+        else:
+            inside = np.zeros((y1 - y0, x1 - x0), dtype=bool)
+            inside[self.y - y0:self.y + self.height - y0, self.x - x0:self.x + self.width - x0] = True
+        feather = max(1, roi_padding(levels) // 2)
+        # 区域外像素到区域的距离
+        distance = cv2.distanceTransform((~inside).astype(np.uint8), cv2.DIST_L2, 3)
+        weights = np.clip(1.0 - distance / feather, 0.0, 1.0).astype(np.float32)
+        return weights[..., np.newaxis]
+
+    def describe(self):
+        kind = '掩码' if self.mask is not None else '矩形'
+        return f"{kind} ROI ({self.x},{self.y}) {self.width}x{self.height}"
+
+
+def parse_roi(value, frame_size=None):
+    """命令行ROI: 'x,y,w,h' 或掩码图像路径（'auto'由处理器的suggest_rois处理）"""
+    if re.fullmatch(r'\s*-?\d+(\s*,\s*-?\d+){3}\s*', value):
+        return RegionOfInterest.parse(value)
+    return RegionOfInterest.from_mask_file(value, frame_size)
+
+
+def resolve_roi(value, evm, freq_low, freq_high):
+    """命令行/清单中的ROI值 -> ROI列表或None：'auto'时由evm.suggest_rois自动检测（未发现局部信号则处理整帧）"""
+    if not value:
+        return None
+    if value.strip().lower() == 'auto':
+        return evm.suggest_rois(freq_low, freq_high) or None
+    return parse_roi(value, (evm.width, evm.height))
+
+
+def rois_mask(rois, frame_width, frame_height, size=None):
+    """ROI列表 -> 布尔掩码（True为任一ROI内），size=(宽, 高)时缩放到该尺寸"""
+    mask = np.zeros((frame_height, frame_width), dtype=np.uint8)
+    for roi in rois:
+        roi = roi.clipped(frame_width, frame_height)
+        if roi.mask is not None:
+            mask[roi.mask] = 1
+        else:
+            mask[roi.y:roi.y + roi.height, roi.x:roi.x + roi.width] = 1
+    if size is not None and tuple(size) != (frame_width, frame_height):
+        scaled = cv2.resize(mask.astype(np.float32), tuple(size), interpolation=cv2.INTER_AREA)
+        # 很小的ROI缩小后至少保留覆盖比例最高的像素
+        mask = (scaled >= min(0.5, float(scaled.max()))) & (scaled > 0)
+    return mask > 0
+
+
+def prepare_rois(roi, frame_width, frame_height, levels=4):
+    """ROI裁剪到画面内，并合并羽化区域会重叠的ROI"""
+    rois = [item.clipped(frame_width, frame_height) for item in as_roi_list(roi)]
+    return merge_rois(rois, roi_padding(levels) // 2)
+
+
+def plan_size(rois, frame_width, frame_height, levels=4):
+    """规划用的处理尺寸 (宽, 高)：无ROI时为整帧；多个ROI时宽取最宽的裁剪区域，高按裁剪区域总像素数折算"""
+    if not rois:
+        return frame_width, frame_height
+    bounds = [item.crop_bounds(frame_width, frame_height, levels) for item in rois]
+    width = max(x1 - x0 for x0, y0, x1, y1 in bounds)
+    height = -(-sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in bounds) // width)
+    return width, height
+
+
+def plan_note(rois, width, height, frame_width, frame_height):
+    """执行计划中说明ROI处理区域的注释"""
+    return (f"只处理 {'; '.join(item.describe() for item in rois)}，"
+            f"裁剪区域共 {width * height} 像素（原始 {frame_width}x{frame_height}）")
+
+
+def composite(frame, original, processed, bounds, weights):
+    """把裁剪区域的放大增量按权重合成回整帧（frame为uint8帧，原地修改并返回；区域外像素不变）"""
+    x0, y0, x1, y1 = bounds
+    region = frame[y0:y1, x0:x1].astype(np.float32) / 255.0
+    region += weights * (processed - original)
+    frame[y0:y1, x0:x1] = np.clip(region * 255, 0, 255).astype(np.uint8)
+    return frame
+
+
+def as_roi_list(roi):
+    """单个ROI或ROI列表 -> 列表（None -> 空列表）"""
+    if roi is None:
+        return []
+    if isinstance(roi, RegionOfInterest):
+        return [roi]
+    return list(roi)
+
+
+def merge_rois(rois, margin):
+    """合并羽化区域会重叠（间距小于2*margin）的矩形ROI，避免增量被重复叠加；合并后不保留掩码"""
+    rois = list(rois)
+    merged = True
+    while merged and len(rois) > 1:
+        merged = False
+        for i in range(len(rois)):
+            for j in range(i + 1, len(rois)):
+                a, b = rois[i], rois[j]
+                if (a.x - margin < b.x + b.width + margin and b.x - margin < a.x + a.width + margin and
+                        a.y - margin < b.y + b.height + margin and b.y - margin < a.y + a.height + margin):
+                    x0, y0 = min(a.x, b.x), min(a.y, b.y)
+                    x1, y1 = max(a.x + a.width, b.x + b.width), max(a.y + a.height, b.y + b.height)
+                    rois[i] = RegionOfInterest(x0, y0, x1 - x0, y1 - y0)
+                    del rois[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return rois
+
+
+def propose_rois(power, scale, frame_size, max_rois=AUTO_ROI_MAX, block=AUTO_ROI_BLOCK):
+    """由粗糙层的频带内功率图提出ROI（按块内总功率从大到小）
+
+    power为粗糙层每像素的频带内功率，scale为粗糙层到原视频的缩放倍数，frame_size=(宽, 高)。
+    峰值块不明显高于中位数时返回空列表。
+    """
+    height, width = power.shape
+    grid = (max(1, -(-width // block)), max(1, -(-height // block)))
+    blocks = cv2.resize(power.astype(np.float32), grid, interpolation=cv2.INTER_AREA)
+    peak = float(blocks.max())
+    if peak <= 0 or peak < AUTO_ROI_CONTRAST * float(np.median(blocks)):
+        return []
+
+    # 向外扩展一块，包含只被信号部分覆盖的边缘块
+    active = cv2.dilate((blocks >= AUTO_ROI_FRACTION * peak).astype(np.uint8), np.ones((3, 3), np.uint8))
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(active, connectivity=8)
+    # 块坐标 -> 原视频像素
+    cell_x = width * scale / grid[0]
+    cell_y = height * scale / grid[1]
+    candidates = []
+    for label in range(1, count):
+        bx, by, bw, bh = stats[label, :4]
+        x0, y0 = int(bx * cell_x), int(by * cell_y)
+        x1 = min(frame_size[0], int(np.ceil((bx + bw) * cell_x)))
+        y1 = min(frame_size[1], int(np.ceil((by + bh) * cell_y)))
+        candidates.append((float(blocks[labels == label].sum()), RegionOfInterest(x0, y0, x1 - x0, y1 - y0)))
+    candidates.sort(key=lambda item: -item[0])
+    return [roi for _, roi in candidates[:max_rois]]
+
+
+def draw_rois(frame, rois, color=(0, 200, 255), thickness=2):
+    """在帧的副本上绘制ROI矩形（叠加显示）"""
+    frame = frame.copy()
+    for roi in rois:
+        cv2.rectangle(frame, (roi.x, roi.y), (roi.x + roi.width - 1, roi.y + roi.height - 1), color, thickness)
+    return frame
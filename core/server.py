@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Local Render Server
+本地渲染服务 - 常驻进程保持依赖已导入，通过localhost HTTP/JSON接口提交和管理渲染任务
+
+接口:
+  POST   /jobs                 提交任务（JSON，字段同批量清单，另有priority），返回任务信息
+  GET    /jobs                 任务列表
+  GET    /jobs/<id>            任务状态和最新进度
+  GET    /jobs/<id>/events     进度事件流（text/event-stream，?since=N 从第N个事件开始）
+  POST   /jobs/<id>/cancel     取消排队或运行中的任务（也可用 DELETE /jobs/<id>）
+  GET    /jobs/<id>/output     下载输出视频
+  GET    /health               服务状态
+
+用法:
+  evm serve --port 8765 --workers 2 -o renders/
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from .batch import BatchJob, render_job
+from .cancellation import CancellationToken, ProcessingCancelled
+from . import planner
+
+
+JOB_STATES = ('queued', 'running', 'done', 'failed', 'cancelled')
+FINAL_STATES = ('done', 'failed', 'cancelled')
+
+
+class RenderJob:
+    """服务中的一个任务：参数、状态和进度事件"""
+
+    def __init__(self, job, priority=0):
+        self.id = uuid.uuid4().hex[:12]
+        self.job = job
+        self.priority = priority
+        self.status = 'queued'
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.output = None
+        self.error = None
+        self.strategy = None
+        self.cancel_token = CancellationToken()
+        self.events = []
+        self.changed = threading.Condition()
+
+    def add_event(self, data):
+        """追加事件并唤醒等待事件流的连接"""
+        with self.changed:
+            data['seq'] = len(self.events)
+            self.events.append(data)
+            self.changed.notify_all()
+
+    def set_status(self, status, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.status = status
+        self.add_event({'type': 'status', 'status': status, 'error': self.error, 'output': self.output})
+
+    def to_dict(self):
+        progress = next((e for e in reversed(self.events) if e.get('type') == 'progress'), None)
+        return {
+            'id': self.id,
+            'status': self.status,
+            'priority': self.priority,
+            'input': self.job.input,
+            'output': self.output,
+            'strategy': self.strategy,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'wall_time': round(self.finished - self.started, 3) if self.finished and self.started else None,
+            'progress': progress,
+            'events': len(self.events),
+        }
+
+
+class RenderServer:
+    """任务队列和工作线程池
+
+    工作线程在同一进程中运行，cv2/numpy/scipy只导入一次；启动时预先运行规划器校准，
+    后续任务的规划不再重复微基准。numpy的FFT没有可复用的计划对象，预热只涉及导入和校准缓存。
+    按priority从高到低、同优先级按提交顺序调度，同时运行的任务数不超过workers。
+    """
+
+    def __init__(self, output_dir='renders', workers=1, memory_budget_bytes=None):
+        self.output_dir = os.path.abspath(output_dir)
+        self.workers = max(1, workers)
+        if memory_budget_bytes is None:
+            memory_budget_bytes = planner.available_memory_bytes() * planner.DEFAULT_MEMORY_FRACTION
+        self.memory_budget_bytes = memory_budget_bytes
+        self.jobs = {}
+        self._queue = []
+        self._counter = itertools.count()
+        self._lock = threading.Condition()
+        self._threads = []
+        self._stopping = False
+
+    def warm_up(self):
+        """导入重依赖并运行规划器校准"""
+        import contextlib
+        import io
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            from . import evm_core  # noqa: F401
+            for mode in ('motion', 'color', 'hybrid'):
+                planner.calibrate(mode)
+        print(f"预热完成: {time.perf_counter() - start:.2f}s")
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"evm-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """停止调度并取消所有未完成的任务"""
+        with self._lock:
+            self._stopping = True
+            self._lock.notify_all()
+            # 在锁内取快照：请求线程可能同时提交新任务
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            if job.status not in FINAL_STATES:
+                self.cancel(job.id, "服务停止")
+        for thread in self._threads:
+            thread.join(timeout=10)
+
+    def submit(self, data):
+        """提交任务，data为批量清单格式的字典（另可包含priority）"""
+        data = dict(data)
+        priority = int(data.pop('priority', 0))
+        job = BatchJob.from_dict(data)
+        if not os.path.isfile(job.input):
+            raise ValueError(f"输入文件不存在: {job.input}")
+
+        render = RenderJob(job, priority)
+        if not job.output:
+            stem = os.path.splitext(os.path.basename(job.input))[0]
+            job.output = os.path.join(self.output_dir, f"{stem}_{render.id}.mp4")
+        render.add_event({'type': 'status', 'status': 'queued'})
+        with self._lock:
+            self.jobs[render.id] = render
+            heapq.heappush(self._queue, (-priority, next(self._counter), render.id))
+            self._lock.notify()
+        return render
+
+    def cancel(self, job_id, reason="用户取消"):
+        """取消任务：排队中的直接标记为已取消，运行中的在一帧之内停止"""
+        job = self.jobs[job_id]
+        with self._lock:
+            if job.status == 'queued':
+                job.cancel_token.cancel(reason)
+                job.set_status('cancelled', finished=time.time(), error=reason)
+                return job
+        job.cancel_token.cancel(reason)
+        return job
+
+    def _next_job(self):
+        with self._lock:
+            while True:
+                if self._stopping:
+                    return None
+                while self._queue:
+                    _, _, job_id = heapq.heappop(self._queue)
+                    job = self.jobs[job_id]
+                    if job.status == 'queued':
+                        job.set_status('running', started=time.time())
+                        return job
+                self._lock.wait()
+
+    def _worker_loop(self):
+        budget = self.memory_budget_bytes / self.workers
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            def listener(event, job=job):
+                job.add_event({'type': 'progress', **event.to_dict()})
+
+            try:
+                _, plan, output_path = render_job(job.job, budget, job.cancel_token, listener)
+                job.strategy = plan.strategy
+                job.set_status('done', output=output_path, finished=time.time())
+            except ProcessingCancelled as e:
+                job.set_status('cancelled', error=str(e), finished=time.time())
+            except Exception as e:
+                job.set_status('failed', error=f"{type(e).__name__}: {e}", finished=time.time())
+
+    def status(self):
+        counts = {state: sum(job.status == state for job in self.jobs.values()) for state in JOB_STATES}
+        return {'workers': self.workers, 'output_dir': self.output_dir,
+                'memory_budget_mb': round(self.memory_budget_bytes / 1024 / 1024, 1), 'jobs': counts}
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """HTTP/JSON接口"""
+
+    server_version = 'EVMRenderServer/1.0'
+
+    @property
+    def render_server(self):
+        return self.server.render_server
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send_json({'error': message}, status)
+
+    def _route(self):
+        """解析路径为 (任务, 子资源)"""
+        parts = [part for part in urlparse(self.path).path.split('/') if part]
+        if not parts or parts[0] != 'jobs':
+            return parts, None, None
+        job = self.render_server.jobs.get(parts[1]) if len(parts) > 1 else None
+        action = parts[2] if len(parts) > 2 else None
+        return parts, job, action
+
+    def do_GET(self):
+        parts, job, action = self._route()
+        if parts == ['health']:
+            return self._send_json(self.render_server.status())
+        if parts == ['jobs']:
+            jobs = sorted(self.render_server.jobs.values(), key=lambda j: j.created)
+            return self._send_json([j.to_dict() for j in jobs])
+        if job is None:
+            return self._error(404, '任务不存在')
+        if action is None:
+            return self._send_json(job.to_dict())
+        if action == 'events':
+            return self._stream_events(job)
+        if action == 'output':
+            return self._send_output(job)
+        return self._error(404, '未知接口')
+
+    def do_POST(self):
+        parts, job, action = self._route()
+        if parts == ['jobs']:
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                data = json.loads(self.rfile.read(length) or b'{}')
+                render = self.render_server.submit(data)
+            except (ValueError, TypeError) as e:
+                return self._error(400, str(e))
+            return self._send_json(render.to_dict(), 201)
+        if job is not None and action == 'cancel':
+            return self._send_json(self.render_server.cancel(job.id).to_dict())
+        return self._error(404, '未知接口')
+
+    def do_DELETE(self):
+        parts, job, action = self._route()
+        if job is None or action is not None:
+            return self._error(404, '任务不存在')
+        return self._send_json(self.render_server.cancel(job.id).to_dict())
+
+    def _stream_events(self, job):
+        """以Server-Sent Events推送事件，任务结束后关闭连接"""
+        query = parse_qs(urlparse(self.path).query)
+        try:
+            index = max(0, int(query.get('since', ['0'])[0]))
+        except ValueError:
+            return self._error(400, 'since必须为整数')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        try:
+            while True:
+                # 只在锁内读取事件，写socket在锁外进行（客户端不读取时不阻塞工作线程）
+                with job.changed:
+                    if index >= len(job.events) and job.status not in FINAL_STATES:
+                        job.changed.wait(timeout=15)
+                    pending = job.events[index:]
+                    done = job.status in FINAL_STATES
+                if not pending and not done:
+                    # 保持连接的注释行
+                    self.wfile.write(b': keep-alive\n\n')
+                    self.wfile.flush()
+                    continue
+                for event in pending:
+                    self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+                index += len(pending)
+                self.wfile.flush()
+                if done and index >= len(job.events):
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def _send_output(self, job):
+        if job.status != 'done' or not job.output or not os.path.exists(job.output):
+            return self._error(409, f"输出尚不可用（任务状态: {job.status}）")
+        size = os.path.getsize(job.output)
+        content_type = 'video/quicktime' if job.output.endswith('.mov') else 'video/mp4'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(size))
+        self.send_header('Content-Disposition', f'attachment; filename="{os.path.basename(job.output)}"')
+        self.end_headers()
+        try:
+            with open(job.output, 'rb') as f:
+                while True:
+                    chunk = f.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端在下载完成前断开
+            return
+
+
+def create_server(render_server, host='127.0.0.1', port=8765, verbose=False):
+    """创建HTTP服务（port=0时由系统分配端口）"""
+    httpd = ThreadingHTTPServer((host, port), RenderRequestHandler)
+    httpd.daemon_threads = True
+    httpd.render_server = render_server
+    httpd.verbose = verbose
+    return httpd
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='evm serve', description='欧拉视频放大 - 本地渲染服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址（默认只接受本机连接）')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='同时运行的任务数')
+    parser.add_argument('-o', '--output-dir', default='renders', help='未指定输出路径的任务的输出目录')
+    parser.add_argument('--memory-budget', type=float, default=None, metavar='MB',
+                        help='所有工作线程共用的内存预算 (MB)，默认为可用内存的60%%')
+    parser.add_argument('--no-warm-up', action='store_true', help='跳过启动时的预热')
+    parser.add_argument('-v', '--verbose', action='store_true', help='记录每个HTTP请求')
+    args = parser.parse_args(argv)
+
+    memory_budget = args.memory_budget * 1024 * 1024 if args.memory_budget else None
+    render_server = RenderServer(args.output_dir, args.workers, memory_budget)
+    if not args.no_warm_up:
+        render_server.warm_up()
+    render_server.start()
+
+    httpd = create_server(render_server, args.host, args.port, args.verbose)
+    host, port = httpd.server_address[:2]
+    print(f"渲染服务已启动: http://{host}:{port} ({render_server.workers} 个工作线程, 输出目录 {render_server.output_dir})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n正在停止渲染服务...")
+    finally:
+        httpd.server_close()
+        render_server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
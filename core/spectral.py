@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Spectral Heatmap
+空间频谱图 - 在粗糙高斯层上把每帧按块平均（YCrCb三个通道），
+对所有块的时间序列做一次向量化FFT，得到每块的主频率和频带功率
+
+整帧平均成一个亮度值时，小面积的起伏会被静止背景淹没；按块统计后
+脉动的皮肤、振动的部件等局部信号在热力图上一目了然。粗糙层每帧只有
+几百个块，分析成本远小于一次完整渲染。
+
+整段视频的频率分析逐帧只保留统计量，用Welch法（分段加窗平均）累积功率谱，
+常驻内存与视频长度无关；同一信号的短时傅里叶变换（时频图）显示频率随时间的漂移。
+"""
+
+import numpy as np
+import cv2
+
+
+# 分析使用的高斯层（第3层为1/8分辨率）和每块大小（粗糙层像素）
+SPECTRAL_LEVEL = 3
+SPECTRAL_BLOCK = 4
+SPECTRAL_CHANNELS = ('Y', 'Cr', 'Cb')
+# 低于此频率的成分视为缓慢漂移，不参与主频率
+SPECTRAL_MIN_FREQ = 0.1
+# Welch功率谱每段时长（秒），决定频率分辨率（1/秒）
+WELCH_SECONDS = 10.0
+MIN_WELCH_FRAMES = 16
+# 时频图（短时傅里叶变换）的窗口和步长（秒）；FFT补零到窗口的ZERO_PAD倍使频率轴更平滑
+STFT_SECONDS = 5.0
+STFT_HOP_SECONDS = 0.5
+STFT_ZERO_PAD = 4
+
+
+def coarse_size(width, height, level=SPECTRAL_LEVEL):
+    """第level层高斯金字塔的尺寸 (宽, 高)"""
+    for _ in range(level):
+        width, height = (width + 1) // 2, (height + 1) // 2
+    return max(1, width), max(1, height)
+
+
+def block_grid(width, height, level=SPECTRAL_LEVEL, block=SPECTRAL_BLOCK):
+    """原视频尺寸 -> 块网格 (列数, 行数)"""
+    coarse_w, coarse_h = coarse_size(width, height, level)
+    return max(1, -(-coarse_w // block)), max(1, -(-coarse_h // block))
+
+
+def block_means(frame, grid, level=SPECTRAL_LEVEL):
+    """一帧（uint8 BGR）-> 每块的YCrCb平均值 (行数, 列数, 3)，取值0-1
+
+    已按粗糙层尺寸解码的帧传入level=0。
+    """
+    coarse = cv2.cvtColor(frame, cv2.COLOR_BGR2YCrCb).astype(np.float32) / 255.0
+    for _ in range(level):
+        coarse = cv2.pyrDown(coarse)
+    return cv2.resize(coarse, grid, interpolation=cv2.INTER_AREA)
+
+
+def segment_power(segment, nfft=None):
+    """一段时间序列（沿axis 0）去均值、加汉宁窗后的功率谱（nfft大于段长时补零）"""
+    window = np.hanning(len(segment)).astype(np.float32).reshape((-1,) + (1,) * (segment.ndim - 1))
+    spectrum = np.fft.rfft((segment - segment.mean(axis=0)) * window, n=nfft, axis=0)
+    return np.square(np.abs(spectrum)) / max(float(np.sum(np.square(window))), 1e-12)
+
+
+class WelchPSD:
+    """逐帧累积的Welch功率谱：每段nperseg帧、相邻段重叠一半，各段功率谱取平均
+
+    push(values) 每次输入一帧的统计量（标量或任意形状的数组），常驻内存只有一段，
+    与视频长度无关；视频不足一段时finish()用已有的帧作为唯一一段。
+    """
+
+    def __init__(self, nperseg, shape=()):
+        self.nperseg = int(nperseg)
+        self.step = max(1, self.nperseg // 2)
+        self.buffer = np.zeros((self.nperseg,) + tuple(shape), dtype=np.float32)
+        self.filled = 0
+        self.pushed = 0
+        self.segments = 0
+        self._power_sum = None
+
+    def push(self, values):
+        self.buffer[self.filled] = values
+        self.filled += 1
+        self.pushed += 1
+        if self.filled == self.nperseg:
+            self._accumulate(self.buffer)
+            # 保留后半段作为下一段的开头
+            self.buffer[:self.nperseg - self.step] = self.buffer[self.step:]
+            self.filled = self.nperseg - self.step
+
+    def _accumulate(self, segment):
+        power = segment_power(segment)
+        self._power_sum = power if self._power_sum is None else self._power_sum + power
+        self.segments += 1
+
+    def current(self, fps):
+        """已完成分段的平均功率谱 (频率, 功率)，尚无完整分段时返回None（不影响继续输入）"""
+        if self.segments == 0:
+            return None
+        return np.fft.rfftfreq(self.nperseg, 1.0 / fps), self._power_sum / self.segments
+
+    def finish(self, fps):
+        """(频率, 平均功率谱)"""
+        if self.segments == 0:
+            if self.filled < 2:
+                raise ValueError(f"帧数太少（{self.filled}），无法计算功率谱")
+            self._accumulate(self.buffer[:self.filled])
+            length = self.filled
+        else:
+            length = self.nperseg
+        return np.fft.rfftfreq(length, 1.0 / fps), self._power_sum / self.segments
+
+
+def welch_segment_length(fps, num_frames, seconds=WELCH_SECONDS):
+    """Welch每段帧数：约seconds秒，不超过视频长度"""
+    return min(num_frames, max(MIN_WELCH_FRAMES, int(round(seconds * fps))))
+
+
+class StreamingSpectrogram:
+    """逐帧输入标量信号的短时傅里叶变换：每hop帧计算一次最近nperseg帧的功率谱
+
+    常驻内存为一个窗口加上每个时间步一行功率谱（与视频长度成正比但很小，
+    20分钟30fps视频约2400行）。
+    """
+
+    def __init__(self, nperseg, hop, nfft=None):
+        self.nperseg = int(nperseg)
+        self.hop = max(1, int(hop))
+        self.nfft = max(self.nperseg, int(nfft or self.nperseg))
+        self.buffer = np.zeros(self.nperseg, dtype=np.float32)
+        self.filled = 0
+        self.pushed = 0
+        self.rows = []
+        self.centers = []
+
+    @classmethod
+    def for_video(cls, fps, num_frames, seconds=STFT_SECONDS, hop_seconds=STFT_HOP_SECONDS,
+                  zero_pad=STFT_ZERO_PAD):
+        """按帧率选择窗口和步长，窗口不超过视频长度"""
+        nperseg = min(max(num_frames, 2), max(MIN_WELCH_FRAMES, int(round(seconds * fps))))
+        hop = max(1, int(round(hop_seconds * fps)))
+        return cls(nperseg, hop, nperseg * zero_pad)
+
+    def push(self, value):
+        self.buffer[self.filled] = value
+        self.filled += 1
+        self.pushed += 1
+        if self.filled == self.nperseg:
+            self.rows.append(segment_power(self.buffer, self.nfft).astype(np.float32))
+            # 窗口中心（帧号）
+            self.centers.append(self.pushed - self.nperseg / 2.0)
+            self.buffer[:self.nperseg - self.hop] = self.buffer[self.hop:]
+            self.filled = max(0, self.nperseg - self.hop)
+
+    def result(self, fps):
+        """时频图字典，尚无完整窗口时返回None
+
+        times为各窗口中心的时间（秒），power为 (时间数, 频率数) 的功率。
+        """
+        if not self.rows:
+            return None
+        return {
+            'times': np.asarray(self.centers, dtype=np.float64) / fps,
+            'frequencies': np.fft.rfftfreq(self.nfft, 1.0 / fps),
+            'power': np.array(self.rows, dtype=np.float32),
+            'fps': float(fps),
+            'window': self.nperseg,
+            'hop': self.hop,
+        }
+
+
+def track_peak(spectrogram, freq_low, freq_high):
+    """频带内每个时间步的峰值频率（Hz），用于让频带跟随漂移的信号"""
+    frequencies = spectrogram['frequencies']
+    band = (frequencies >= freq_low) & (frequencies <= freq_high)
+    if not band.any():
+        raise ValueError(f"频带 {freq_low}-{freq_high} Hz 内没有频率点")
+    return frequencies[band][np.argmax(spectrogram['power'][:, band], axis=1)]
+
+
+def save_spectrogram(path, spectrogram, freq_low=None, freq_high=None):
+    """导出时频图为 .npz（times, frequencies, power, fps, window, hop；给出频带时附带peak_frequency）"""
+    arrays = {key: np.asarray(value) for key, value in spectrogram.items()}
+    if freq_low is not None and freq_high is not None:
+        arrays['peak_frequency'] = track_peak(spectrogram, freq_low, freq_high)
+        arrays['band'] = np.array([freq_low, freq_high])
+    np.savez_compressed(path, **arrays)
+    return path
+
+
+def spectral_map(series, fps, freq_low=None, freq_high=None, block_size=None):
+    """块时间序列 (帧数, 行数, 列数, 通道) -> 每块每通道的主频率和频带功率
+
+    去均值并加汉宁窗后沿时间轴一次rfft；未给出频带时频带功率取
+    SPECTRAL_MIN_FREQ 到奈奎斯特频率之间的全部功率。block_size为每块在原视频中的像素数（仅记录）。
+    """
+    series = np.asarray(series, dtype=np.float32)
+    frequencies = np.fft.rfftfreq(series.shape[0], 1.0 / fps)
+    return summarize_power(frequencies, segment_power(series), fps, freq_low, freq_high, block_size)
+
+
+def summarize_power(frequencies, power, fps, freq_low=None, freq_high=None, block_size=None):
+    """每块的功率谱 (频率数, 行数, 列数, 通道) -> 主频率和频带功率（见spectral_map）"""
+    valid = frequencies >= SPECTRAL_MIN_FREQ
+    if not valid.any():
+        raise ValueError(f"帧数太少（{(len(frequencies) - 1) * 2}），无法分辨 {SPECTRAL_MIN_FREQ} Hz 以上的频率")
+    valid_power = power[valid]
+    dominant = frequencies[valid][np.argmax(valid_power, axis=0)]
+
+    low = SPECTRAL_MIN_FREQ if freq_low is None else freq_low
+    high = fps / 2.0 if freq_high is None else freq_high
+    band = (frequencies >= low) & (frequencies <= high)
+    band_power = power[band].sum(axis=0) if band.any() else np.zeros(power.shape[1:], dtype=np.float32)
+
+    return {
+        'frequencies': frequencies,
+        'dominant': dominant.astype(np.float32),
+        'band_power': band_power.astype(np.float32),
+        'band': (low, high),
+        'channels': SPECTRAL_CHANNELS,
+        'block_size': block_size,
+    }
+
+
+def strongest_block(result, channel=0):
+    """频带功率最大的块 (行, 列, 主频率, 功率)"""
+    band_power = result['band_power'][..., channel]
+    row, col = np.unravel_index(int(np.argmax(band_power)), band_power.shape)
+    return int(row), int(col), float(result['dominant'][row, col, channel]), float(band_power[row, col])
+
+
+def heatmap_image(values, size, background=None, alpha=0.6, value_range=None):
+    """块数值 (行数, 列数) -> 伪彩色热力图（BGR uint8，size=(宽, 高)），可叠加在背景帧上
+
+    value_range=(最小, 最大) 固定色标（如主频率），默认按数值范围归一化。
+    """
+    values = np.asarray(values, dtype=np.float32)
+    low, high = value_range if value_range is not None else (float(values.min()), float(values.max()))
+    scaled = np.clip((values - low) / max(high - low, 1e-12), 0.0, 1.0)
+    colored = cv2.applyColorMap((scaled * 255).astype(np.uint8), cv2.COLORMAP_JET)
+    colored = cv2.resize(colored, tuple(size), interpolation=cv2.INTER_NEAREST)
+    if background is None:
+        return colored
+    background = cv2.resize(background, tuple(size), interpolation=cv2.INTER_AREA)
+    return cv2.addWeighted(colored, alpha, background, 1.0 - alpha, 0)
+
+
+def spectrum_image(frequencies, magnitudes, size, band=None, max_freq=None):
+    """幅度谱折线图（BGR uint8，size=(宽, 高)），band=(低, 高)时以浅色标出频带"""
+    width, height = size
+    image = np.full((height, width, 3), (35, 30, 30), dtype=np.uint8)
+    frequencies = np.asarray(frequencies, dtype=np.float32)
+    magnitudes = np.asarray(magnitudes, dtype=np.float32)
+    keep = frequencies >= SPECTRAL_MIN_FREQ
+    if max_freq is not None:
+        keep &= frequencies <= max_freq
+    if keep.sum() < 2:
+        return image
+    frequencies, magnitudes = frequencies[keep], magnitudes[keep]
+    f0, f1 = float(frequencies[0]), float(frequencies[-1])
+
+    def x_of(freq):
+        return int(round((freq - f0) / max(f1 - f0, 1e-12) * (width - 1)))
+
+    if band is not None:
+        cv2.rectangle(image, (x_of(max(band[0], f0)), 0), (x_of(min(band[1], f1)), height - 1), (70, 55, 45), -1)
+    peak = max(float(magnitudes.max()), 1e-12)
+    points = np.stack([[x_of(freq) for freq in frequencies],
+                       (height - 1 - magnitudes / peak * (height - 6)).astype(int)], axis=1)
+    cv2.polylines(image, [points.astype(np.int32)], False, (255, 180, 100), 1, cv2.LINE_AA)
+    return image
+
+
+def spectrogram_image(spectrogram, size, band=None, max_freq=None, dynamic_range=40.0):
+    """时频图图像（BGR uint8，size=(宽, 高)）：横轴时间、纵轴频率（低频在下），功率取dB
+
+    band=(低, 高) 时画出频带边界并叠加频带内的峰值频率轨迹。
+    """
+    width, height = size
+    frequencies = spectrogram['frequencies']
+    keep = frequencies >= SPECTRAL_MIN_FREQ
+    if max_freq is not None:
+        keep &= frequencies <= max_freq
+    power = spectrogram['power'][:, keep]
+    frequencies = frequencies[keep]
+    if power.size == 0:
+        return np.zeros((height, width, 3), dtype=np.uint8)
+
+    decibels = 10 * np.log10(np.maximum(power, 1e-20))
+    top = float(decibels.max())
+    scaled = np.clip((decibels - (top - dynamic_range)) / dynamic_range, 0.0, 1.0)
+    # (频率, 时间)，低频在图像底部
+    image = cv2.applyColorMap((scaled.T[::-1] * 255).astype(np.uint8), cv2.COLORMAP_INFERNO)
+    image = cv2.resize(image, (width, height), interpolation=cv2.INTER_LINEAR)
+
+    if band is not None:
+        f0, f1 = float(frequencies[0]), float(frequencies[-1])
+
+        def y_of(freq):
+            return int(round((1.0 - (freq - f0) / max(f1 - f0, 1e-12)) * (height - 1)))
+
+        for edge in band:
+            if f0 <= edge <= f1:
+                cv2.line(image, (0, y_of(edge)), (width - 1, y_of(edge)), (200, 200, 200), 1)
+        try:
+            peaks = track_peak(spectrogram, *band)
+        except ValueError:
+            return image
+        count = len(peaks)
+        points = np.array([[int(round((i + 0.5) / count * (width - 1))), y_of(min(max(freq, f0), f1))]
+                           for i, freq in enumerate(peaks)], dtype=np.int32)
+        cv2.polylines(image, [points], False, (255, 255, 120), 1, cv2.LINE_AA)
+    return image
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Vital Sign Extraction
+生命体征提取 - 一次流式解码，用积分图计算多个ROI的逐帧平均颜色，
+在滑动窗口上跟踪频带内的峰值频率，输出心率 (BPM) 和呼吸频率（次/分）时间序列
+
+不渲染视频：每帧只计算一次积分图（与ROI数量无关），每个ROI的平均值只需四次查表。
+心率使用色度信号（CHROM：按窗口均值归一化的RGB组合，对血容量变化敏感、
+对光照强度和运动较不敏感），呼吸使用亮度信号（胸腹起伏引起的明暗变化）。
+
+用法:
+  evm vitals face.mp4 --roi 420,180,120,100 --roi 300,500,300,200 -o vitals.csv
+  evm vitals clip.mp4 --roi auto -o vitals.json
+"""
+
+import argparse
+import csv
+import json
+import sys
+
+import numpy as np
+import cv2
+
+from .spectral import segment_power
+
+
+# 心率频带 42-180 BPM，呼吸频带 6-42 次/分 (Hz)
+PULSE_BAND = (0.7, 3.0)
+RESPIRATION_BAND = (0.1, 0.7)
+# 滑动窗口和输出间隔（秒）：呼吸周期长，需要更长的窗口
+PULSE_WINDOW_SECONDS = 10.0
+RESPIRATION_WINDOW_SECONDS = 30.0
+VITALS_HOP_SECONDS = 1.0
+# FFT补零倍数（峰值频率的插值精度）
+VITALS_ZERO_PAD = 8
+# 解码使用的高斯层（第1层为1/2分辨率，ROI平均值几乎不受影响）
+VITALS_LEVEL = 1
+
+CSV_FIELDS = ['time', 'roi', 'bpm', 'pulse_quality', 'breaths_per_minute', 'respiration_quality']
+
+
+class RoiMeans:
+    """用积分图求多个矩形ROI的平均颜色（每个ROI与面积无关的O(1)开销）
+
+    rois为原视频坐标的RegionOfInterest列表（掩码ROI使用其外接矩形），
+    size=(宽, 高)为实际解码尺寸，矩形按比例缩放到该尺寸（至少1像素）。
+    """
+
+    def __init__(self, rois, frame_size, size=None):
+        frame_width, frame_height = frame_size
+        width, height = size or frame_size
+        sx, sy = width / frame_width, height / frame_height
+        bounds = []
+        for roi in rois:
+            roi = roi.clipped(frame_width, frame_height)
+            x0 = min(width - 1, int(roi.x * sx))
+            y0 = min(height - 1, int(roi.y * sy))
+            x1 = max(x0 + 1, min(width, int(round((roi.x + roi.width) * sx))))
+            y1 = max(y0 + 1, min(height, int(round((roi.y + roi.height) * sy))))
+            bounds.append((x0, y0, x1, y1))
+        self.x0, self.y0, self.x1, self.y1 = (np.array(column) for column in zip(*bounds))
+        self.areas = ((self.x1 - self.x0) * (self.y1 - self.y0)).astype(np.float64)[:, np.newaxis]
+        # 整帧像素和超过int32范围时用float64积分图
+        self.depth = cv2.CV_32S if 255 * width * height < 2 ** 31 else cv2.CV_64F
+
+    def __call__(self, frame):
+        """一帧（uint8 BGR）-> (ROI数, 3) 的BGR平均值，取值0-1"""
+        integral = cv2.integral(frame, sdepth=self.depth)
+        sums = (integral[self.y1, self.x1].astype(np.float64) - integral[self.y0, self.x1]
+                - integral[self.y1, self.x0] + integral[self.y0, self.x0])
+        return sums / self.areas / 255.0
+
+
+def chrom_signal(window):
+    """CHROM脉搏信号：window为 (帧数, ROI数, 3) 的BGR平均值 -> (帧数, ROI数)"""
+    normalized = window / np.maximum(window.mean(axis=0), 1e-6)
+    blue, green, red = normalized[..., 0], normalized[..., 1], normalized[..., 2]
+    x = 3.0 * red - 2.0 * green
+    y = 1.5 * red + green - 1.5 * blue
+    alpha = x.std(axis=0) / np.maximum(y.std(axis=0), 1e-9)
+    return x - alpha * y
+
+
+def luma_signal(window):
+    """亮度信号：window为 (帧数, ROI数, 3) 的BGR平均值 -> (帧数, ROI数)"""
+    return window @ np.array([0.114, 0.587, 0.299])
+
+
+class SlidingPeakTracker:
+    """滑动窗口上的频带内峰值频率跟踪（所有ROI向量化计算）
+
+    push() 把每帧的ROI平均值写入最近nperseg帧的循环缓冲区；窗口已满后estimate()
+    对窗口内的信号（signal_fn把BGR平均值转换为标量信号）计算加窗功率谱，
+    返回每个ROI的峰值频率（Hz）和质量（峰值附近±0.1 Hz的功率占频带内功率的比例）。
+    """
+
+    def __init__(self, fps, seconds, band, signal_fn, num_rois, zero_pad=VITALS_ZERO_PAD):
+        self.nperseg = max(8, int(round(seconds * fps)))
+        self.signal_fn = signal_fn
+        self.buffer = np.zeros((self.nperseg, num_rois, 3), dtype=np.float64)
+        self.filled = 0
+        self.nfft = self.nperseg * zero_pad
+        frequencies = np.fft.rfftfreq(self.nfft, 1.0 / fps)
+        self.band = (frequencies >= band[0]) & (frequencies <= band[1])
+        self.frequencies = frequencies[self.band]
+        self.peak_width = max(1, int(round(0.1 / (fps / self.nfft))))
+
+    def push(self, means, frame_index):
+        """输入第frame_index帧的ROI平均值（帧号连续）"""
+        self.buffer[frame_index % self.nperseg] = means
+        self.filled = min(self.filled + 1, self.nperseg)
+
+    @property
+    def ready(self):
+        return self.filled == self.nperseg
+
+    def estimate(self, frame_index):
+        """以第frame_index帧结尾的窗口的 (峰值频率, 质量)，窗口未满时返回None"""
+        if not self.ready:
+            return None
+        # 循环缓冲区按时间顺序展开
+        start = (frame_index + 1) % self.nperseg
+        window = np.roll(self.buffer, -start, axis=0) if start else self.buffer
+        power = segment_power(self.signal_fn(window), self.nfft)[self.band]
+        peaks = np.argmax(power, axis=0)
+        columns = np.arange(power.shape[1])
+        cumulative = np.vstack([np.zeros((1, power.shape[1])), np.cumsum(power, axis=0)])
+        lo = np.maximum(peaks - self.peak_width, 0)
+        hi = np.minimum(peaks + self.peak_width + 1, len(power))
+        near_peak = cumulative[hi, columns] - cumulative[lo, columns]
+        quality = near_peak / np.maximum(cumulative[-1], 1e-20)
+        return self.frequencies[peaks], quality
+
+
+class VitalSignExtractor:
+    """逐帧输入，输出每个ROI的心率和呼吸频率记录
+
+    记录的time为读数对应窗口的结束时刻（秒）；呼吸窗口较长，在其填满之前
+    breaths_per_minute和respiration_quality为None。
+    """
+
+    def __init__(self, rois, fps, frame_size, size=None, pulse_band=PULSE_BAND,
+                 respiration_band=RESPIRATION_BAND):
+        self.fps = fps
+        self.means = RoiMeans(rois, frame_size, size)
+        self.pulse = SlidingPeakTracker(fps, PULSE_WINDOW_SECONDS, pulse_band, chrom_signal, len(rois))
+        self.respiration = SlidingPeakTracker(fps, RESPIRATION_WINDOW_SECONDS, respiration_band,
+                                              luma_signal, len(rois))
+        self.hop = max(1, int(round(VITALS_HOP_SECONDS * fps)))
+        self.num_rois = len(rois)
+        self.frames = 0
+        self.records = []
+
+    def push(self, frame):
+        """输入一帧（uint8 BGR，解码尺寸），返回本帧新产生的记录列表"""
+        means = self.means(frame)
+        index = self.frames
+        self.frames += 1
+        self.pulse.push(means, index)
+        self.respiration.push(means, index)
+        # 心率窗口填满后每hop帧输出一次
+        if not self.pulse.ready or (self.frames - self.pulse.nperseg) % self.hop:
+            return []
+        pulse = self.pulse.estimate(index)
+        respiration = self.respiration.estimate(index)
+
+        records = []
+        for roi in range(self.num_rois):
+            record = {
+                'time': round(self.frames / self.fps, 3),
+                'roi': roi,
+                'bpm': round(float(pulse[0][roi]) * 60, 1),
+                'pulse_quality': round(float(pulse[1][roi]), 3),
+                'breaths_per_minute': None,
+                'respiration_quality': None,
+            }
+            if respiration is not None:
+                record['breaths_per_minute'] = round(float(respiration[0][roi]) * 60, 1)
+                record['respiration_quality'] = round(float(respiration[1][roi]), 3)
+            records.append(record)
+        self.records.extend(records)
+        return records
+
+
+def summarize_vitals(records, num_rois):
+    """每个ROI的中位数心率和呼吸频率（无读数时为None）"""
+    summary = []
+    for roi in range(num_rois):
+        rows = [record for record in records if record['roi'] == roi]
+        bpm = [record['bpm'] for record in rows]
+        breaths = [record['breaths_per_minute'] for record in rows if record['breaths_per_minute'] is not None]
+        summary.append({
+            'roi': roi,
+            'bpm': float(np.median(bpm)) if bpm else None,
+            'breaths_per_minute': float(np.median(breaths)) if breaths else None,
+        })
+    return summary
+
+
+def write_vitals(path, result):
+    """按扩展名写出 .csv（每行一个时刻和ROI）或 .json（含视频信息、ROI和汇总）"""
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            for record in result['records']:
+                writer.writerow({key: '' if value is None else value for key, value in record.items()})
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='evm vitals',
+        description='欧拉视频放大 - 生命体征提取（心率和呼吸频率时间序列，不渲染视频）',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+输出:
+  .csv:  time,roi,bpm,pulse_quality,breaths_per_minute,respiration_quality
+  .json: {"video": ..., "fps": ..., "rois": [...], "summary": [...], "records": [...]}
+        """
+    )
+    parser.add_argument('input', help='输入视频路径')
+    parser.add_argument('-o', '--output', default='vitals.csv', help='输出路径 (.csv 或 .json)')
+    parser.add_argument('--roi', action='append', default=None, metavar='X,Y,W,H|MASK|auto',
+                        help='测量区域，可重复指定；auto为按心率频带内能量自动检测（默认整帧）')
+    parser.add_argument('-f', '--max-frames', type=int, default=None, help='最大分析帧数')
+    parser.add_argument('--full-resolution', action='store_true', help='按原分辨率解码（默认1/2分辨率）')
+    args = parser.parse_args(argv)
+
+    from .cancellation import ProcessingCancelled
+    from .evm_core import EulerianVideoMagnification
+    from .roi import RegionOfInterest, resolve_roi, as_roi_list
+
+    evm = EulerianVideoMagnification(args.input)
+    evm.get_video_info()
+    rois = []
+    for value in args.roi or []:
+        rois.extend(as_roi_list(resolve_roi(value, evm, *PULSE_BAND)))
+    if not rois:
+        rois = [RegionOfInterest(0, 0, evm.width, evm.height)]
+
+    try:
+        result = evm.extract_vitals(rois, max_frames=args.max_frames,
+                                    level=0 if args.full_resolution else VITALS_LEVEL)
+    except ProcessingCancelled as e:
+        print(f"\n提取已取消: {e}")
+        return 130
+    except KeyboardInterrupt:
+        print("\n提取已中断")
+        return 130
+    write_vitals(args.output, result)
+    print(f"生命体征已保存: {args.output} ({len(result['records'])} 条记录)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
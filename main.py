@@ -6,7 +6,6 @@ Eulerian Video Magnification - Main Entry Point
 
 import sys
 import argparse
-import numpy as np
 
 
 def run_gui():
@@ -53,76 +52,238 @@ def run_gui():
         sys.exit(1)
 
 
+def install_sigint_handler(token):
+    """第一次Ctrl-C请求协作式取消，第二次强制中断"""
+    import signal
+
+    def handle_sigint(signum, frame):
+        if token.cancelled:
+            raise KeyboardInterrupt
+        print("\n收到中断信号，正在安全停止（再次按Ctrl-C强制退出）...")
+        token.cancel("用户中断 (Ctrl-C)")
+
+    signal.signal(signal.SIGINT, handle_sigint)
+
+
+def make_progress_listener(style):
+    """根据--progress选项创建进度事件监听器"""
+    if style == 'none':
+        return None
+
+    if style == 'json':
+        def listener(event):
+            # JSON-lines输出到stderr，与stdout日志分离
+            sys.stderr.write(event.to_json() + '\n')
+            sys.stderr.flush()
+        return listener
+
+    from core.progress import format_progress
+
+    def listener(event):
+        print(f"[进度] {format_progress(event)}", flush=True)
+    return listener
+
+
 def run_cli(args):
     """运行命令行模式"""
+    from core import CancellationToken, ProcessingCancelled
+
+    cancel_token = CancellationToken()
+    install_sigint_handler(cancel_token)
+
+    try:
+        render_cli(args, cancel_token)
+    except ProcessingCancelled as e:
+        print(f"\n处理已取消: {e}")
+        sys.exit(130)
+
+
+def render_cli(args, cancel_token):
+    """执行命令行渲染流程"""
     from core import EulerianVideoMagnification
 
-    evm = EulerianVideoMagnification(args.input, args.output)
+    profiler = None
+    if args.profile is not None or args.profile_cprofile:
+        from core.profiler import StageProfiler
+        profiler = StageProfiler(cprofile_stage=args.profile_cprofile)
+
+    evm = EulerianVideoMagnification(args.input, args.output, cancel_token=cancel_token,
+                                     progress_listener=make_progress_listener(args.progress),
+                                     profiler=profiler)
+    try:
+        plan = render_pipeline(args, evm)
+    finally:
+        # 任何退出路径（包括取消和异常）都停止采样线程
+        if profiler is not None:
+            profiler.close()
+
+    if profiler is not None:
+        import os
+        report_path = args.profile or os.path.splitext(evm.output_path)[0] + '_profile.json'
+        profiler.write_report(report_path, metadata={
+            'input': args.input,
+            'resolution': [evm.width, evm.height],
+            'frames': plan.frames,
+            'strategy': plan.strategy,
+            'mode': args.mode,
+            'levels': args.levels,
+            'freq_low': args.freq_low,
+            'freq_high': args.freq_high,
+            'amplification': args.amplification,
+            'dry_run': args.dry_run,
+        })
+        print(f"\n性能分析:\n{profiler.summary()}")
+        print(f"性能报告已保存: {report_path}")
+
+
+def render_pipeline(args, evm):
+    """规划并执行渲染（--dry-run时只打印计划，指定扫描网格时执行参数扫描），返回执行计划"""
     evm.get_video_info()
+    roi = None
+    if args.roi:
+        from core.roi import resolve_roi
+        roi = resolve_roi(args.roi, evm, args.freq_low, args.freq_high)
+        if args.roi_overlay:
+            save_roi_overlay(args.input, roi, args.roi_overlay)
+    if args.spectrogram:
+        save_spectrogram_cli(args, evm, roi)
 
-    # 加载视频帧
-    frames = evm.load_video(max_frames=args.max_frames)
-    original_frames = frames.copy()
-
-    # 处理视频
-    if args.mode == 'motion':
-        processed_frames = evm.magnify_motion(
-            frames, evm.fps,
-            freq_low=args.freq_low,
-            freq_high=args.freq_high,
-            amplification=args.amplification,
-            levels=args.levels,
-            skip_levels_at_top=args.skip_levels
-        )
-    elif args.mode == 'color':
-        processed_frames = evm.magnify_color(
-            frames, evm.fps,
-            freq_low=args.freq_low,
-            freq_high=args.freq_high,
-            amplification=args.amplification,
-            levels=args.levels,
-            skip_levels_at_top=args.skip_levels
-        )
-    else:  # hybrid
-        print("\n=== 混合模式 ===")
-        motion_frames = evm.magnify_motion(
-            frames, evm.fps,
-            freq_low=args.freq_low,
-            freq_high=args.freq_high,
-            amplification=args.amplification * 0.7,
-            levels=args.levels,
-            skip_levels_at_top=args.skip_levels
-        )
-        processed_frames = evm.magnify_color(
-            motion_frames, evm.fps,
-            freq_low=args.freq_low,
-            freq_high=args.freq_high,
-            amplification=args.amplification * 1.5,
-            levels=args.levels,
-            skip_levels_at_top=args.skip_levels
-        )
-
-    # 混合处理
-    if args.blend < 1.0:
-        print(f"\n混合原始视频，比例: {args.blend}")
-        processed_frames = processed_frames * args.blend + original_frames * (1 - args.blend)
-        processed_frames = np.clip(processed_frames, 0, 1)
-
-    # 保存视频
+    # 规划执行策略
+    memory_budget = args.memory_budget * 1024 * 1024 if args.memory_budget else None
+    plan = evm.plan_execution(args.mode, args.freq_low, args.levels, args.skip_levels,
+                              max_frames=args.max_frames, memory_budget_bytes=memory_budget,
+                              strategy=args.strategy, freq_high=args.freq_high,
+                              decimation=args.decimation, temporal_filter=args.temporal_filter, roi=roi)
+    if args.dry_run:
+        print(f"\n{plan.describe()}")
+        return plan
+
+    if args.sweep_bands or args.sweep_amps:
+        sweep_cli(args, evm, plan)
+        return plan
+
+    # 解码 -> 放大 -> 编码
     audio_source = args.input if args.keep_audio else None
-    evm.save_video_from_frames(
-        processed_frames,
-        audio_source=audio_source,
-        output_format='mp4',
+    evm.render(
         mode=args.mode,
         freq_low=args.freq_low,
         freq_high=args.freq_high,
-        amplification=args.amplification
+        amplification=args.amplification,
+        levels=args.levels,
+        skip_levels_at_top=args.skip_levels,
+        blend=args.blend,
+        audio_source=audio_source,
+        output_format='mp4',
+        plan=plan,
+        split_scenes=not args.no_scene_split,
+        luma_only=args.luma_only,
+        roi=roi
     )
+    return plan
+
+
+# 子命令: evm <name> ... -> 模块中的main(argv)
+SUBCOMMANDS = {
+    'batch': 'core.batch',
+    'serve': 'core.server',
+    'live': 'core.live',
+    'vitals': 'core.vitals',
+}
+
+
+def run_subcommand(name, argv):
+    """运行子命令并以其返回值退出"""
+    import importlib
+    module = importlib.import_module(SUBCOMMANDS[name])
+    sys.exit(module.main(argv))
+
+
+def parse_decimation(value):
+    """--decimation 参数: off、auto 或正整数倍数"""
+    if value in ('off', 'auto'):
+        return value
+    try:
+        factor = int(value)
+    except ValueError:
+        factor = 0
+    if factor < 1:
+        raise argparse.ArgumentTypeError(f"应为 off、auto 或正整数: {value}")
+    return factor
+
+
+def parse_sweep_grid(bands, amps, freq_low, freq_high, amplification):
+    """由 '0.4-3.0,0.8-1.5' 和 '10,20,50' 生成 (freq_low, freq_high, amplification) 网格"""
+    band_list = [(freq_low, freq_high)]
+    if bands:
+        band_list = []
+        for item in bands.split(','):
+            low, high = item.split('-')
+            band_list.append((float(low), float(high)))
+    amp_list = [float(value) for value in amps.split(',')] if amps else [amplification]
+    return [(low, high, amp) for low, high in band_list for amp in amp_list]
+
+
+def save_roi_overlay(video_path, roi, path):
+    """把ROI矩形画在第一帧上并保存为图像"""
+    import cv2
+    from core.roi import as_roi_list, draw_rois
+
+    cap = cv2.VideoCapture(video_path)
+    ret, frame = cap.read()
+    cap.release()
+    if not ret:
+        print(f"⚠️ 无法读取第一帧，未保存ROI叠加图")
+        return
+    cv2.imwrite(path, draw_rois(frame, as_roi_list(roi)))
+    print(f"ROI叠加图已保存: {path}")
+
+
+def save_spectrogram_cli(args, evm, roi):
+    """流式分析整段视频（或ROI内）的信号并导出时频图 .npz"""
+    from core.spectral import save_spectrogram, track_peak
+
+    result = evm.analyze_video_frequencies(max_frames=args.max_frames, freq_low=args.freq_low,
+                                           freq_high=args.freq_high, roi=roi)
+    if not result or result['spectrogram'] is None:
+        print("⚠️ 视频太短，未生成时频图")
+        return
+    spectrogram = result['spectrogram']
+    save_spectrogram(args.spectrogram, spectrogram, args.freq_low, args.freq_high)
+    peaks = track_peak(spectrogram, args.freq_low, args.freq_high)
+    print(f"时频图已保存: {args.spectrogram} ({len(spectrogram['times'])} 个时间点，"
+          f"频带内峰值 {peaks.min():.2f}-{peaks.max():.2f} Hz)")
+
+
+def sweep_cli(args, evm, plan):
+    """参数扫描：一次解码和正向FFT，输出每个网格点的视频"""
+    from core.scene import SceneCutDetector
+
+    grid = parse_sweep_grid(args.sweep_bands, args.sweep_amps, args.freq_low, args.freq_high,
+                            args.amplification)
+    if args.roi:
+        print("⚠️ 参数扫描不支持ROI，将处理整帧")
+    if plan.strategy != 'in_memory':
+        print(f"⚠️ 参数扫描需要整段帧常驻内存，规划器建议 {plan.strategy}，可能超出内存预算")
+
+    # 解码时累积帧差，镜头切换处各段独立滤波（同render）
+    evm.scene_detector = None if args.no_scene_split else SceneCutDetector()
+    frames = evm.load_video(max_frames=plan.frames)
+    result = evm.sweep(frames, evm.fps, grid, levels=args.levels, skip_levels_at_top=args.skip_levels,
+                       mode=args.mode, audio_source=args.input if args.keep_audio else None,
+                       contact_sheet=args.contact_sheet, blend=args.blend, luma_only=args.luma_only)
+
+    print("\n参数扫描输出:")
+    for low, high, amp, path in result['outputs']:
+        print(f"  {low}-{high} Hz x{amp:g}: {path}")
+    if result['contact_sheet']:
+        print(f"  联系表: {result['contact_sheet']}")
 
 
 def main():
     """主函数"""
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        run_subcommand(sys.argv[1], sys.argv[2:])
+
     parser = argparse.ArgumentParser(
         description='欧拉视频放大 - VideoArt创作工具',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -136,6 +297,21 @@ def main():
 
   # 命令行模式 - 色彩放大
   python main.py input.mp4 -o output.mp4 -m color -a 50 -fl 0.5 -fh 3.0 -l 4 -s 2
+
+  # 参数扫描（一次解码和正向FFT，输出6个变体和联系表）
+  python main.py input.mp4 -m color --sweep-bands 0.8-1.5,0.5-3.0 --sweep-amps 20,50,100 --contact-sheet
+
+  # 批量渲染（JSON/CSV清单或通配符）
+  python main.py batch jobs.json -o renders/ --memory-budget 8192
+
+  # 实时模式（采集设备0，可选录制）
+  python main.py live --device 0 -a 20 -fl 0.8 -fh 3.0 --record live.mp4
+
+  # 生命体征（心率和呼吸频率时间序列，不渲染视频）
+  python main.py vitals face.mp4 --roi 420,180,120,100 -o vitals.csv
+
+  # 本地渲染服务（HTTP/JSON接口）
+  python main.py serve --port 8765 --workers 2 -o renders/
         """
     )
 
@@ -159,8 +335,50 @@ def main():
                        help='保留原视频音频')
     parser.add_argument('--blend', type=float, default=1.0,
                        help='与原视频混合比例 (0-1)')
+    parser.add_argument('--roi', default=None, metavar='X,Y,W,H|MASK|auto',
+                       help='只处理感兴趣区域：矩形 x,y,w,h、掩码图像（白色为区域内）或auto（按频带内能量自动检测），'
+                            '增量羽化合成回整帧')
+    parser.add_argument('--roi-overlay', default=None, metavar='PNG',
+                       help='把ROI画在第一帧上保存为图像（配合--roi，可与--dry-run一起检查自动ROI）')
+    parser.add_argument('--spectrogram', default=None, metavar='NPZ',
+                       help='导出逐帧信号（整帧或--roi内的平均亮度）的时频图 .npz，含频带内峰值频率轨迹（可与--dry-run一起只做分析）')
+    parser.add_argument('--luma-only', action='store_true',
+                       help='运动放大只处理亮度通道（金字塔内存和滤波计算量约为1/3）')
+    parser.add_argument('--no-scene-split', action='store_true',
+                       help='不在镜头切换处分段（默认检测硬切和镜头突变，各段独立处理）')
+    parser.add_argument('--dry-run', action='store_true',
+                       help='只打印执行计划（策略、预计峰值内存和耗时），不处理视频')
+    parser.add_argument('--memory-budget', type=float, default=None, metavar='MB',
+                       help='内存预算 (MB)，默认为可用内存的60%%')
+    parser.add_argument('--strategy', choices=['in_memory', 'chunked', 'tiled', 'out_of_core', 'two_pass',
+                                                'streaming'],
+                       default=None, help='强制指定执行策略（默认由规划器选择；streaming为流式FIR）')
+    parser.add_argument('--decimation', type=parse_decimation, default='auto', metavar='off|auto|N',
+                       help='时间降采样：低频带在降采样后的帧率下滤波再插值回原帧率（默认auto）')
+    parser.add_argument('--temporal-filter', choices=['auto', 'fft', 'narrowband', 'fir'], default='auto',
+                       help='时域滤波实现：fft=整段FFT，narrowband=只计算频带内的DFT bin（窄带更快），fir=线性相位FIR，auto按bin数选择')
+    parser.add_argument('--sweep-bands', metavar='LOW-HIGH,...',
+                       help='参数扫描的频带列表，如 0.4-3.0,0.8-1.5（与--sweep-amps组成网格）')
+    parser.add_argument('--sweep-amps', metavar='A,...',
+                       help='参数扫描的放大倍数列表，如 10,20,50')
+    parser.add_argument('--contact-sheet', action='store_true',
+                       help='参数扫描时额外输出所有变体并排显示的联系表视频')
+    parser.add_argument('--profile', nargs='?', const='', default=None, metavar='REPORT.json',
+                       help='启用分阶段性能分析并写出JSON报告（默认保存在输出文件旁）')
+    parser.add_argument('--profile-cprofile', metavar='STAGE',
+                       choices=['decode', 'pyramid', 'filter', 'collapse', 'encode', 'transcode'],
+                       help='对指定阶段额外运行cProfile（隐含--profile）')
+    parser.add_argument('--progress', choices=['text', 'json', 'none'], default='text',
+                       help='进度输出格式: text=文本, json=每个事件一行JSON输出到stderr, none=关闭')
 
     args = parser.parse_args()
+    if args.sweep_bands or args.sweep_amps:
+        if args.mode not in ('motion', 'color'):
+            parser.error("参数扫描只支持 motion 和 color 模式")
+        try:
+            parse_sweep_grid(args.sweep_bands, args.sweep_amps, args.freq_low, args.freq_high, args.amplification)
+        except ValueError as e:
+            parser.error(f"无效的参数扫描网格: {e}")
 
     if args.input:
         # 命令行模式
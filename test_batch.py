@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Batch Manifest Tests
+批量渲染测试 - 验证JSON/CSV清单解析和进程数计算
+"""
+
+import sys
+import os
+import json
+import tempfile
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.batch import (load_manifest, assign_outputs, worker_count, run_job, BatchJob,
+                        MIN_WORKER_BUDGET_BYTES)
+from core.synthetic import generate_synthetic_frames, write_video
+
+
+def test_csv_manifest():
+    """CSV清单：空单元格使用默认值，数值列自动转换类型"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jobs.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("input,mode,amplification,max_frames,keep_audio,roi\n")
+            f.write("a.mp4,color,50.5,,yes,\"10,20,30,40\"\n")
+            f.write("b.mp4,,,120,,mask.png\n")
+        open(os.path.join(tmp, 'mask.png'), 'wb').close()
+        jobs = assign_outputs(load_manifest(path, {'mode': 'motion', 'levels': 5}), os.path.join(tmp, 'out'))
+
+        assert [job.mode for job in jobs] == ['color', 'motion']
+        assert jobs[0].amplification == 50.5 and jobs[0].keep_audio is True
+        assert jobs[1].max_frames == 120 and jobs[1].levels == 5
+        assert jobs[0].input == os.path.join(tmp, 'a.mp4')
+        assert jobs[1].output == os.path.join(tmp, 'out', 'b.mp4')
+        # ROI矩形原样保留，掩码路径相对于清单目录
+        assert jobs[0].roi == '10,20,30,40'
+        assert jobs[1].roi == os.path.join(tmp, 'mask.png')
+
+
+def test_json_manifest_defaults():
+    """JSON清单：defaults字段作用于所有任务，未知字段报错"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jobs.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'defaults': {'freq_low': 0.8}, 'jobs': [{'input': 'a.mp4', 'freq_high': 2.0}]}, f)
+        job, = load_manifest(path)
+        assert job.freq_low == 0.8 and job.freq_high == 2.0
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([{'input': 'a.mp4', 'gain': 3}], f)
+        try:
+            load_manifest(path)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("未知字段应报错")
+
+
+def test_worker_count():
+    """进程数受任务数和内存预算限制"""
+    assert worker_count(1, 64 * MIN_WORKER_BUDGET_BYTES) == 1
+    assert worker_count(100, MIN_WORKER_BUDGET_BYTES) == 1
+    assert worker_count(100, 64 * MIN_WORKER_BUDGET_BYTES, max_workers=2) <= 2
+
+
+def test_output_name_collisions():
+    """不同目录下的同名输入生成不同的输出路径；显式指定的输出重复时报错"""
+    out = 'out'
+    jobs = [BatchJob.from_dict({'input': path}) for path in
+            (os.path.join('a', 'clip.mp4'), os.path.join('b', 'clip.mp4'), os.path.join('b', 'clip.mp4'),
+             os.path.join('c', 'other.mp4'))]
+    jobs.append(BatchJob.from_dict({'input': 'x.mp4', 'output': os.path.join(out, 'other.mp4')}))
+    assign_outputs(jobs, out)
+    assert [job.output for job in jobs] == [os.path.join(out, name) for name in
+                                           ('clip.mp4', 'b_clip.mp4', 'b_clip_2.mp4', 'c_other.mp4',
+                                            'other.mp4')]
+
+    jobs = [BatchJob.from_dict({'input': name, 'output': os.path.join(out, 'same.mp4')})
+            for name in ('a.mp4', 'b.mp4')]
+    try:
+        assign_outputs(jobs, out)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("显式指定的输出重复时应报错")
+
+
+def test_job_writes_assigned_output():
+    """渲染结果写到任务的输出路径；同一输入和参数的两个任务互不覆盖"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = write_video(generate_synthetic_frames(64, 48, 30), os.path.join(tmp, 'clip.mp4'))
+        jobs = [BatchJob.from_dict({'input': video, 'output': os.path.join(tmp, 'out', 'first.mp4'),
+                                    'max_frames': 30}),
+                BatchJob.from_dict({'input': video, 'max_frames': 30})]
+        assign_outputs(jobs, os.path.join(tmp, 'out'))
+        assert jobs[1].output == os.path.join(tmp, 'out', 'clip.mp4')
+        for job in jobs:
+            result = run_job(job)
+            assert result['status'] == 'ok', result
+            assert result['output'] == job.output and os.path.getsize(job.output) > 0
+
+
+if __name__ == "__main__":
+    test_csv_manifest()
+    test_json_manifest_defaults()
+    test_worker_count()
+    test_output_name_collisions()
+    test_job_writes_assigned_output()
+    print("✅ 批量渲染测试全部通过")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Synthetic Benchmark Tests
+合成视频数值测试 - 验证放大倍数与基准测试结果格式
+"""
+
+import sys
+import os
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from core.benchmark import verify_gain, run_case, compare_results
+from core.evm_core import EulerianVideoMagnification
+from core.synthetic import generate_synthetic_frames
+from test_scene import _two_scenes, _detector
+
+
+def test_motion_gain():
+    """运动放大：实测放大倍数应与设定值一致"""
+    check = verify_gain('fft', 'motion', amplification=10)
+    assert check['passed'], check
+
+
+def test_color_gain():
+    """色彩放大：实测放大倍数应与设定值一致"""
+    check = verify_gain('fft', 'color', amplification=20)
+    assert check['passed'], check
+
+
+def test_decimated_gain():
+    """时间降采样引擎：频带内放大倍数应与整段FFT一致"""
+    check = verify_gain('fft_decimated', 'motion', amplification=10)
+    assert check['passed'], check
+
+
+def test_narrowband_matches_fft():
+    """窄带DFT与整段FFT使用同一频带掩码，结果应一致；高于fps/4的窄带也能通过"""
+    frames = generate_synthetic_frames(96, 64, 60, 30, kind='motion', freq=12.5, wavelength=16.0)
+    evm = EulerianVideoMagnification('synthetic')
+    level = frames[:, ::4, ::4]
+    full = evm.apply_temporal_bandpass_filter_fft(level, 30, 12.0, 13.0, 10)
+    narrow = evm.apply_temporal_bandpass_filter_narrowband(level, 30, 12.0, 13.0, 10)
+    assert np.abs(full).max() > 0
+    assert np.abs(full - narrow).max() < 1e-4
+
+    check = verify_gain('narrowband', 'motion', amplification=10)
+    assert check['passed'], check
+
+
+def test_tiled_fft_matches_time_major():
+    """像素主序分块FFT与沿axis 0的整段FFT结果一致（含不足一块的尾部）"""
+    evm = EulerianVideoMagnification('synthetic')
+    rng = np.random.default_rng(0)
+    for num_frames in (90, 301):
+        level = rng.random((num_frames, 33, 47, 3), dtype=np.float32)
+        spectrum = np.fft.rfft(level, axis=0)
+        spectrum[~evm._temporal_band_mask(num_frames, 30, 0.8, 3.0)] = 0
+        expected = np.fft.irfft(spectrum, n=num_frames, axis=0) * 10
+        tiled = evm.apply_temporal_bandpass_filter_fft(level, 30, 0.8, 3.0, 10)
+        assert np.abs(tiled - expected).max() < 1e-5
+
+
+def test_batched_pyramid_matches_per_frame():
+    """批量构建的拉普拉斯视频金字塔与逐帧cv2金字塔一致（奇数尺寸）"""
+    import cv2
+    evm = EulerianVideoMagnification('synthetic')
+    frames = np.random.default_rng(0).random((7, 45, 61, 3), dtype=np.float32)
+    vid_pyramid = evm.create_laplacian_video_pyramid(frames, 4)
+    for index, frame in enumerate(frames):
+        gaussian = [frame]
+        for _ in range(3):
+            gaussian.append(cv2.pyrDown(gaussian[-1]))
+        for level in range(3):
+            size = (gaussian[level].shape[1], gaussian[level].shape[0])
+            expected = gaussian[level] - cv2.pyrUp(gaussian[level + 1], dstsize=size)
+            assert np.array_equal(vid_pyramid[level][index], expected)
+        assert np.array_equal(vid_pyramid[3][index], gaussian[3])
+
+
+def test_luma_only_matches_rgb_on_gray():
+    """灰度视频上仅亮度运动放大与三通道运动放大结果一致，且三个通道的增量相同"""
+    frames = generate_synthetic_frames(96, 64, 60, 30, kind='motion')
+    gray = np.repeat(frames.mean(axis=3, keepdims=True), 3, axis=3).astype(np.float32)
+    evm = EulerianVideoMagnification('synthetic')
+    full = evm.magnify_motion(gray, 30, 0.5, 2.0, 10, 4, 1)
+    evm.luma_only = True
+    luma = evm.magnify_motion(gray, 30, 0.5, 2.0, 10, 4, 1)
+    assert np.abs(full - gray).max() > 1e-3
+    assert np.abs(full - luma).max() < 1e-5
+
+    color = evm.magnify_motion(frames, 30, 0.5, 2.0, 10, 4, 1)
+    delta = color - frames
+    unclipped = (color > 0) & (color < 1)
+    assert np.all(unclipped.all(axis=3) <= (np.ptp(delta, axis=3) < 1e-5))
+
+
+def test_run_case_reports_stages():
+    """基准用例应包含各阶段统计"""
+    case = run_case(96, 64, 30, mode='motion')
+    assert case['frames'] == 30
+    for stage in ('decode', 'pyramid', 'filter', 'collapse', 'encode'):
+        assert stage in case['stages'], stage
+        assert case['stages'][stage]['wall_time'] >= 0
+
+    rows = compare_results({'cases': [case]}, {'cases': [case]})
+    assert rows and rows[0]['total_speedup'] == 1.0
+
+
+def test_sweep_matches_single_render():
+    """参数扫描的每个变体应与单独渲染结果一致"""
+    frames = generate_synthetic_frames(96, 64, 40, 30, kind='motion')
+    evm = EulerianVideoMagnification('synthetic')
+    evm.fps, evm.width, evm.height = 30, 96, 64
+    saved = []
+    evm.save_video_from_frames = lambda output, **kwargs: saved.append(np.array(output)) or len(saved)
+
+    grid = [(0.5, 2.0, 10), (0.5, 2.0, 20), (1.0, 3.0, 10)]
+    result = evm.sweep(frames, 30, grid, levels=4, skip_levels_at_top=1, contact_sheet=True)
+    assert [item[3] for item in result['outputs']] == [1, 2, 3]
+    for (low, high, amp), output in zip(grid, saved):
+        single = evm.magnify_motion(frames, 30, low, high, amp, 4, 1)
+        assert np.abs(output - single).max() < 1e-4
+    assert saved[-1].shape == (40, 128, 192, 3)
+
+
+def test_sweep_options_match_render():
+    """参数扫描支持混合比例、仅亮度和镜头切换分段，结果与render路径一致；重复网格点只输出一次"""
+    frames = _two_scenes()
+    evm = EulerianVideoMagnification('synthetic')
+    evm.fps, evm.width, evm.height = 30, 96, 64
+    evm.scene_detector = _detector(frames)
+    evm.luma_only = True
+    saved = []
+    evm.save_video_from_frames = lambda output, **kwargs: saved.append(np.array(output)) or len(saved)
+
+    result = evm.sweep(frames, 30, [(1.0, 2.0, 10), (1.0, 2.0, 10)], levels=3, skip_levels_at_top=1,
+                       blend=0.5, luma_only=True)
+    assert [item[3] for item in result['outputs']] == [1] and len(saved) == 1
+    expected = evm._magnify_block(frames, 'motion', 1.0, 2.0, 10, 3, 1, blend=0.5)
+    assert np.abs(saved[0] - expected).max() < 1e-4
+
+
+if __name__ == "__main__":
+    test_motion_gain()
+    test_color_gain()
+    test_decimated_gain()
+    test_narrowband_matches_fft()
+    test_tiled_fft_matches_time_major()
+    test_batched_pyramid_matches_per_frame()
+    test_luma_only_matches_rgb_on_gray()
+    test_run_case_reports_stages()
+    test_sweep_matches_single_render()
+    test_sweep_options_match_render()
+    print("✅ 合成视频测试全部通过")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Cancellation Tests
+取消测试 - 在解码、时域滤波和编码阶段中途取消渲染：一帧之内抛出ProcessingCancelled，
+不留下临时文件，编码阶段已写入的帧保留为 *_partial 输出
+"""
+
+import sys
+import os
+import functools
+import tempfile
+
+import cv2
+import numpy as np
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import core.evm_core as evm_core
+from core.cancellation import CancellationToken, ProcessingCancelled
+from core.evm_core import EulerianVideoMagnification
+from core.progress import ProgressTracker
+from core.synthetic import generate_synthetic_frames, write_video
+
+
+def _render_cancelled(stage, at):
+    """渲染合成视频，stage阶段完成at个单位时由进度监听器取消；返回 (取消后的事件, 输出目录文件, 部分输出帧数)"""
+    events = []
+    token = CancellationToken()
+
+    def listener(event):
+        events.append(event)
+        if event.stage == stage and event.done >= at and not token.cancelled:
+            token.cancel("测试取消")
+            events.append('cancel')
+
+    # 不节流进度事件：取消后若再处理任何一帧都会产生新事件
+    original = evm_core.ProgressTracker
+    evm_core.ProgressTracker = functools.partial(ProgressTracker, min_interval=0)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            video = write_video(generate_synthetic_frames(64, 48, 40), os.path.join(tmp, 'clip.mp4'))
+            out_dir = os.path.join(tmp, 'out')
+            os.makedirs(out_dir)
+            evm = EulerianVideoMagnification(video, os.path.join(out_dir, 'out.mp4'), cancel_token=token,
+                                             progress_listener=listener, keep_output_name=True)
+            evm.get_video_info()
+            try:
+                evm.render(mode='motion', amplification=5, levels=4, skip_levels_at_top=1, split_scenes=False)
+            except ProcessingCancelled:
+                pass
+            else:
+                raise AssertionError(f"{stage}阶段取消后应抛出ProcessingCancelled")
+            files = sorted(os.listdir(out_dir))
+            partial_frames = 0
+            if 'out_partial.mp4' in files:
+                cap = cv2.VideoCapture(os.path.join(out_dir, 'out_partial.mp4'))
+                while cap.read()[0]:
+                    partial_frames += 1
+                cap.release()
+    finally:
+        evm_core.ProgressTracker = original
+    return events[events.index('cancel') + 1:], files, partial_frames
+
+
+def test_cancel_during_decode():
+    """解码第5帧后取消：不再读取任何帧，也不进入后续阶段"""
+    after, files, _ = _render_cancelled('decode', 5)
+    assert after == [], after
+    assert files == []
+
+
+def test_cancel_during_filter():
+    """第一层滤波完成后取消：不再处理下一层，不写出任何文件"""
+    after, files, _ = _render_cancelled('filter', 1)
+    assert after == [], after
+    assert files == []
+
+
+def test_cancel_during_encode():
+    """写入10帧后取消：临时文件被删除，已写入的10帧保留为 *_partial 输出"""
+    after, files, partial_frames = _render_cancelled('encode', 10)
+    assert after == [], after
+    assert files == ['out_partial.mp4'], files
+    assert partial_frames == 10
+
+
+class CountingToken(CancellationToken):
+    """在第cancel_at次检查时取消的令牌"""
+
+    def __init__(self, cancel_at):
+        super().__init__()
+        self.cancel_at = cancel_at
+        self.checks = 0
+
+    def raise_if_cancelled(self):
+        self.checks += 1
+        if self.checks == self.cancel_at:
+            self.cancel("测试取消")
+        super().raise_if_cancelled()
+
+
+def test_cancel_between_fft_tiles():
+    """大层的FFT带通逐块检查取消：取消后不再处理下一块，并抛出而不是返回全零结果"""
+    data = np.zeros((40, 96, 128, 3), dtype=np.float32)
+    tiles = -(-96 * 128 * 3 // max(1, evm_core.FFT_TILE_BYTES // (40 * 4)))
+    assert tiles > 3
+    token = CountingToken(cancel_at=3)
+    evm = EulerianVideoMagnification('tiles', cancel_token=token)
+    try:
+        evm.apply_temporal_bandpass_filter_fft(data, 30, 0.5, 3.0, amplification=10)
+    except ProcessingCancelled:
+        pass
+    else:
+        raise AssertionError("FFT滤波中取消后应抛出ProcessingCancelled")
+    assert token.checks == 3
+
+
+def test_streaming_cancel_raises():
+    """流式处理取消时把ProcessingCancelled抛给调用方，而不是返回临时视频"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = write_video(generate_synthetic_frames(64, 48, 20), os.path.join(tmp, 'clip.mp4'))
+        token = CancellationToken()
+        evm = EulerianVideoMagnification(video, os.path.join(tmp, 'out.mp4'), cancel_token=token)
+        evm.get_video_info()
+        token.cancel("测试取消")
+        try:
+            evm.process_streaming(max_frames=20)
+        except ProcessingCancelled:
+            pass
+        else:
+            raise AssertionError("流式处理取消后应抛出ProcessingCancelled")
+        assert not os.path.exists(os.path.join(tmp, 'out_temp.mp4'))
+
+
+if __name__ == "__main__":
+    test_cancel_during_decode()
+    test_cancel_during_filter()
+    test_cancel_during_encode()
+    test_cancel_between_fft_tiles()
+    test_streaming_cancel_raises()
+    print("✅ 取消测试全部通过")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Execution Planner Tests
+执行计划测试 - 验证策略选择以及分块处理结果与整段处理一致
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from core.evm_core import EulerianVideoMagnification
+from core.planner import plan_execution, decimation_factor
+from core.synthetic import generate_synthetic_frames, write_video
+
+
+def test_strategy_selection():
+    """预算越小，策略依次退化为 分块 -> 空间分块 -> 两遍 -> 外存"""
+    def plan(budget_mb, frames=900):
+        return plan_execution(1920, 1080, frames, 30, freq_low=1.0, available_bytes=64 << 30,
+                              memory_budget_bytes=budget_mb * 1024 * 1024, use_calibration=False)
+
+    assert plan(48000).strategy == 'in_memory'
+    assert plan(40000).precision == 'float16'
+    chunked = plan(8000)
+    assert chunked.strategy == 'chunked'
+    assert chunked.chunk_frames >= 120 and 0 < chunked.chunk_overlap < chunked.chunk_frames
+    assert plan(5500, frames=200).strategy == 'tiled'
+    assert plan(4000).strategy == 'two_pass' and not plan(4000).spill_to_disk
+    assert plan_execution(1920, 1080, 900, 30, mode='hybrid', freq_low=1.0, available_bytes=64 << 30,
+                          memory_budget_bytes=4000 << 20, use_calibration=False).strategy == 'out_of_core'
+    assert plan(2000).strategy == 'out_of_core'
+    assert plan(2000).predicted_peak_mb > 0
+
+def test_decimation_factor():
+    """auto只在降采样倍数足够大时启用，并受奈奎斯特条件和帧数限制"""
+    assert decimation_factor(30, 3.0, 300) == 1
+    assert decimation_factor(30, 0.5, 90) == 1
+    assert decimation_factor(60, 0.5, 1800) == 30
+    assert decimation_factor(60, 0.5, 300) == 300 // 32
+    assert decimation_factor(60, 0.5, 1800, 'off') == 1
+    assert decimation_factor(30, 2.0, 1800, 100) == 7
+    assert decimation_factor(30, 2.0, 1800, '3') == 3
+
+
+def test_tiled_matches_in_memory():
+    """空间分块（带边距）的结果应与整段处理一致"""
+    frames = generate_synthetic_frames(96, 64, 40, 30, kind='motion')
+    evm = EulerianVideoMagnification('synthetic')
+    evm.fps = 30
+    full = evm.magnify_by_mode(frames, 30, 'motion', 0.5, 2.0, 10, 3, 1)
+
+    margin = 2 ** 3 * 2
+    left = evm.magnify_by_mode(frames[:, :, :48 + margin], 30, 'motion', 0.5, 2.0, 10, 3, 1)[:, :, :48]
+    right = evm.magnify_by_mode(frames[:, :, 48 - margin:], 30, 'motion', 0.5, 2.0, 10, 3, 1)[:, :, margin:]
+    tiled = np.concatenate([left, right], axis=2)
+    assert np.abs(tiled - full).max() < 1e-3
+
+
+def test_two_pass_matches_in_memory():
+    """两遍重解码（滤波层存放在磁盘memmap中）的输出应与整段内存处理一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = write_video(generate_synthetic_frames(96, 64, 40, 30, kind='motion'), os.path.join(tmp, 'clip.mp4'))
+        outputs = {}
+        for strategy in ('in_memory', 'two_pass'):
+            evm = EulerianVideoMagnification(video, os.path.join(tmp, f'{strategy}.mp4'))
+            evm.plan_execution('motion', 0.5, levels=3, skip_levels_at_top=1, strategy=strategy,
+                               freq_high=2.0, use_calibration=False)
+            evm.plan.spill_to_disk = strategy == 'two_pass'
+            evm.render('motion', 0.5, 2.0, 10, levels=3, skip_levels_at_top=1)
+            outputs[strategy] = _read_video(evm.output_path)
+        assert outputs['in_memory'].shape == outputs['two_pass'].shape
+        assert np.abs(outputs['in_memory'].astype(int) - outputs['two_pass']).max() <= 1
+        assert not [name for name in os.listdir(tmp) if name.startswith('evm_')]
+
+
+def test_streaming_fir_matches_in_memory():
+    """流式FIR的输出应与整段FIR滤波一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = write_video(generate_synthetic_frames(96, 64, 40, 30, kind='motion'), os.path.join(tmp, 'clip.mp4'))
+        outputs = {}
+        for strategy in ('in_memory', 'streaming'):
+            evm = EulerianVideoMagnification(video, os.path.join(tmp, f'{strategy}.mp4'))
+            plan = evm.plan_execution('motion', 0.5, levels=3, skip_levels_at_top=1, strategy=strategy,
+                                      freq_high=2.0, use_calibration=False, temporal_filter='fir')
+            assert plan.fir_taps == 39
+            evm.render('motion', 0.5, 2.0, 10, levels=3, skip_levels_at_top=1)
+            outputs[strategy] = _read_video(evm.output_path)
+        assert outputs['in_memory'].shape == outputs['streaming'].shape
+        assert np.abs(outputs['in_memory'].astype(int) - outputs['streaming']).max() <= 1
+
+
+def test_luma_only_matches_across_strategies():
+    """仅亮度运动放大：两遍处理和流式FIR的输出应与对应的整段处理一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = write_video(generate_synthetic_frames(96, 64, 40, 30, kind='motion'), os.path.join(tmp, 'clip.mp4'))
+        outputs = {}
+        for strategy, temporal_filter in (('in_memory', 'fft'), ('two_pass', 'fft'),
+                                          ('in_memory', 'fir'), ('streaming', 'fir')):
+            evm = EulerianVideoMagnification(video, os.path.join(tmp, f'{strategy}.mp4'))
+            evm.plan_execution('motion', 0.5, levels=3, skip_levels_at_top=1, strategy=strategy,
+                               freq_high=2.0, use_calibration=False, temporal_filter=temporal_filter)
+            evm.render('motion', 0.5, 2.0, 10, levels=3, skip_levels_at_top=1, luma_only=True)
+            outputs[(strategy, temporal_filter)] = _read_video(evm.output_path)
+        fft = outputs[('in_memory', 'fft')].astype(int)
+        fir = outputs[('in_memory', 'fir')].astype(int)
+        assert np.abs(fft - outputs[('two_pass', 'fft')]).max() <= 1
+        assert np.abs(fir - outputs[('streaming', 'fir')]).max() <= 1
+
+
+def _read_video(path):
+    import cv2
+
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return np.array(frames)
+
+
+if __name__ == "__main__":
+    test_strategy_selection()
+    test_decimation_factor()
+    test_tiled_matches_in_memory()
+    test_two_pass_matches_in_memory()
+    test_streaming_fir_matches_in_memory()
+    test_luma_only_matches_across_strategies()
+    print("✅ 执行计划测试全部通过")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Stage Profiler Tests
+分阶段性能分析器测试 - 阶段计时和分配峰值、嵌套子阶段、JSON报告格式、cProfile输出、关闭采样
+"""
+
+import sys
+import os
+import json
+import pstats
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.profiler import StageProfiler, NullProfiler
+
+MB = 1024 * 1024
+
+
+def _busy_allocation(megabytes):
+    """分配并填充megabytes大小的数组（计入tracemalloc）"""
+    data = np.ones(megabytes * MB // 8)
+    return float(data.sum())
+
+
+def test_stage_records():
+    """同名阶段多次进入时累加次数和耗时，分配峰值取各次的最大值"""
+    profiler = StageProfiler()
+    try:
+        for megabytes in (4, 8):
+            with profiler.stage('decode'):
+                time.sleep(0.02)
+                _busy_allocation(megabytes)
+        profiler.add_time('decode/read', 0.5)
+        profiler.add_time('decode/read', 0.25)
+    finally:
+        profiler.close()
+
+    record = profiler.records['decode'].to_dict()
+    assert record['calls'] == 2
+    assert record['wall_time'] >= 0.04 and record['cpu_time'] >= 0
+    assert 7.5 <= record['alloc_peak_mb'] < 16, record
+    assert record['peak_rss_mb'] > 0
+    assert profiler.timers == {'decode/read': 0.75}
+    assert 'decode' in profiler.summary() and 'decode/read' in profiler.summary()
+
+
+def test_nested_stages():
+    """子阶段的耗时和分配同时计入外层阶段；异常退出的阶段同样被记录"""
+    profiler = StageProfiler()
+    try:
+        with profiler.stage('filter'):
+            with profiler.stage('filter/level_1'):
+                time.sleep(0.02)
+                _busy_allocation(8)
+            _busy_allocation(2)
+        try:
+            with profiler.stage('encode'):
+                raise RuntimeError("编码失败")
+        except RuntimeError:
+            pass
+    finally:
+        profiler.close()
+
+    outer = profiler.records['filter'].to_dict()
+    inner = profiler.records['filter/level_1'].to_dict()
+    assert outer['wall_time'] >= inner['wall_time'] >= 0.02
+    assert outer['alloc_peak_mb'] >= inner['alloc_peak_mb'] >= 7.5
+    assert profiler.records['encode'].calls == 1
+
+
+def test_write_report_schema():
+    """JSON报告包含系统信息、元数据、各阶段统计和计时；写出后采样线程和tracemalloc已停止"""
+    was_tracing = tracemalloc.is_tracing()
+    profiler = StageProfiler()
+    with profiler.stage('pyramid'):
+        _busy_allocation(1)
+    profiler.add_time('pyramid/level_0', 0.1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'report.json')
+        profiler.write_report(path, metadata={'mode': 'motion', 'frames': 30})
+        with open(path, encoding='utf-8') as f:
+            report = json.load(f)
+
+    assert set(report) == {'created', 'total_wall_time', 'system', 'metadata', 'stages', 'timers',
+                           'cprofile_stage'}
+    assert set(report['system']) == {'platform', 'python', 'numpy', 'cpu_count'}
+    assert report['metadata'] == {'mode': 'motion', 'frames': 30}
+    assert set(report['stages']['pyramid']) == {'calls', 'wall_time', 'cpu_time', 'peak_rss_mb',
+                                                'rss_delta_mb', 'alloc_peak_mb'}
+    assert report['timers'] == {'pyramid/level_0': 0.1}
+    assert report['cprofile_stage'] is None
+    assert profiler._sampler is None
+    assert tracemalloc.is_tracing() == was_tracing
+
+    # 关闭可重复调用；关闭性能分析时使用的空实现不记录任何内容
+    profiler.close()
+    with NullProfiler().stage('decode'):
+        pass
+
+
+def test_cprofile_output():
+    """cprofile_stage指定的阶段写出 .prof 文件，报告中附带按累计耗时排序的摘要"""
+    profiler = StageProfiler(cprofile_stage='encode')
+    with profiler.stage('decode'):
+        _busy_allocation(1)
+    with profiler.stage('encode'):
+        _busy_allocation(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        report = profiler.write_report(os.path.join(tmp, 'run.json'))
+        assert report['cprofile_file'] == os.path.join(tmp, 'run.prof')
+        stats = pstats.Stats(report['cprofile_file'])
+        functions = {name for _, _, name in stats.stats}
+        assert '_busy_allocation' in functions
+    assert '_busy_allocation' in report['cprofile_top']
+    assert report['cprofile_stage'] == 'encode'
+
+
+if __name__ == "__main__":
+    test_stage_records()
+    test_nested_stages()
+    test_write_report_schema()
+    test_cprofile_output()
+    print("✅ 性能分析器测试全部通过")
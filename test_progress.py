@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Progress Event Tests
+进度事件测试 - 按时间间隔节流、完成时总是上报100%、吞吐量和ETA计算、--progress json 的JSON-lines格式
+"""
+
+import sys
+import os
+import io
+import json
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import core.progress as progress
+from core.progress import ProgressEvent, ProgressTracker, format_progress
+
+
+class FakeClock:
+    """替换 time.perf_counter 的可控时钟"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _tracked(run, **kwargs):
+    """用可控时钟运行run(tracker, clock)，返回收到的事件列表"""
+    clock = FakeClock()
+    events = []
+    original = progress.time.perf_counter
+    progress.time.perf_counter = clock
+    try:
+        tracker = ProgressTracker('decode', 100, events.append, **kwargs)
+        run(tracker, clock)
+    finally:
+        progress.time.perf_counter = original
+    return events
+
+
+def test_min_interval_throttling():
+    """第一次更新立即上报，之后距上次上报不足min_interval的更新被丢弃"""
+    def run(tracker, clock):
+        for _ in range(10):
+            clock.now += 0.1
+            tracker.update()
+
+    events = _tracked(run, min_interval=0.25)
+    # 上报于 t=0.1, 0.4, 0.7, 1.0（相对起点）
+    assert [event.done for event in events] == [1, 4, 7, 10], [event.done for event in events]
+    assert not any(event.finished for event in events)
+
+    # min_interval=0 时每次更新都上报
+    events = _tracked(run, min_interval=0)
+    assert [event.done for event in events] == list(range(1, 11))
+
+
+def test_finish_always_emits_final_event():
+    """finish() 即使刚刚上报过也发送一次100%的完成事件，且只发送一次"""
+    def run(tracker, clock):
+        clock.now += 1.0
+        tracker.update(done=100)
+        tracker.finish()
+        tracker.finish()
+
+    events = _tracked(run, min_interval=10)
+    assert len(events) == 2
+    final = events[-1]
+    assert final.finished and final.done == final.total == 100
+    assert final.fraction == 1.0 and final.to_dict()['fraction'] == 1.0
+
+    # 总量未知或实际完成量超过预估总量时，以完成量作为总量
+    def overshoot(tracker, clock):
+        clock.now += 1.0
+        tracker.update(done=120)
+        tracker.finish()
+
+    final = _tracked(overshoot)[-1]
+    assert final.finished and final.total == 120 and final.fraction == 1.0
+
+    # 上下文管理器：正常退出时上报完成事件，异常退出时不上报
+    def failing(tracker, clock):
+        try:
+            with tracker:
+                clock.now += 1.0
+                tracker.update(done=10)
+                raise RuntimeError("解码失败")
+        except RuntimeError:
+            pass
+
+    assert not any(event.finished for event in _tracked(failing))
+
+
+def test_rate_and_eta():
+    """吞吐量 = 完成量/耗时，ETA = 剩余量/吞吐量；总量未知时ETA为None"""
+    def run(tracker, clock):
+        clock.now += 2.0
+        tracker.update(done=25)
+
+    event, = _tracked(run)
+    assert event.elapsed == 2.0
+    assert event.rate == 12.5
+    assert event.eta == 6.0
+    assert event.fraction == 0.25
+
+    clock = FakeClock()
+    events = []
+    original = progress.time.perf_counter
+    progress.time.perf_counter = clock
+    try:
+        tracker = ProgressTracker('analyze', 0, events.append)
+        clock.now += 1.0
+        tracker.update(done=10)
+    finally:
+        progress.time.perf_counter = original
+    assert events[0].eta is None and events[0].fraction == 0.0
+
+
+def test_json_lines_format():
+    """to_dict/to_json 字段和舍入；--progress json 每个事件输出一行JSON到stderr"""
+    event = ProgressEvent(stage='filter', done=3, total=7, unit='level', elapsed=1.23456,
+                          rate=2.43019, eta=1.64598, detail='第2层')
+    data = event.to_dict()
+    assert set(data) == {'stage', 'done', 'total', 'unit', 'elapsed', 'rate', 'eta', 'detail', 'finished',
+                         'fraction'}
+    assert data['elapsed'] == 1.235 and data['rate'] == 2.43 and data['eta'] == 1.646
+    assert data['fraction'] == 0.4286
+    assert ProgressEvent('decode', 0, 0).to_dict()['eta'] is None
+
+    line = event.to_json()
+    assert '\n' not in line and '第2层' in line
+    assert json.loads(line) == data
+
+    import main
+    listener = main.make_progress_listener('json')
+    stderr = sys.stderr
+    sys.stderr = io.StringIO()
+    try:
+        listener(event)
+        listener(ProgressEvent('encode', 7, 7, finished=True))
+        lines = sys.stderr.getvalue().splitlines()
+    finally:
+        sys.stderr = stderr
+    assert [json.loads(line)['stage'] for line in lines] == ['filter', 'encode']
+    assert json.loads(lines[1])['finished'] is True
+    assert main.make_progress_listener('none') is None
+
+
+def test_format_progress():
+    """文本格式：阶段显示名（附加说明）、完成量、百分比、吞吐量和ETA；完成事件不显示ETA"""
+    event = ProgressEvent(stage='filter', done=3, total=7, unit='level', rate=2.5, eta=1.6, detail='第2层')
+    assert format_progress(event) == "时域滤波 (第2层): 3/7 (42.9%) - 2.5 level/s - ETA: 2s"
+
+    event = ProgressEvent(stage='encode', done=7, total=7, rate=14.0, eta=0.0, finished=True)
+    assert format_progress(event) == "编码: 7/7 (100.0%) - 14.0 frame/s"
+
+    # 未知阶段原样显示，吞吐量为0时省略
+    assert format_progress(ProgressEvent('custom', 0, 10)) == "custom: 0/10 (0.0%)"
+
+
+if __name__ == "__main__":
+    test_min_interval_throttling()
+    test_finish_always_emits_final_event()
+    test_rate_and_eta()
+    test_json_lines_format()
+    test_format_progress()
+    print("✅ 进度事件测试全部通过")
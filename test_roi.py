@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Region of Interest Tests
+感兴趣区域测试 - 解析矩形和掩码、裁剪处理与整帧处理在ROI内一致、ROI外像素不变
+"""
+
+import sys
+import os
+import tempfile
+
+import numpy as np
+import cv2
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.evm_core import EulerianVideoMagnification
+from core.roi import RegionOfInterest, parse_roi, composite, roi_padding, propose_rois, merge_rois
+from core.synthetic import generate_synthetic_frames, write_video
+
+
+def test_parse_rect_and_mask():
+    """x,y,w,h 与掩码图像两种形式；越界ROI被裁剪到画面内"""
+    roi = parse_roi('10, 20,30,40')
+    assert (roi.x, roi.y, roi.width, roi.height) == (10, 20, 30, 40)
+    for bad in ('1,2,3', '1,2,0,4', '-1,2,3,4'):
+        try:
+            parse_roi(bad)
+            assert False, bad
+        except ValueError:
+            pass
+    clipped = RegionOfInterest(300, 200, 100, 100).clipped(320, 240)
+    assert (clipped.width, clipped.height) == (20, 40)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        mask = np.zeros((60, 80), dtype=np.uint8)
+        mask[10:30, 20:50] = 255
+        path = os.path.join(tmp, 'mask.png')
+        cv2.imwrite(path, mask)
+        roi = parse_roi(path, frame_size=(160, 120))
+    assert (roi.x, roi.y, roi.width, roi.height) == (40, 20, 60, 40)
+    assert roi.mask.shape == (120, 160)
+
+
+def test_crop_matches_full_frame_inside_roi():
+    """裁剪区域的放大结果在ROI内与整帧处理一致，羽化带以外的像素保持原值"""
+    frames = generate_synthetic_frames(320, 240, 60, 30, kind='motion')
+    evm = EulerianVideoMagnification('synthetic')
+    evm.fps = 30
+    full = evm.magnify_motion(frames, 30, 0.5, 2.0, 10, 4, 2)
+
+    roi = RegionOfInterest(120, 80, 80, 60)
+    bounds = roi.crop_bounds(320, 240, 4)
+    x0, y0, x1, y1 = bounds
+    crop = np.ascontiguousarray(frames[:, y0:y1, x0:x1])
+    processed = evm.magnify_motion(crop, 30, 0.5, 2.0, 10, 4, 2)
+    inside = (slice(None), slice(80 - y0, 140 - y0), slice(120 - x0, 200 - x0))
+    assert np.abs(processed[inside] - full[:, 80:140, 120:200]).max() < 1e-5
+
+    weights = roi.blend_weights(bounds, 4)
+    assert weights[inside[1:]].min() == 1.0 and weights[0, 0, 0] == 0.0
+    source = (frames * 255).astype(np.uint8)
+    output = np.array([composite(source[i].copy(), crop[i], processed[i], bounds, weights)
+                       for i in range(len(frames))])
+    feather = roi_padding(4) // 2
+    outside = np.ones((240, 320), dtype=bool)
+    outside[80 - feather:140 + feather, 120 - feather:200 + feather] = False
+    assert np.array_equal(output[:, outside], source[:, outside])
+    assert np.abs(output[:, 80:140, 120:200].astype(int) - source[:, 80:140, 120:200]).max() > 0
+
+
+def test_render_plans_on_crop():
+    """ROI渲染按裁剪区域规划，输出为整帧尺寸"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = write_video(generate_synthetic_frames(320, 240, 30, 30, kind='motion'), os.path.join(tmp, 'clip.mp4'))
+        evm = EulerianVideoMagnification(video, os.path.join(tmp, 'roi.mp4'))
+        roi = RegionOfInterest(100, 60, 64, 48)
+        plan = evm.plan_execution('motion', 0.5, 4, 2, freq_high=2.0, use_calibration=False, roi=roi)
+        assert (plan.width, plan.height) == (64 + 2 * 32, 48 + 2 * 32)
+        evm.render('motion', 0.5, 2.0, 10, 4, 2, plan=plan, roi=roi)
+        cap = cv2.VideoCapture(evm.output_path)
+        size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        assert size == (320, 240) and count == 30
+
+
+def _pulsing_patches(num_frames=150, size=(320, 240)):
+    """静止纹理上两个亮度按不同频率起伏的区域"""
+    rng = np.random.default_rng(0)
+    width, height = size
+    base = cv2.GaussianBlur(rng.random((height, width, 3)).astype(np.float32) * 0.5 + 0.25, (0, 0), 3)
+    t = np.arange(num_frames) / 30.0
+    frames = np.repeat(base[np.newaxis], num_frames, axis=0)
+    frames[:, 60:120, 200:260] += (0.08 * np.sin(2 * np.pi * 1.5 * t))[:, None, None, None]
+    frames[:, 150:190, 40:80] += (0.05 * np.sin(2 * np.pi * 1.2 * t))[:, None, None, None]
+    return np.clip(frames, 0, 1)
+
+
+def test_propose_and_merge():
+    """功率集中的块被提出为ROI（按能量排序），均匀分布时不提出；相邻ROI被合并"""
+    power = np.full((30, 40), 0.01, dtype=np.float32)
+    power[4:10, 24:32] = 1.0
+    power[20:24, 4:8] = 0.5
+    rois = propose_rois(power, 8, (320, 240))
+    assert len(rois) == 2
+    first = rois[0]
+    assert first.x <= 192 and first.x + first.width >= 256 and first.y <= 32 and first.y + first.height >= 80
+    assert propose_rois(np.ones((30, 40), dtype=np.float32), 8, (320, 240)) == []
+
+    merged = merge_rois([RegionOfInterest(0, 0, 10, 10), RegionOfInterest(20, 0, 10, 10),
+                         RegionOfInterest(100, 100, 10, 10)], margin=8)
+    assert [(roi.x, roi.y, roi.width, roi.height) for roi in merged] == [(0, 0, 30, 10), (100, 100, 10, 10)]
+
+
+def test_suggest_rois_and_render():
+    """自动ROI找到两个起伏区域；多个ROI分别处理并合成回整帧"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = write_video(_pulsing_patches(), os.path.join(tmp, 'patches.mp4'))
+        evm = EulerianVideoMagnification(video, os.path.join(tmp, 'auto.mp4'))
+        rois = evm.suggest_rois(0.8, 2.5)
+        assert len(rois) == 2
+        for roi, (x0, y0, x1, y1) in zip(rois, [(200, 60, 260, 120), (40, 150, 80, 190)]):
+            assert roi.x <= x0 and roi.y <= y0 and roi.x + roi.width >= x1 and roi.y + roi.height >= y1
+
+        evm.plan_execution('motion', 0.8, 4, 2, max_frames=60, freq_high=2.5, use_calibration=False, roi=rois)
+        evm.render('motion', 0.8, 2.5, 10, 4, 2, roi=rois)
+        cap = cv2.VideoCapture(evm.output_path)
+        assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 60
+        cap.release()
+
+
+if __name__ == "__main__":
+    test_parse_rect_and_mask()
+    test_crop_matches_full_frame_inside_roi()
+    test_render_plans_on_crop()
+    test_propose_and_merge()
+    test_suggest_rois_and_render()
+    print("✅ ROI测试全部通过")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Render Server Tests
+渲染服务测试 - 通过HTTP接口提交、跟踪、取消任务并下载输出
+"""
+
+import sys
+import os
+import json
+import tempfile
+import threading
+import time
+import urllib.request
+import urllib.error
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.server import RenderServer, create_server
+from core.synthetic import generate_synthetic_frames, write_video
+
+
+def _request(base, path, data=None, method=None):
+    body = json.dumps(data).encode('utf-8') if data is not None else None
+    request = urllib.request.Request(base + path, data=body, method=method,
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        raw = response.read()
+        if response.headers.get_content_type() == 'application/json':
+            return json.loads(raw)
+        return raw
+
+
+def test_submit_status_cancel_and_output():
+    """提交任务并等待完成；排队中的任务可以取消；未知任务返回404"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = write_video(generate_synthetic_frames(96, 64, 30, 30), os.path.join(tmp, 'clip.mp4'))
+        render_server = RenderServer(os.path.join(tmp, 'renders'), workers=1)
+        render_server.start()
+        httpd = create_server(render_server, port=0)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        base = 'http://127.0.0.1:%d' % httpd.server_address[1]
+        try:
+            first = _request(base, '/jobs', {'input': video, 'amplification': 5, 'levels': 3})
+            # 第二个任务排在第一个之后，提交后立即取消
+            second = _request(base, '/jobs', {'input': video, 'priority': -1})
+            cancelled = _request(base, f"/jobs/{second['id']}/cancel", {}, method='POST')
+            assert cancelled['status'] == 'cancelled'
+
+            events = _request(base, f"/jobs/{first['id']}/events").decode('utf-8')
+            statuses = [json.loads(line[6:])['status'] for line in events.splitlines()
+                        if line.startswith('data: ') and '"type": "status"' in line]
+            assert statuses == ['queued', 'running', 'done'], statuses
+            assert '"type": "progress"' in events
+
+            status = _request(base, f"/jobs/{first['id']}")
+            assert status['status'] == 'done'
+            assert status['output'] == os.path.join(tmp, 'renders', f"clip_{first['id']}.mp4")
+            output = _request(base, f"/jobs/{first['id']}/output")
+            assert len(output) == os.path.getsize(status['output'])
+
+            try:
+                _request(base, '/jobs/unknown')
+            except urllib.error.HTTPError as e:
+                assert e.code == 404
+            else:
+                raise AssertionError("未知任务应返回404")
+            try:
+                _request(base, f"/jobs/{first['id']}/events?since=abc")
+            except urllib.error.HTTPError as e:
+                assert e.code == 400
+            else:
+                raise AssertionError("非整数since应返回400")
+            assert _request(base, '/health')['jobs']['done'] == 1
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            render_server.stop()
+
+
+def test_parallel_identical_jobs():
+    """多个工作线程同时渲染相同的任务时，各自写入以任务id命名的输出"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = write_video(generate_synthetic_frames(64, 48, 30, 30), os.path.join(tmp, 'clip.mp4'))
+        render_server = RenderServer(os.path.join(tmp, 'renders'), workers=2)
+        render_server.start()
+        try:
+            jobs = [render_server.submit({'input': video, 'amplification': 5, 'levels': 3}) for _ in range(2)]
+            deadline = time.time() + 60
+            while any(job.status not in ('done', 'failed', 'cancelled') for job in jobs) and time.time() < deadline:
+                time.sleep(0.05)
+            assert [job.status for job in jobs] == ['done', 'done'], [job.error for job in jobs]
+            outputs = [job.output for job in jobs]
+            assert outputs == [os.path.join(tmp, 'renders', f"clip_{job.id}.mp4") for job in jobs]
+            assert all(os.path.getsize(output) > 0 for output in outputs)
+        finally:
+            render_server.stop()
+
+
+if __name__ == "__main__":
+    test_submit_status_cancel_and_output()
+    test_parallel_identical_jobs()
+    print("✅ 渲染服务测试全部通过")
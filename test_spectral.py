@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Spectral Heatmap Tests
+空间频谱图测试 - 每块的主频率和频带功率、流式Welch功率谱和时频图、整段频率分析附带的热力图
+"""
+
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.cancellation import CancellationToken, ProcessingCancelled
+from core.evm_core import EulerianVideoMagnification
+from core.roi import RegionOfInterest, rois_mask
+from core.spectral import (spectral_map, strongest_block, heatmap_image, block_grid, segment_power, WelchPSD,
+                           StreamingSpectrogram, track_peak, save_spectrogram, spectrogram_image)
+from core.synthetic import write_video
+from test_roi import _pulsing_patches
+
+
+def test_spectral_map_per_block():
+    """每块独立求主频率；频带功率集中在起伏的块，通道互不影响"""
+    fps = 30
+    t = np.arange(150) / fps
+    series = np.full((150, 6, 8, 3), 0.5, dtype=np.float32)
+    series[:, 1, 2, 0] += 0.05 * np.sin(2 * np.pi * 1.2 * t)
+    series[:, 4, 6, 2] += 0.02 * np.sin(2 * np.pi * 3.0 * t)
+
+    result = spectral_map(series, fps, 0.8, 2.0)
+    assert result['dominant'].shape == (6, 8, 3)
+    assert abs(result['dominant'][1, 2, 0] - 1.2) < 0.11
+    assert abs(result['dominant'][4, 6, 2] - 3.0) < 0.11
+    assert strongest_block(result, 0)[:2] == (1, 2)
+    # 3 Hz 在频带外
+    assert result['band_power'][4, 6, 2] < 0.01 * result['band_power'][1, 2, 0]
+
+    image = heatmap_image(result['band_power'][..., 0], (80, 60))
+    assert image.shape == (60, 80, 3) and image.dtype == np.uint8
+
+
+def test_welch_streaming():
+    """逐帧输入的Welch功率谱等于各半重叠分段功率谱的平均；不足一段时用全部帧"""
+    rng = np.random.default_rng(1)
+    t = np.arange(1000) / 30.0
+    signal = (np.sin(2 * np.pi * 1.3 * t) + rng.normal(size=1000)).astype(np.float32)
+
+    welch = WelchPSD(200)
+    for value in signal:
+        welch.push(value)
+    frequencies, power = welch.finish(30)
+    expected = np.mean([segment_power(signal[start:start + 200]) for start in range(0, 801, 100)], axis=0)
+    assert welch.segments == 9 and welch.buffer.shape == (200,)
+    assert np.allclose(power, expected, rtol=1e-4)
+    assert abs(frequencies[np.argmax(power)] - 1.3) < 0.1
+
+    short = WelchPSD(200, shape=(2,))
+    for value in signal[:50]:
+        short.push([value, 0.0])
+    frequencies, power = short.finish(30)
+    assert len(frequencies) == 26 and power.shape == (26, 2)
+
+
+def test_spectrogram_tracks_drift():
+    """时频图的频带内峰值跟随从1.0 Hz漂移到2.0 Hz的信号；导出的 .npz 包含轨迹"""
+    fps = 30
+    t = np.arange(1200) / fps
+    phase = 2 * np.pi * np.cumsum(1.0 + t / 40.0) / fps
+    spectrogram = StreamingSpectrogram.for_video(fps, len(t))
+    for value in np.sin(phase):
+        spectrogram.push(value)
+    result = spectrogram.result(fps)
+    # 5秒窗口、0.5秒步长
+    assert result['window'] == 150 and result['hop'] == 15
+    assert result['power'].shape == (71, len(result['frequencies']))
+
+    peaks = track_peak(result, 0.5, 3.0)
+    expected = 1.0 + result['times'] / 40.0
+    assert np.abs(peaks - expected).max() < 0.06
+    image = spectrogram_image(result, (200, 80), band=(0.5, 3.0), max_freq=5.0)
+    assert image.shape == (80, 200, 3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = save_spectrogram(os.path.join(tmp, 'drift.npz'), result, 0.5, 3.0)
+        with np.load(path) as data:
+            assert np.array_equal(data['peak_frequency'], peaks)
+            assert data['power'].shape == result['power'].shape
+
+    mask = rois_mask([RegionOfInterest(16, 8, 32, 16)], 320, 240, (40, 30))
+    assert mask.sum() == 4 * 2 and mask[1:3, 2:6].all()
+
+
+def test_analysis_includes_heatmap():
+    """频率分析结果附带空间频谱图，最强块位于较强的起伏区域内"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = write_video(_pulsing_patches(), os.path.join(tmp, 'patches.mp4'))
+        evm = EulerianVideoMagnification(video)
+        evm.get_video_info()
+        result = evm.analyze_video_frequencies(freq_low=0.8, freq_high=2.5)
+        full = evm.analyze_video_frequencies(freq_low=0.8, freq_high=2.5, reduced=False)
+    # 按粗糙层尺寸解码与原尺寸逐层缩小的结果一致
+    assert strongest_block(full['spectral_map'])[:3] == strongest_block(result['spectral_map'])[:3]
+    assert result['analyzed_frames'] == 150
+
+    spectral = result['spectral_map']
+    assert spectral['band_power'].shape[:2] == block_grid(320, 240)[::-1]
+    row, col, frequency, _ = strongest_block(spectral)
+    size = spectral['block_size']
+    # 较强区域 x 200-260, y 60-120，频率 1.5 Hz（分辨率 0.2 Hz）
+    assert 200 <= (col + 0.5) * size <= 260 and 60 <= (row + 0.5) * size <= 120
+    assert abs(frequency - 1.5) <= 0.2
+
+
+def test_partial_results_and_cancel():
+    """每个Welch分段完成时发送部分结果；取消令牌在分析中途生效"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = write_video(_pulsing_patches(600), os.path.join(tmp, 'long.mp4'))
+        evm = EulerianVideoMagnification(video)
+        evm.get_video_info()
+        partials = []
+        result = evm.analyze_video_frequencies(partial_callback=partials.append)
+        # 300帧一段、每150帧完成一段
+        assert [partial['analyzed_frames'] for partial in partials] == [300, 450, 600]
+        assert all(partial['partial'] for partial in partials) and not result['partial']
+        assert abs(partials[0]['dominant_frequencies'][0]['frequency'] - 1.5) <= 0.1
+
+        token = CancellationToken()
+        evm = EulerianVideoMagnification(video, cancel_token=token)
+        evm.get_video_info()
+        try:
+            evm.analyze_video_frequencies(partial_callback=lambda partial: token.cancel())
+            assert False, "取消后应抛出ProcessingCancelled"
+        except ProcessingCancelled:
+            pass
+
+
+if __name__ == "__main__":
+    test_spectral_map_per_block()
+    test_welch_streaming()
+    test_spectrogram_tracks_drift()
+    test_analysis_includes_heatmap()
+    test_partial_results_and_cancel()
+    print("✅ 空间频谱图测试全部通过")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Startup Budget Tests
+启动开销测试 - 导入无副作用、重依赖延迟加载；命令行帮助和主窗口首次绘制不导入重依赖
+
+耗时预算依赖机器负载，只在设置 EVM_STARTUP_BENCHMARK=1 时检查：
+  EVM_STARTUP_BENCHMARK=1 python test_startup.py
+"""
+
+import sys
+import os
+import subprocess
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 启动时间预算（秒），包含Python解释器本身的启动；只在基准模式下检查
+BENCHMARK = os.environ.get('EVM_STARTUP_BENCHMARK') == '1'
+HELP_BUDGET = 1.0
+FIRST_PAINT_BUDGET = 3.0
+
+HEAVY_MODULES = ('cv2', 'scipy', 'numpy', 'PyQt5', 'eulerian_magnification', 'concurrent.futures')
+
+
+def _run(code, **env):
+    """在新解释器中运行代码，返回 (stdout, 耗时)"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=PROJECT_DIR,
+                            env=dict(os.environ, **env), timeout=60)
+    elapsed = time.perf_counter() - start
+    assert result.returncode == 0, result.stderr
+    return result.stdout, elapsed
+
+
+def _loaded(modules):
+    return f"import sys; print('LOADED', sorted(m for m in {modules!r} if m in sys.modules))"
+
+
+def test_import_core_is_lightweight():
+    """import core 不导入重依赖、不输出任何内容"""
+    stdout, _ = _run("import core; " + _loaded(HEAVY_MODULES))
+    assert stdout.strip() == "LOADED []", stdout
+
+
+def test_import_evm_core_has_no_side_effects():
+    """导入处理器模块不输出横幅，不导入scipy和eulerian_magnification，不修改警告过滤器和numpy浮点错误设置"""
+    stdout, _ = _run("import warnings, numpy; filters, errors = len(warnings.filters), numpy.geterr()\n"
+                     "import core.evm_core; " + _loaded(HEAVY_MODULES)
+                     + "; print('FILTERS', filters, len(warnings.filters))"
+                     + "; print('ERRORS', errors == numpy.geterr())")
+    lines = stdout.strip().splitlines()
+    assert len(lines) == 3 and lines[0] == "LOADED ['cv2', 'numpy']", stdout
+    _, before, after = lines[1].split()
+    assert before == after, f"导入后警告过滤器数量变化: {before} -> {after}"
+    assert lines[2] == "ERRORS True", stdout
+
+
+def test_cli_help_budget():
+    """evm --help 和 evm batch --help 不导入numpy/cv2（基准模式下还须在预算内完成）"""
+    for argv in (['evm', '--help'], ['evm', 'batch', '--help']):
+        code = (f"import sys; sys.argv = {argv!r}\nimport main\n"
+                "try:\n    main.main()\nexcept SystemExit:\n    pass\n" + _loaded(HEAVY_MODULES))
+        stdout, elapsed = _run(code)
+        assert stdout.strip().endswith("LOADED []"), stdout
+        if BENCHMARK:
+            assert elapsed < HELP_BUDGET, f"{argv}: {elapsed:.2f}s"
+
+
+def test_gui_first_paint_budget():
+    """主窗口首次绘制不导入cv2和未打开的对话框（基准模式下还须在预算内完成）"""
+    try:
+        import PyQt5  # noqa: F401
+    except ImportError:
+        return
+    code = ("from PyQt5.QtWidgets import QApplication\napp = QApplication([])\n"
+            "from ui import EVMMainWindow\nwindow = EVMMainWindow()\nwindow.show()\napp.processEvents()\n"
+            + _loaded(('cv2', 'scipy', 'core.evm_core', 'ui.frequency_analysis_dialog', 'ui.preview_window')))
+    stdout, elapsed = _run(code, QT_QPA_PLATFORM='offscreen')
+    assert stdout.strip().endswith("LOADED []"), stdout
+    if BENCHMARK:
+        assert elapsed < FIRST_PAINT_BUDGET, f"{elapsed:.2f}s"
+
+
+if __name__ == "__main__":
+    test_import_core_is_lightweight()
+    test_import_evm_core_has_no_side_effects()
+    test_cli_help_budget()
+    test_gui_first_paint_budget()
+    print("✅ 启动开销测试全部通过")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Vital Sign Tests
+生命体征测试 - 积分图ROI平均值、合成视频的心率和呼吸频率、CSV/JSON输出
+"""
+
+import sys
+import os
+import csv
+import json
+import tempfile
+
+import numpy as np
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.evm_core import EulerianVideoMagnification
+from core.roi import RegionOfInterest
+from core.synthetic import write_video
+from core.vitals import RoiMeans, VitalSignExtractor, write_vitals, main as vitals_main
+
+
+def _vitals_frames(seconds=36, fps=30):
+    """左侧肤色区域按1.2 Hz（72 BPM）的血容量特征脉动并叠加0.4 Hz的整体明暗闪烁，
+    右侧区域亮度按0.25 Hz（15次/分）起伏"""
+    t = np.arange(int(seconds * fps)) / fps
+    frames = np.full((len(t), 120, 160, 3), 0.45, dtype=np.float32)
+    rng = np.random.default_rng(0)
+    # 肤色（BGR）和血容量变化的相对幅度（BGR，绿色最强）
+    skin = np.array([0.45, 0.55, 0.75], dtype=np.float32)
+    signature = np.array([0.53, 0.77, 0.33], dtype=np.float32)
+    pulse = 0.02 * np.sin(2 * np.pi * 1.2 * t)
+    flicker = 0.05 * np.sin(2 * np.pi * 0.4 * t)
+    breath = 0.05 * np.sin(2 * np.pi * 0.25 * t)
+    frames[:, 30:90, 10:70] = (skin * (1 + pulse[:, None] * signature)
+                               * (1 + flicker[:, None]))[:, None, None, :]
+    frames[:, 30:90, 90:150] += breath[:, None, None, None]
+    frames += rng.normal(0, 0.01, size=frames.shape).astype(np.float32)
+    return np.clip(frames, 0, 1)
+
+
+def test_roi_means_integral():
+    """积分图求得的ROI平均值等于直接求均值（含缩放到解码尺寸）"""
+    rng = np.random.default_rng(2)
+    frame = rng.integers(0, 256, size=(60, 80, 3), dtype=np.uint8)
+    rois = [RegionOfInterest(4, 6, 20, 10), RegionOfInterest(70, 50, 30, 30)]
+    means = RoiMeans(rois, (80, 60))(frame)
+    assert means.shape == (2, 3)
+    assert np.allclose(means[0], frame[6:16, 4:24].reshape(-1, 3).mean(axis=0) / 255)
+    assert np.allclose(means[1], frame[50:60, 70:80].reshape(-1, 3).mean(axis=0) / 255)
+
+    # 原视频160x120上的ROI，按80x60解码
+    scaled = RoiMeans([RegionOfInterest(8, 12, 40, 20)], (160, 120), (80, 60))(frame)
+    assert np.allclose(scaled[0], frame[6:16, 4:24].reshape(-1, 3).mean(axis=0) / 255)
+
+
+def test_extractor_schedule():
+    """心率窗口填满后每秒输出一条记录，呼吸读数在30秒窗口填满前为None（非整数帧率也对齐）"""
+    rois = [RegionOfInterest(0, 0, 16, 16)]
+    extractor = VitalSignExtractor(rois, 29.97, (16, 16))
+    frame = np.full((16, 16, 3), 100, dtype=np.uint8)
+    for _ in range(950):
+        extractor.push(frame)
+    records = extractor.records
+    assert records[0]['time'] == round(300 / 29.97, 3)
+    assert all(b['time'] - a['time'] < 1.01 for a, b in zip(records, records[1:]))
+    assert records[0]['breaths_per_minute'] is None
+    assert records[-1]['breaths_per_minute'] is not None
+
+
+def test_vitals_on_synthetic_video():
+    """合成视频：脉动区域心率约72 BPM，起伏区域呼吸约15次/分；CSV和JSON输出"""
+    with tempfile.TemporaryDirectory() as tmp:
+        video = write_video(_vitals_frames(), os.path.join(tmp, 'face.mp4'))
+        evm = EulerianVideoMagnification(video)
+        evm.get_video_info()
+        batches = []
+        rois = [RegionOfInterest(10, 30, 60, 60), RegionOfInterest(90, 30, 60, 60)]
+        result = evm.extract_vitals(rois, record_callback=batches.append)
+        pulse, breath = result['summary']
+        assert abs(pulse['bpm'] - 72) < 3
+        assert abs(breath['breaths_per_minute'] - 15) < 1.5
+        # 10秒窗口后每秒一次（36秒视频 -> 27个时刻）
+        assert len(batches) == 27 and all(len(batch) == 2 for batch in batches)
+        assert result['frames'] == 1080
+
+        path = write_vitals(os.path.join(tmp, 'vitals.csv'), result)
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == len(result['records'])
+        assert rows[0]['breaths_per_minute'] == '' and rows[-1]['breaths_per_minute'] != ''
+
+        output = os.path.join(tmp, 'vitals.json')
+        assert vitals_main([video, '--roi', '10,30,60,60', '-o', output, '-f', '450']) == 0
+        with open(output, encoding='utf-8') as f:
+            data = json.load(f)
+        assert data['rois'] == [[10, 30, 60, 60]] and data['frames'] == 450
+        assert abs(data['summary'][0]['bpm'] - 72) < 3
+
+
+if __name__ == "__main__":
+    test_roi_means_integral()
+    test_extractor_schedule()
+    test_vitals_on_synthetic_video()
+    print("✅ 生命体征测试全部通过")
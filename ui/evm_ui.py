@@ -11,18 +11,18 @@ from PyQt5.QtWidgets import (
     QWidget, QLabel, QPushButton, QTextEdit, QFrame,
     QComboBox, QSlider, QFileDialog, QProgressBar, QSpinBox
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt5.QtGui import QPalette, QColor
 import PyQt5.QtCore as QtCore
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from core import EulerianVideoMagnification
-from ui.preview_window import VideoPreviewWidget
+from core import CancellationToken, ProcessingCancelled
 
 
 class ProcessingThread(QThread):
     """视频处理线程"""
     progress = pyqtSignal(str)
+    stage_progress = pyqtSignal(object)
     finished = pyqtSignal(bool, str)
 
     def __init__(self, video_path, output_path, params):
@@ -30,82 +30,112 @@ class ProcessingThread(QThread):
         self.video_path = video_path
         self.output_path = output_path
         self.params = params
+        self.cancel_token = CancellationToken()
+
+    def cancel(self):
+        """请求协作式停止，处理流程在一帧之内响应"""
+        self.cancel_token.cancel("用户停止")
 
     def run(self):
+        profiler = None
         try:
             self.progress.emit("初始化处理器...")
-            evm = EulerianVideoMagnification(self.video_path, self.output_path)
+            from core import EulerianVideoMagnification
+            if self.params.get('profile'):
+                from core.profiler import StageProfiler
+                profiler = StageProfiler()
+
+            evm = EulerianVideoMagnification(self.video_path, self.output_path,
+                                             cancel_token=self.cancel_token,
+                                             progress_listener=self.stage_progress.emit,
+                                             profiler=profiler)
             evm.get_video_info()
 
-            mode = self.params['mode']
-
-            # 使用批处理方法（正确的欧拉视频放大算法）
-            self.progress.emit("加载视频帧...")
-            frames = evm.load_video(max_frames=self.params.get('max_frames'))
-
-            if mode == 'motion':
-                self.progress.emit("应用运动放大算法...")
-                processed_frames = evm.magnify_motion(
-                    frames,
-                    evm.fps,
-                    freq_low=self.params['freq_low'],
-                    freq_high=self.params['freq_high'],
-                    amplification=self.params['amplification'],
-                    levels=self.params['levels'],
-                    skip_levels_at_top=2
-                )
-            elif mode == 'color':
-                self.progress.emit("应用色彩放大算法...")
-                processed_frames = evm.magnify_color(
-                    frames,
-                    evm.fps,
-                    freq_low=self.params['freq_low'],
-                    freq_high=self.params['freq_high'],
-                    amplification=self.params['amplification'],
-                    levels=self.params['levels'],
-                    skip_levels_at_top=2
-                )
-            else:  # hybrid
-                self.progress.emit("应用混合模式算法...")
-                # 先运动放大
-                motion_frames = evm.magnify_motion(
-                    frames,
-                    evm.fps,
-                    freq_low=self.params['freq_low'],
-                    freq_high=self.params['freq_high'],
-                    amplification=self.params['amplification'] * 0.7,
-                    levels=self.params['levels'],
-                    skip_levels_at_top=2
-                )
-                # 再色彩放大
-                processed_frames = evm.magnify_color(
-                    motion_frames,
-                    evm.fps,
-                    freq_low=self.params['freq_low'],
-                    freq_high=self.params['freq_high'],
-                    amplification=self.params['amplification'] * 1.5,
-                    levels=self.params['levels'],
-                    skip_levels_at_top=2
-                )
-
-            self.progress.emit("保存视频...")
+            # 按执行计划处理（整段/时间分块/空间分块/外存）
+            roi = None
+            if self.params.get('roi'):
+                from core.roi import RegionOfInterest
+                roi = [RegionOfInterest(*rect) for rect in self.params['roi']]
+            plan = evm.plan_execution(self.params['mode'], self.params['freq_low'], self.params['levels'], 2,
+                                      max_frames=self.params.get('max_frames'),
+                                      freq_high=self.params['freq_high'], roi=roi)
+            self.progress.emit(f"执行计划: {plan.strategy}，预计峰值内存 {plan.predicted_peak_mb:.0f} MB")
+
             audio_source = self.video_path if self.params['keep_audio'] else None
-            evm.save_video_from_frames(
-                processed_frames,
-                audio_source=audio_source,
-                output_format=self.params['output_format'],
+            evm.render(
                 mode=self.params['mode'],
                 freq_low=self.params['freq_low'],
                 freq_high=self.params['freq_high'],
-                amplification=self.params['amplification']
+                amplification=self.params['amplification'],
+                levels=self.params['levels'],
+                skip_levels_at_top=2,
+                audio_source=audio_source,
+                output_format=self.params['output_format'],
+                plan=plan,
+                roi=roi
             )
 
+            if profiler is not None:
+                report_path = os.path.splitext(evm.output_path)[0] + '_profile.json'
+                profiler.write_report(report_path, metadata={
+                    'input': self.video_path,
+                    'resolution': [evm.width, evm.height],
+                    'frames': plan.frames,
+                    'strategy': plan.strategy,
+                    **{key: self.params[key] for key in ('mode', 'levels', 'freq_low', 'freq_high', 'amplification')}
+                })
+                print(f"性能分析:\n{profiler.summary()}")
+                self.progress.emit(f"性能报告已保存: {os.path.basename(report_path)}")
+
             self.finished.emit(True, "处理完成")
 
+        except ProcessingCancelled:
+            self.finished.emit(False, "处理已停止")
         except Exception as e:
             import traceback
             error_msg = f"处理失败: {str(e)}\n{traceback.format_exc()}"
             self.finished.emit(False, error_msg)
+        finally:
+            # 取消或出错时也停止采样线程和tracemalloc，避免拖慢之后的渲染
+            if profiler is not None:
+                profiler.close()
+
+
+class FrequencyAnalysisThread(QThread):
+    """频率分析线程：流式分析整段视频（roi为预览中选择的矩形列表），每个Welch分段完成时发送部分结果"""
+    stage_progress = pyqtSignal(object)
+    partial = pyqtSignal(object)
+    finished = pyqtSignal(object, str)
+
+    def __init__(self, video_path, freq_low, freq_high, roi=None):
+        super().__init__()
+        self.video_path = video_path
+        self.freq_low = freq_low
+        self.freq_high = freq_high
+        self.roi = roi
+        self.cancel_token = CancellationToken()
+
+    def cancel(self):
+        """请求停止分析，在一帧之内响应"""
+        self.cancel_token.cancel("用户取消分析")
+
+    def run(self):
+        try:
+            from core import EulerianVideoMagnification
+            evm = EulerianVideoMagnification(self.video_path, cancel_token=self.cancel_token,
+                                             progress_listener=self.stage_progress.emit)
+            evm.get_video_info()
+            roi = None
+            if self.roi:
+                from core.roi import RegionOfInterest
+                roi = [RegionOfInterest(*rect) for rect in self.roi]
+            result = evm.analyze_video_frequencies(freq_low=self.freq_low, freq_high=self.freq_high,
+                                                   partial_callback=self.partial.emit, roi=roi)
+            self.finished.emit(result, "频率分析完成" if result else "频率分析失败")
+        except ProcessingCancelled:
+            self.finished.emit(None, "频率分析已取消")
+        except Exception as e:
+            self.finished.emit(None, f"频率分析出错: {str(e)}")
 
 
 class EVMMainWindow(QMainWindow):
@@ -117,7 +147,15 @@ class EVMMainWindow(QMainWindow):
         self.input_video_path = ""
         self.output_video_path = ""
         self.processing_thread = None
+        self.analysis_thread = None
         self.preview_window = None
+        # 选择输入时缓存的视频信息（帧率、尺寸、帧数），执行计划预览不再重新打开文件
+        self.video_info = None
+        # 参数连续变化时合并为一次执行计划预览
+        self.plan_timer = QTimer(self)
+        self.plan_timer.setSingleShot(True)
+        self.plan_timer.setInterval(300)
+        self.plan_timer.timeout.connect(self.refresh_plan_preview)
 
         self._init_styles()
         self.setup_ui()
@@ -276,6 +314,7 @@ class EVMMainWindow(QMainWindow):
         # 集成预览组件
         from ui.integrated_preview import IntegratedPreviewWidget
         self.preview_widget = IntegratedPreviewWidget()
+        self.preview_widget.roi_changed.connect(self.update_plan_preview)
         right_layout.addWidget(self.preview_widget)
 
         main_layout.addWidget(right_panel)
@@ -322,6 +361,12 @@ class EVMMainWindow(QMainWindow):
         self.analyze_freq_btn.clicked.connect(self.analyze_frequencies)
         action_layout.addWidget(self.analyze_freq_btn)
 
+        self.live_btn = QPushButton("实时模式")
+        self.live_btn.setFixedHeight(40)
+        self.live_btn.setToolTip("从摄像头（设备0）实时放大，使用当前频率和放大倍数")
+        self.live_btn.clicked.connect(self.open_live_window)
+        action_layout.addWidget(self.live_btn)
+
         layout.addLayout(action_layout)
 
         # 输出文件
@@ -414,6 +459,13 @@ class EVMMainWindow(QMainWindow):
         self.freq_analysis_label.setWordWrap(True)
         layout.addWidget(self.freq_analysis_label)
 
+        # 分析过程中实时更新的幅度谱
+        self.spectrum_label = QLabel()
+        self.spectrum_label.setFixedHeight(90)
+        self.spectrum_label.setAlignment(Qt.AlignCenter)
+        self.spectrum_label.setVisible(False)
+        layout.addWidget(self.spectrum_label)
+
         # 其他选项 - 第一行
         options_layout1 = QHBoxLayout()
         self.keep_audio_btn = QPushButton("保留音频")
@@ -421,6 +473,12 @@ class EVMMainWindow(QMainWindow):
         self.keep_audio_btn.setChecked(True)
         options_layout1.addWidget(self.keep_audio_btn)
 
+        self.profile_btn = QPushButton("性能分析")
+        self.profile_btn.setCheckable(True)
+        self.profile_btn.setChecked(False)
+        self.profile_btn.setToolTip("记录各阶段耗时与内存，并在输出文件旁保存JSON报告")
+        options_layout1.addWidget(self.profile_btn)
+
         max_frames_label = QLabel("最大帧数:")
         max_frames_label.setStyleSheet("color: rgb(200, 200, 200); font-size: 16px; font-weight: bold; font-family: 'Microsoft YaHei', 'SimHei', sans-serif;")
         options_layout1.addWidget(max_frames_label)
@@ -457,6 +515,16 @@ class EVMMainWindow(QMainWindow):
 
         layout.addLayout(format_layout)
 
+        # 执行计划预览（选择视频或修改参数后更新）
+        self.plan_label = QLabel("")
+        self.plan_label.setWordWrap(True)
+        self.plan_label.setStyleSheet("color: rgb(150, 150, 150); font-size: 13px; font-family: 'Microsoft YaHei', 'SimHei', sans-serif;")
+        layout.addWidget(self.plan_label)
+        self.mode_combo.currentTextChanged.connect(self.update_plan_preview)
+        self.max_frames_spin.valueChanged.connect(self.update_plan_preview)
+        self.freq_low_spin.valueChanged.connect(self.update_plan_preview)
+        self.freq_high_spin.valueChanged.connect(self.update_plan_preview)
+
     def setup_control_buttons(self, layout):
         """设置控制按钮"""
         button_layout = QHBoxLayout()
@@ -546,6 +614,7 @@ class EVMMainWindow(QMainWindow):
         self.analyze_freq_btn.setStyleSheet(self.common_styles['button_style'])
         self.suggest_freq_btn.setStyleSheet(self.common_styles['button_style'])
         self.keep_audio_btn.setStyleSheet(self.common_styles['button_style'])
+        self.profile_btn.setStyleSheet(self.common_styles['button_style'])
         self.preview_btn.setStyleSheet(self.common_styles['button_style'])
         self.start_btn.setStyleSheet(self.common_styles['button_style'])
         self.stop_btn.setStyleSheet(self.common_styles['button_style'])
@@ -560,12 +629,23 @@ class EVMMainWindow(QMainWindow):
             self, "选择输入视频", "", "视频文件 (*.mp4 *.avi *.mov *.mkv)"
         )
         if file_path:
+            # 上一个视频的分析不再有意义，停止并丢弃其结果
+            self.stop_frequency_analysis()
+            self.clear_frequency_analysis()
             self.input_video_path = file_path
             self.input_path_label.setText(os.path.basename(file_path))
+            from core.evm_core import read_video_info
+            self.video_info = read_video_info(file_path)
+            if not self.video_info['fps'] or not self.video_info['total_frames']:
+                self.video_info = None
+                self.plan_label.setText("无法读取视频信息")
+            # ROI属于上一个视频
+            self.preview_widget.set_rois([])
 
             # 启用预览和分析按钮
             self.preview_btn.setEnabled(True)
             self.analyze_freq_btn.setEnabled(True)
+            self.update_plan_preview()
 
             # 自动设置输出路径
             if not self.output_video_path:
@@ -573,6 +653,37 @@ class EVMMainWindow(QMainWindow):
                 self.output_video_path = f"{base_name}_magnified.mp4"
                 self.output_path_label.setText(os.path.basename(self.output_video_path))
 
+    def update_plan_preview(self, *_):
+        """参数或ROI变化时延迟刷新执行计划预览（连续变化只刷新一次）"""
+        if self.video_info is not None:
+            self.plan_timer.start()
+
+    def refresh_plan_preview(self):
+        """在开始处理前显示执行计划（策略、预计峰值内存和耗时），使用缓存的视频信息"""
+        if self.video_info is None:
+            return
+        mode_map = {"运动放大": "motion", "色彩放大": "color", "混合模式": "hybrid"}
+        info = self.video_info
+        max_frames = self.max_frames_spin.value()
+        frames = min(max_frames, info['total_frames']) if max_frames else info['total_frames']
+        levels, skip_levels = 4, 2
+        try:
+            from core import planner
+            from core.roi import RegionOfInterest, prepare_rois, plan_size, plan_note
+            rois = prepare_rois([RegionOfInterest(*rect) for rect in self.preview_widget.rois],
+                                info['width'], info['height'], levels)
+            width, height = plan_size(rois, info['width'], info['height'], levels)
+            # 预览在GUI线程中运行，不做微基准校准（会运行一次完整放大）；耗时按默认系数估算
+            plan = planner.plan_execution(width, height, frames, info['fps'], levels=levels,
+                                          mode=mode_map[self.mode_combo.currentText()],
+                                          freq_low=self.freq_low_spin.value(), skip_levels_at_top=skip_levels,
+                                          freq_high=self.freq_high_spin.value(), use_calibration=False)
+            if rois:
+                plan.notes.append(plan_note(rois, width, height, info['width'], info['height']))
+            self.plan_label.setText(plan.describe())
+        except Exception as e:
+            self.plan_label.setText(f"无法生成执行计划: {e}")
+
     def browse_output_file(self):
         """设置输出文件"""
         file_path, _ = QFileDialog.getSaveFileName(
@@ -612,8 +723,10 @@ class EVMMainWindow(QMainWindow):
             'levels': 4,
             'blend': 1.0,
             'keep_audio': self.keep_audio_btn.isChecked(),
+            'profile': self.profile_btn.isChecked(),
             'max_frames': self.max_frames_spin.value() if self.max_frames_spin.value() > 0 else None,
-            'output_format': format_map[self.format_combo.currentText()]
+            'output_format': format_map[self.format_combo.currentText()],
+            'roi': self.preview_widget.rois
         }
 
         # 显示处理提示
@@ -624,6 +737,7 @@ class EVMMainWindow(QMainWindow):
             self.input_video_path, self.output_video_path, params
         )
         self.processing_thread.progress.connect(self.update_progress)
+        self.processing_thread.stage_progress.connect(self.update_stage_progress)
         self.processing_thread.finished.connect(self.processing_finished)
         self.processing_thread.start()
 
@@ -632,13 +746,17 @@ class EVMMainWindow(QMainWindow):
         self.start_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
         self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, 0)  # 不确定进度
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
 
     def stop_processing(self):
         """停止处理"""
         if self.processing_thread and self.processing_thread.isRunning():
-            self.processing_thread.terminate()
-            self.processing_thread.wait()
+            # 协作式取消，线程结束后通过finished信号更新界面
+            self.processing_thread.cancel()
+            self.stop_btn.setEnabled(False)
+            self.status_label.setText("正在停止...")
+            return
 
         self.processing_finished(False, "处理已停止")
 
@@ -649,6 +767,15 @@ class EVMMainWindow(QMainWindow):
         from PyQt5.QtWidgets import QApplication
         QApplication.processEvents()
 
+    def update_stage_progress(self, event):
+        """根据结构化进度事件更新确定进度条"""
+        from core.progress import STAGE_LABELS, format_progress
+
+        self.progress_bar.setRange(0, max(1, event.total))
+        self.progress_bar.setValue(min(event.done, max(1, event.total)))
+        self.progress_bar.setFormat(f"{STAGE_LABELS.get(event.stage, event.stage)} %p%")
+        self.status_label.setText(format_progress(event))
+
     def processing_finished(self, success, message):
         """处理完成"""
         self.is_processing = False
@@ -680,67 +807,141 @@ class EVMMainWindow(QMainWindow):
         QTimer.singleShot(5000, lambda: self.status_label.setText(""))
 
     def analyze_frequencies(self):
-        """分析视频频率"""
+        """在后台线程分析视频频率；分析进行中再次点击则取消"""
+        if self.analysis_thread is not None and self.analysis_thread.isRunning():
+            self.analysis_thread.cancel()
+            self.analyze_freq_btn.setEnabled(False)
+            self.freq_analysis_label.setText("正在取消频率分析...")
+            return
+
         if not self.input_video_path:
             self.show_status("请先选择输入视频", False)
             return
 
-        try:
-            self.analyze_freq_btn.setEnabled(False)
-            self.analyze_freq_btn.setText("分析中...")
-            self.freq_analysis_label.setText("正在分析视频频率，请稍候...")
+        if self.is_processing:
+            self.show_status("正在处理视频，请完成后再分析频率", False)
+            return
 
-            # 强制刷新UI
-            from PyQt5.QtWidgets import QApplication
-            QApplication.processEvents()
+        # 预览中选择了ROI时分析ROI内的信号
+        self.analysis_thread = FrequencyAnalysisThread(self.input_video_path, self.freq_low_spin.value(),
+                                                       self.freq_high_spin.value(), self.preview_widget.rois)
+        self.analysis_thread.stage_progress.connect(self.update_stage_progress)
+        self.analysis_thread.partial.connect(self.update_frequency_partial)
+        self.analysis_thread.finished.connect(self.frequency_analysis_finished)
+        self.analysis_thread.start()
 
-            # 创建EVM实例并分析频率
-            from core import EulerianVideoMagnification
-            evm = EulerianVideoMagnification(self.input_video_path)
-            evm.get_video_info()
-
-            # 执行频率分析
-            analysis_result = evm.analyze_video_frequencies(max_frames=200)
+        self.analyze_freq_btn.setText("取消分析")
+        self.start_btn.setEnabled(False)
+        self.freq_analysis_label.setText("正在分析视频频率...")
+        self.freq_analysis_label.setStyleSheet("color: rgb(100, 200, 100); font-size: 14px; font-family: 'Microsoft YaHei', 'SimHei', sans-serif; margin: 5px 0px;")
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
 
-            if analysis_result and analysis_result['dominant_frequencies']:
-                # 保存分析结果
-                self.analysis_result = analysis_result
+    def stop_frequency_analysis(self):
+        """取消并等待正在进行的频率分析（切换输入视频或关闭窗口时），丢弃其结果并恢复界面"""
+        thread = self.analysis_thread
+        if thread is None:
+            return
+        self.analysis_thread = None
+        # 断开信号，等待期间排队的部分结果和完成信号不再送达
+        thread.partial.disconnect(self.update_frequency_partial)
+        thread.finished.disconnect(self.frequency_analysis_finished)
+        thread.stage_progress.disconnect(self.update_stage_progress)
+        thread.cancel()
+        thread.wait()
+        self.analyze_freq_btn.setEnabled(True)
+        self.analyze_freq_btn.setText("分析频率")
+        self.start_btn.setEnabled(not self.is_processing)
+        self.progress_bar.setVisible(False)
 
-                # 显示简要结果
-                dominant_freqs = analysis_result['dominant_frequencies']
-                result_text = f"检测到 {len(dominant_freqs)} 个主要频率成分 (点击查看详情)"
-                self.freq_analysis_label.setText(result_text)
-                self.freq_analysis_label.setStyleSheet("color: rgb(100, 200, 100); font-size: 14px; font-family: 'Microsoft YaHei', 'SimHei', sans-serif; margin: 5px 0px;")
+    def clear_frequency_analysis(self):
+        """清除上一个视频的分析结果"""
+        self.analysis_result = None
+        self.spectrum_label.setVisible(False)
+        self.freq_analysis_label.setText("")
+        self.suggest_freq_btn.setEnabled(False)
+
+    def closeEvent(self, event):
+        """关闭窗口前停止后台线程，避免销毁仍在运行的QThread"""
+        self.plan_timer.stop()
+        self.stop_frequency_analysis()
+        if self.processing_thread is not None and self.processing_thread.isRunning():
+            self.processing_thread.cancel()
+            self.processing_thread.wait()
+        super().closeEvent(event)
 
-                # 启用智能建议按钮
-                self.suggest_freq_btn.setEnabled(True)
-
-                # 显示详细分析对话框
-                from ui.frequency_analysis_dialog import FrequencyAnalysisDialog
-                dialog = FrequencyAnalysisDialog(analysis_result, self)
-                if dialog.exec_() == FrequencyAnalysisDialog.Accepted:
-                    # 用户点击了"应用建议参数"
-                    suggested_params = dialog.get_suggested_params()
-                    if suggested_params:
-                        self.freq_low_spin.setValue(suggested_params['freq_low'])
-                        self.freq_high_spin.setValue(suggested_params['freq_high'])
-                        self.amplification_slider.setValue(suggested_params['amplification'])
-                        self.show_status(f"已应用建议参数 ({suggested_params['motion_type']})", True)
-
-                self.show_status("频率分析完成", True)
-            else:
-                self.freq_analysis_label.setText("未检测到明显的频率成分，建议使用默认参数")
-                self.freq_analysis_label.setStyleSheet("color: rgb(200, 100, 100); font-size: 14px; font-family: 'Microsoft YaHei', 'SimHei', sans-serif; margin: 5px 0px;")
-                self.show_status("频率分析未找到明显成分", False)
+    def update_frequency_partial(self, result):
+        """显示部分分析结果：当前的主要频率和幅度谱"""
+        # 已停止的分析线程在等待期间排队的结果
+        if self.sender() is not self.analysis_thread:
+            return
+        frequencies = ", ".join(f"{info['frequency']:.2f}" for info in result['dominant_frequencies'][:3])
+        self.freq_analysis_label.setText(
+            f"已分析 {result['analyzed_frames']}/{result['total_frames']} 帧 - 当前主要频率: {frequencies} Hz")
+        self.show_spectrum(result)
+
+    def show_spectrum(self, result):
+        """绘制幅度谱（频带以浅色标出）"""
+        from PyQt5.QtGui import QImage, QPixmap
+        from core.spectral import spectrum_image
+
+        raw = result['raw_data']
+        width = max(200, self.spectrum_label.width())
+        image = spectrum_image(raw['frequencies'], raw['magnitudes'], (width, self.spectrum_label.height()),
+                               band=(self.freq_low_spin.value(), self.freq_high_spin.value()))
+        rgb = image[..., ::-1].copy()
+        q_image = QImage(rgb.data, rgb.shape[1], rgb.shape[0], 3 * rgb.shape[1], QImage.Format_RGB888)
+        self.spectrum_label.setPixmap(QPixmap.fromImage(q_image.copy()))
+        self.spectrum_label.setVisible(True)
+
+    def frequency_analysis_finished(self, analysis_result, message):
+        """分析结束：恢复界面，有结果时打开详细分析对话框"""
+        if self.sender() is not self.analysis_thread:
+            return
+        self.analysis_thread = None
+        self.analyze_freq_btn.setEnabled(True)
+        self.analyze_freq_btn.setText("分析频率")
+        self.start_btn.setEnabled(not self.is_processing)
+        self.progress_bar.setVisible(False)
 
-        except Exception as e:
-            self.freq_analysis_label.setText(f"频率分析失败: {str(e)}")
+        if analysis_result and analysis_result['dominant_frequencies']:
+            # 保存分析结果
+            self.analysis_result = analysis_result
+            self.show_spectrum(analysis_result)
+
+            # 显示简要结果
+            dominant_freqs = analysis_result['dominant_frequencies']
+            result_text = f"检测到 {len(dominant_freqs)} 个主要频率成分 (点击查看详情)"
+            self.freq_analysis_label.setText(result_text)
+            self.freq_analysis_label.setStyleSheet("color: rgb(100, 200, 100); font-size: 14px; font-family: 'Microsoft YaHei', 'SimHei', sans-serif; margin: 5px 0px;")
+
+            # 启用智能建议按钮
+            self.suggest_freq_btn.setEnabled(True)
+
+            # 显示详细分析对话框
+            from ui.frequency_analysis_dialog import FrequencyAnalysisDialog
+            dialog = FrequencyAnalysisDialog(analysis_result, self)
+            if dialog.exec_() == FrequencyAnalysisDialog.Accepted:
+                # 用户点击了"应用建议参数"
+                suggested_params = dialog.get_suggested_params()
+                if suggested_params:
+                    self.freq_low_spin.setValue(suggested_params['freq_low'])
+                    self.freq_high_spin.setValue(suggested_params['freq_high'])
+                    self.amplification_slider.setValue(suggested_params['amplification'])
+                    self.show_status(f"已应用建议参数 ({suggested_params['motion_type']})", True)
+                    return
+
+            self.show_status(message, True)
+        elif analysis_result is not None:
+            self.freq_analysis_label.setText("未检测到明显的频率成分，建议使用默认参数")
             self.freq_analysis_label.setStyleSheet("color: rgb(200, 100, 100); font-size: 14px; font-family: 'Microsoft YaHei', 'SimHei', sans-serif; margin: 5px 0px;")
-            self.show_status(f"频率分析出错: {str(e)}", False)
-
-        finally:
-            self.analyze_freq_btn.setEnabled(True)
-            self.analyze_freq_btn.setText("分析频率")
+            self.show_status("频率分析未找到明显成分", False)
+        else:
+            self.spectrum_label.setVisible(False)
+            self.freq_analysis_label.setText(message)
+            self.freq_analysis_label.setStyleSheet("color: rgb(200, 100, 100); font-size: 14px; font-family: 'Microsoft YaHei', 'SimHei', sans-serif; margin: 5px 0px;")
+            self.show_status(message, False)
 
     def apply_frequency_suggestion(self):
         """应用智能频率建议"""
@@ -804,6 +1005,21 @@ class EVMMainWindow(QMainWindow):
         except Exception as e:
             self.show_status(f"预览加载失败: {str(e)}", False)
 
+    def open_live_window(self):
+        """打开实时放大窗口"""
+        try:
+            from ui.live_window import LiveWindow
+            params = {
+                'source': 0,
+                'amplification': self.amplification_slider.value(),
+                'freq_low': self.freq_low_spin.value(),
+                'freq_high': self.freq_high_spin.value(),
+            }
+            self.live_window = LiveWindow(params)
+            self.live_window.show()
+        except Exception as e:
+            self.show_status(f"无法打开实时模式: {str(e)}", False)
+
     def add_separator(self, layout):
         """添加分隔线"""
         separator = QFrame()
@@ -7,10 +7,15 @@ Frequency Analysis Result Dialog
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel,
     QPushButton, QTextEdit, QFrame, QTableWidget,
-    QTableWidgetItem, QHeaderView
+    QTableWidgetItem, QHeaderView, QComboBox, QTabWidget, QWidget,
+    QFileDialog
 )
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont
+from PyQt5.QtGui import QFont, QImage, QPixmap
+import numpy as np
+import cv2
+
+from core.spectral import heatmap_image, spectrogram_image, save_spectrogram, SPECTRAL_MIN_FREQ
 
 
 class FrequencyAnalysisDialog(QDialog):
@@ -152,7 +157,37 @@ class FrequencyAnalysisDialog(QDialog):
             self.freq_table.setItem(i, 3, type_item)
 
         self.freq_table.setMinimumHeight(250)
-        main_layout.addWidget(self.freq_table)
+        has_heatmap = self.analysis_result.get('spectral_map') is not None
+        has_spectrogram = self.analysis_result.get('spectrogram') is not None
+        if has_heatmap or has_spectrogram:
+            # 频率表、空间频谱图和时频图分页显示
+            tabs = QTabWidget()
+            tabs.setStyleSheet("""
+                QTabWidget::pane { border: none; }
+                QTabBar::tab {
+                    background-color: rgb(45, 45, 50);
+                    color: rgb(180, 180, 180);
+                    padding: 6px 16px;
+                    font-size: 13px;
+                    font-family: 'Microsoft YaHei', 'SimHei', sans-serif;
+                }
+                QTabBar::tab:selected {
+                    background-color: rgb(80, 120, 180);
+                    color: rgb(255, 255, 255);
+                }
+            """)
+            tabs.addTab(self.freq_table, "ROI频率" if self.analysis_result.get('signal') == 'roi' else "整帧频率")
+            if has_heatmap:
+                heatmap_page = QWidget()
+                self.setup_heatmap(QVBoxLayout(heatmap_page))
+                tabs.addTab(heatmap_page, "空间频谱图")
+            if has_spectrogram:
+                spectrogram_page = QWidget()
+                self.setup_spectrogram(QVBoxLayout(spectrogram_page))
+                tabs.addTab(spectrogram_page, "时频图")
+            main_layout.addWidget(tabs)
+        else:
+            main_layout.addWidget(self.freq_table)
 
         # 建议区域
         suggestion_frame = QFrame()
@@ -230,6 +265,129 @@ class FrequencyAnalysisDialog(QDialog):
 
         main_layout.addLayout(button_layout)
 
+    def setup_heatmap(self, layout):
+        """空间频谱热力图：按块显示频带功率或主频率（可选Y/Cr/Cb通道）"""
+        spectral = self.analysis_result['spectral_map']
+        low, high = spectral['band']
+
+        header_layout = QHBoxLayout()
+        layout.setContentsMargins(0, 8, 0, 0)
+        heatmap_label = QLabel(f"每块 {spectral['block_size']} 像素，频带 {low:.1f}-{high:.1f} Hz")
+        heatmap_label.setStyleSheet("color: rgb(200, 200, 200); font-size: 13px; font-family: 'Microsoft YaHei', 'SimHei', sans-serif;")
+        header_layout.addWidget(heatmap_label)
+        header_layout.addStretch()
+
+        combo_style = "color: rgb(220, 220, 220); background-color: rgb(45, 45, 50); font-size: 13px; font-family: 'Microsoft YaHei', 'SimHei', sans-serif; padding: 3px;"
+        self.heatmap_quantity_combo = QComboBox()
+        self.heatmap_quantity_combo.addItems(["频带幅度", "主频率"])
+        self.heatmap_quantity_combo.setStyleSheet(combo_style)
+        header_layout.addWidget(self.heatmap_quantity_combo)
+        self.heatmap_channel_combo = QComboBox()
+        self.heatmap_channel_combo.addItems(list(spectral['channels']))
+        self.heatmap_channel_combo.setStyleSheet(combo_style)
+        header_layout.addWidget(self.heatmap_channel_combo)
+        layout.addLayout(header_layout)
+
+        self.heatmap_view = QLabel()
+        self.heatmap_view.setAlignment(Qt.AlignCenter)
+        self.heatmap_view.setMinimumHeight(180)
+        self.heatmap_view.setStyleSheet("background-color: rgb(40, 40, 45); border: 2px solid rgb(60, 60, 65); border-radius: 8px;")
+        layout.addWidget(self.heatmap_view)
+
+        self.heatmap_legend = QLabel()
+        self.heatmap_legend.setStyleSheet("color: rgb(180, 180, 180); font-size: 12px; font-family: 'Microsoft YaHei', 'SimHei', sans-serif;")
+        layout.addWidget(self.heatmap_legend)
+
+        self.heatmap_quantity_combo.currentIndexChanged.connect(self.update_heatmap)
+        self.heatmap_channel_combo.currentIndexChanged.connect(self.update_heatmap)
+        self.update_heatmap()
+
+    def update_heatmap(self):
+        """按当前选择的量和通道重绘热力图"""
+        spectral = self.analysis_result['spectral_map']
+        channel = self.heatmap_channel_combo.currentIndex()
+        thumbnail = spectral.get('thumbnail')
+        if thumbnail is not None:
+            size = (thumbnail.shape[1] * 4, thumbnail.shape[0] * 4)
+        else:
+            grid_h, grid_w = spectral['band_power'].shape[:2]
+            size = (grid_w * 32, grid_h * 32)
+
+        if self.heatmap_quantity_combo.currentIndex() == 0:
+            # 幅度（功率的平方根）使弱信号区域也能分辨
+            values = np.sqrt(spectral['band_power'][..., channel])
+            image = heatmap_image(values, size, thumbnail, value_range=(0.0, float(values.max())))
+            legend = f"蓝 → 红: 0 → {float(values.max()):.3g}（频带内幅度，功率的平方根）"
+        else:
+            fps = self.analysis_result.get('fps') or 30
+            values = spectral['dominant'][..., channel]
+            image = heatmap_image(values, size, thumbnail, value_range=(0.0, fps / 2.0))
+            legend = f"蓝 → 红: 0 → {fps / 2.0:.1f} Hz（每块的主频率）"
+
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        h, w = rgb.shape[:2]
+        q_image = QImage(rgb.data, w, h, 3 * w, QImage.Format_RGB888)
+        pixmap = QPixmap.fromImage(q_image.copy())
+        self.heatmap_view.setPixmap(pixmap.scaled(640, 180, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        self.heatmap_legend.setText(legend)
+
+    def spectrogram_band(self):
+        """时频图的频带（与空间频谱图相同）和显示的最高频率"""
+        fps = self.analysis_result.get('fps') or 30
+        spectral = self.analysis_result.get('spectral_map')
+        band = spectral['band'] if spectral is not None else None
+        max_freq = fps / 2.0 if band is None else min(fps / 2.0, max(5.0, 2 * band[1]))
+        return band, max_freq
+
+    def setup_spectrogram(self, layout):
+        """时频图：横轴时间、纵轴频率，叠加频带内的峰值频率轨迹，可导出为 .npz"""
+        spectrogram = self.analysis_result['spectrogram']
+        band, max_freq = self.spectrogram_band()
+        layout.setContentsMargins(0, 8, 0, 0)
+
+        header_layout = QHBoxLayout()
+        duration = spectrogram['times'][-1] + spectrogram['window'] / (2 * spectrogram['fps'])
+        info_label = QLabel(f"0-{duration:.1f} 秒，纵轴 {SPECTRAL_MIN_FREQ}-{max_freq:.1f} Hz，"
+                            f"窗口 {spectrogram['window']} 帧，步长 {spectrogram['hop']} 帧")
+        info_label.setStyleSheet("color: rgb(200, 200, 200); font-size: 13px; font-family: 'Microsoft YaHei', 'SimHei', sans-serif;")
+        header_layout.addWidget(info_label)
+        header_layout.addStretch()
+
+        self.export_spectrogram_btn = QPushButton("导出 .npz")
+        self.export_spectrogram_btn.setStyleSheet("color: rgb(220, 220, 220); background-color: rgb(45, 45, 50); border: 1px solid rgb(80, 120, 180); border-radius: 4px; font-size: 13px; font-family: 'Microsoft YaHei', 'SimHei', sans-serif; padding: 3px 10px;")
+        self.export_spectrogram_btn.clicked.connect(self.export_spectrogram)
+        header_layout.addWidget(self.export_spectrogram_btn)
+        layout.addLayout(header_layout)
+
+        self.spectrogram_view = QLabel()
+        self.spectrogram_view.setAlignment(Qt.AlignCenter)
+        self.spectrogram_view.setMinimumHeight(180)
+        self.spectrogram_view.setStyleSheet("background-color: rgb(40, 40, 45); border: 2px solid rgb(60, 60, 65); border-radius: 8px;")
+        image = spectrogram_image(spectrogram, (640, 170), band=band, max_freq=max_freq)
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        h, w = rgb.shape[:2]
+        q_image = QImage(rgb.data, w, h, 3 * w, QImage.Format_RGB888)
+        self.spectrogram_view.setPixmap(QPixmap.fromImage(q_image.copy()))
+        layout.addWidget(self.spectrogram_view)
+
+        legend = "亮度为功率 (dB)；白线为频带边界，青线为频带内每个时刻的峰值频率" if band is not None else "亮度为功率 (dB)"
+        legend_label = QLabel(legend)
+        legend_label.setStyleSheet("color: rgb(180, 180, 180); font-size: 12px; font-family: 'Microsoft YaHei', 'SimHei', sans-serif;")
+        layout.addWidget(legend_label)
+
+    def export_spectrogram(self):
+        """导出时频图（含频带内峰值频率轨迹）"""
+        path, _ = QFileDialog.getSaveFileName(self, "导出时频图", "spectrogram.npz", "NumPy 数据 (*.npz)")
+        if not path:
+            return
+        band, _ = self.spectrogram_band()
+        try:
+            save_spectrogram(path, self.analysis_result['spectrogram'], *(band or (None, None)))
+            self.export_spectrogram_btn.setText("已导出")
+        except Exception as e:
+            self.export_spectrogram_btn.setText("导出失败")
+            self.export_spectrogram_btn.setToolTip(str(e))
+
     def classify_frequency(self, freq):
         """分类频率"""
         if freq < 0.5:
@@ -4,23 +4,73 @@ Integrated Preview Component
 集成预览组件 - 嵌入式设计
 """
 
-import cv2
-import numpy as np
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QPushButton, QSlider, QComboBox, QFrame
+    QPushButton, QSlider, QComboBox, QFrame, QRubberBand
 )
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtCore import Qt, QTimer, QRect, QSize, pyqtSignal
 from PyQt5.QtGui import QImage, QPixmap
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from core import EulerianVideoMagnification
+
+
+class RoiSelectLabel(QLabel):
+    """可框选矩形的预览标签：左键拖动选择，右键清除
+
+    roi_selected发出选框在所显示图像像素坐标中的 (x, y, w, h)，清除时发出None。
+    """
+    roi_selected = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.image_size = None
+        self._origin = None
+        self._rubber_band = QRubberBand(QRubberBand.Rectangle, self)
+
+    def _image_rect(self):
+        """居中显示的缩放图像在标签中的区域"""
+        pixmap = self.pixmap()
+        if pixmap is None or pixmap.isNull():
+            return None
+        return QRect((self.width() - pixmap.width()) // 2, (self.height() - pixmap.height()) // 2,
+                     pixmap.width(), pixmap.height())
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.RightButton:
+            self.roi_selected.emit(None)
+        elif event.button() == Qt.LeftButton and self._image_rect() is not None:
+            self._origin = event.pos()
+            self._rubber_band.setGeometry(QRect(self._origin, QSize()))
+            self._rubber_band.show()
+
+    def mouseMoveEvent(self, event):
+        if self._origin is not None:
+            self._rubber_band.setGeometry(QRect(self._origin, event.pos()).normalized())
+
+    def mouseReleaseEvent(self, event):
+        if self._origin is None:
+            return
+        selection = QRect(self._origin, event.pos()).normalized()
+        self._origin = None
+        self._rubber_band.hide()
+        image_rect = self._image_rect()
+        if image_rect is None or self.image_size is None:
+            return
+        selection = selection.intersected(image_rect)
+        if selection.width() < 4 or selection.height() < 4:
+            return
+        scale = self.image_size[0] / image_rect.width()
+        self.roi_selected.emit((int((selection.x() - image_rect.x()) * scale),
+                                int((selection.y() - image_rect.y()) * scale),
+                                int(selection.width() * scale), int(selection.height() * scale)))
 
 
 class IntegratedPreviewWidget(QWidget):
     """集成预览组件 - 嵌入主窗口"""
+    # ROI列表（原视频像素坐标 (x, y, w, h)，空列表为整帧）改变
+    roi_changed = pyqtSignal(object)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -36,6 +86,9 @@ class IntegratedPreviewWidget(QWidget):
         self.preview_size = (640, 480)
         self.max_preview_frames = 120
         self.is_loaded = False
+        # 预览帧相对原视频的缩放比例，以及在原始画面上框选或自动检测的ROI
+        self.preview_scale = 1.0
+        self.rois = []
 
         self.setup_ui()
 
@@ -57,7 +110,9 @@ class IntegratedPreviewWidget(QWidget):
         original_title.setAlignment(Qt.AlignCenter)
         original_layout.addWidget(original_title)
 
-        self.original_label = QLabel()
+        self.original_label = RoiSelectLabel()
+        self.original_label.setToolTip("拖动框选感兴趣区域（只处理该区域），右键清除")
+        self.original_label.roi_selected.connect(self.on_roi_selected)
         self.original_label.setMinimumSize(640, 360)
         self.original_label.setStyleSheet("background-color: rgb(20, 20, 20); border: 2px solid rgb(60, 60, 60); border-radius: 4px;")
         self.original_label.setAlignment(Qt.AlignCenter)
@@ -133,6 +188,13 @@ class IntegratedPreviewWidget(QWidget):
         self.reset_btn.setEnabled(False)
         button_layout.addWidget(self.reset_btn)
 
+        self.auto_roi_btn = QPushButton("自动ROI")
+        self.auto_roi_btn.setFixedSize(90, 32)
+        self.auto_roi_btn.setToolTip("按频带内能量自动检测感兴趣区域")
+        self.auto_roi_btn.clicked.connect(self.detect_rois)
+        self.auto_roi_btn.setEnabled(False)
+        button_layout.addWidget(self.auto_roi_btn)
+
         # 对比模式
         mode_label = QLabel("对比:")
         mode_label.setStyleSheet("color: rgb(180, 180, 180); font-size: 13px; font-weight: bold; font-family: 'Microsoft YaHei', 'SimHei', sans-serif;")
@@ -191,6 +253,7 @@ class IntegratedPreviewWidget(QWidget):
         """
         self.play_btn.setStyleSheet(button_style)
         self.reset_btn.setStyleSheet(button_style)
+        self.auto_roi_btn.setStyleSheet(button_style)
 
         combo_style = """
             QComboBox {
@@ -216,6 +279,9 @@ class IntegratedPreviewWidget(QWidget):
 
     def load_and_process(self, video_path, params):
         """加载并处理视频"""
+        # cv2在首次预览时才导入，避免拖慢主窗口启动
+        import cv2
+
         self.video_path = video_path
         self.params = params
         self.is_loaded = False
@@ -225,6 +291,7 @@ class IntegratedPreviewWidget(QWidget):
         self.original_frames = []
         self.processed_frames = []
         self.current_frame_idx = 0
+        self.set_rois([])
 
         try:
             self.status_label.setText("加载视频中...")
@@ -245,6 +312,8 @@ class IntegratedPreviewWidget(QWidget):
                 h, w = frame.shape[:2]
                 scale = min(self.preview_size[0] / w, self.preview_size[1] / h)
                 new_w, new_h = int(w * scale), int(h * scale)
+                self.preview_scale = scale
+                self.original_label.image_size = (new_w, new_h)
                 frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
 
                 self.original_frames.append(frame)
@@ -263,6 +332,7 @@ class IntegratedPreviewWidget(QWidget):
             self.frame_slider.setMaximum(self.total_frames - 1)
             self.play_btn.setEnabled(True)
             self.reset_btn.setEnabled(True)
+            self.auto_roi_btn.setEnabled(True)
             self.is_loaded = True
 
             self.update_display()
@@ -276,9 +346,12 @@ class IntegratedPreviewWidget(QWidget):
 
     def process_frames(self):
         """处理视频帧"""
+        import numpy as np
+
         try:
             frames_array = np.array(self.original_frames, dtype=np.float32) / 255.0
 
+            from core import EulerianVideoMagnification
             evm = EulerianVideoMagnification(self.video_path)
             evm.fps = self.fps
 
@@ -325,6 +398,8 @@ class IntegratedPreviewWidget(QWidget):
 
     def update_display(self):
         """更新显示"""
+        import numpy as np
+
         if not self.is_loaded or not self.original_frames or not self.processed_frames:
             return
 
@@ -336,6 +411,13 @@ class IntegratedPreviewWidget(QWidget):
 
         mode = self.compare_mode.currentText()
 
+        if self.rois:
+            import cv2
+            original = original.copy()
+            for roi in self.rois:
+                x, y, w, h = (int(round(v * self.preview_scale)) for v in roi)
+                cv2.rectangle(original, (x, y), (x + w, y + h), (255, 200, 0), 2)
+
         if mode == "并排":
             self.display_frame(original, self.original_label)
             self.display_frame(processed, self.processed_label)
@@ -360,6 +442,42 @@ class IntegratedPreviewWidget(QWidget):
 
         self.frame_info_label.setText(f"帧: {self.current_frame_idx + 1} / {self.total_frames}")
 
+    def on_roi_selected(self, rect):
+        """预览坐标中的选框 -> 原视频坐标"""
+        if rect is None:
+            self.set_rois([])
+        else:
+            self.set_rois([tuple(int(round(v / self.preview_scale)) for v in rect)])
+
+    def set_rois(self, rois):
+        """设置ROI列表（原视频像素坐标 (x, y, w, h)，空列表为整帧）"""
+        rois = [tuple(roi) for roi in rois]
+        if rois == self.rois:
+            return
+        self.rois = rois
+        if rois:
+            self.status_label.setText("ROI: " + "; ".join(f"{x},{y} {w}x{h}" for x, y, w, h in rois) + "（右键清除）")
+        elif self.is_loaded:
+            self.status_label.setText("就绪")
+        self.update_display()
+        self.roi_changed.emit(rois)
+
+    def detect_rois(self):
+        """按当前频带自动检测ROI并叠加显示"""
+        if not self.is_loaded:
+            return
+        try:
+            from core import EulerianVideoMagnification
+            evm = EulerianVideoMagnification(self.video_path)
+            evm.get_video_info()
+            rois = evm.suggest_rois(self.params.get('freq_low', 0.4), self.params.get('freq_high', 3.0))
+        except Exception as e:
+            self.status_label.setText(f"自动ROI失败: {str(e)}")
+            return
+        self.set_rois([(roi.x, roi.y, roi.width, roi.height) for roi in rois])
+        if not rois:
+            self.status_label.setText("频带内能量没有集中在局部区域，将处理整帧")
+
     def display_frame(self, frame, label):
         """显示帧"""
         h, w = frame.shape[:2]
@@ -428,3 +546,4 @@ class IntegratedPreviewWidget(QWidget):
         self.status_label.setStyleSheet("color: rgb(150, 150, 150); font-size: 12px;")
         self.play_btn.setEnabled(False)
         self.reset_btn.setEnabled(False)
+        self.auto_roi_btn.setEnabled(False)
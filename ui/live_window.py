@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Live Magnification Window
+实时放大窗口 - 显示放大后的采集画面、端到端延迟，并可随时开始/停止录制
+"""
+
+import os
+import sys
+import time
+import threading
+
+from PyQt5.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+    QPushButton, QSlider, QFileDialog
+)
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class LiveThread(QThread):
+    """实时处理线程：显示端未取走上一帧时只录制不推送，避免界面积压导致延迟增长"""
+    frame_ready = pyqtSignal(object, float)
+    failed = pyqtSignal(str)
+    stopped = pyqtSignal(object)
+
+    def __init__(self, session, max_frames=None):
+        super().__init__()
+        self.session = session
+        self.max_frames = max_frames
+        self.display_free = threading.Event()
+        self.display_free.set()
+
+    def _deliver(self, output, capture_time):
+        if self.display_free.is_set():
+            self.display_free.clear()
+            self.frame_ready.emit(output, capture_time)
+
+    def run(self):
+        try:
+            # 延迟在界面绘制后记录，包含显示耗时
+            stats = self.session.run(self._deliver, max_frames=self.max_frames, record_latency=False)
+            self.stopped.emit(stats)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class LiveWindow(QMainWindow):
+    """实时放大主窗口"""
+
+    def __init__(self, params, max_frames=None, parent=None):
+        super().__init__(parent)
+        from core.live import LiveSession
+
+        self.setWindowTitle("实时放大")
+        self.resize(1000, 680)
+        self.session = LiveSession(**params)
+        self.thread = LiveThread(self.session, max_frames)
+        self._setup_ui()
+
+        self.thread.frame_ready.connect(self.show_frame)
+        self.thread.failed.connect(self.on_failed)
+        self.thread.stopped.connect(self.on_stopped)
+
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(500)
+        self.thread.start()
+
+    def _setup_ui(self):
+        central = QWidget()
+        layout = QVBoxLayout(central)
+
+        self.video_label = QLabel("等待画面...")
+        self.video_label.setAlignment(Qt.AlignCenter)
+        self.video_label.setMinimumSize(640, 360)
+        self.video_label.setStyleSheet("background-color: rgb(20, 20, 20); color: rgb(150, 150, 150);")
+        layout.addWidget(self.video_label, 1)
+
+        controls = QHBoxLayout()
+        amp_label = QLabel("放大倍数:")
+        amp_label.setStyleSheet("color: rgb(200, 200, 200); font-size: 14px; font-family: 'Microsoft YaHei', 'SimHei', sans-serif;")
+        controls.addWidget(amp_label)
+        self.amp_slider = QSlider(Qt.Horizontal)
+        self.amp_slider.setRange(0, 200)
+        self.amp_slider.setValue(int(self.session.magnifier.amplification))
+        self.amp_slider.valueChanged.connect(self.on_amplification_changed)
+        controls.addWidget(self.amp_slider, 1)
+        self.amp_value_label = QLabel(str(self.amp_slider.value()))
+        self.amp_value_label.setStyleSheet("color: rgb(200, 200, 200); font-size: 14px;")
+        controls.addWidget(self.amp_value_label)
+
+        self.record_btn = QPushButton("开始录制")
+        self.record_btn.setCheckable(True)
+        self.record_btn.setChecked(bool(self.session.record_path))
+        self.record_btn.setText("停止录制" if self.session.record_path else "开始录制")
+        self.record_btn.clicked.connect(self.toggle_recording)
+        controls.addWidget(self.record_btn)
+        layout.addLayout(controls)
+
+        self.stats_label = QLabel("")
+        self.stats_label.setStyleSheet("color: rgb(150, 150, 150); font-size: 13px; font-family: 'Microsoft YaHei', 'SimHei', sans-serif;")
+        layout.addWidget(self.stats_label)
+
+        self.setCentralWidget(central)
+
+    def show_frame(self, frame, capture_time):
+        """显示一帧（BGR）并记录端到端延迟"""
+        import cv2
+
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        h, w, ch = rgb.shape
+        q_image = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
+        pixmap = QPixmap.fromImage(q_image)
+        self.video_label.setPixmap(pixmap.scaled(self.video_label.size(), Qt.KeepAspectRatio, Qt.FastTransformation))
+        self.session.meter.add(capture_time, time.perf_counter())
+        self.thread.display_free.set()
+
+    def update_stats(self):
+        stats = self.session.stats()
+        if stats['latency_ms'] is None:
+            return
+        recording = f" | 录制中: {os.path.basename(self.session.record_path)}" if self.session.writer else ""
+        self.stats_label.setText(
+            f"{stats['resolution'][0]}x{stats['resolution'][1]} | {stats['fps']:.1f} FPS | "
+            f"端到端延迟 {stats['latency_ms']:.0f} ms ({stats['latency_frames']:.1f} 帧) | "
+            f"丢帧 {stats['dropped']}{recording}")
+
+    def on_amplification_changed(self, value):
+        self.session.magnifier.amplification = value
+        self.amp_value_label.setText(str(value))
+
+    def toggle_recording(self, checked):
+        if checked:
+            path, _ = QFileDialog.getSaveFileName(self, "录制到", "live_recording.mp4", "视频文件 (*.mp4)")
+            if not path:
+                self.record_btn.setChecked(False)
+                return
+            try:
+                self.session.start_recording(path)
+            except ValueError as e:
+                self.stats_label.setText(str(e))
+                self.record_btn.setChecked(False)
+                return
+            self.record_btn.setText("停止录制")
+        else:
+            self.session.stop_recording()
+            self.record_btn.setText("开始录制")
+
+    def on_failed(self, message):
+        self.video_label.setText(f"实时处理失败: {message}")
+
+    def on_stopped(self, stats):
+        self.update_stats()
+        if self.video_label.pixmap() is None:
+            self.video_label.setText("采集已结束")
+
+    def closeEvent(self, event):
+        self.session.cancel_token.cancel("窗口关闭")
+        self.thread.display_free.set()
+        self.thread.wait(3000)
+        super().closeEvent(event)
+
+
+def run_live_window(params, max_frames=None):
+    """独立运行实时窗口（evm live）"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = LiveWindow(params, max_frames)
+    window.show()
+    if max_frames:
+        # 达到指定帧数后自动退出
+        window.thread.finished.connect(lambda: QTimer.singleShot(500, app.quit))
+    app.exec_()
+    window.close()
+    return 0
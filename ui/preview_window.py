@@ -16,7 +16,6 @@ import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from core import EulerianVideoMagnification
 
 
 class VideoPreviewWidget(QWidget):
@@ -262,6 +261,7 @@ class VideoPreviewWidget(QWidget):
             frames_array = np.array(self.original_frames, dtype=np.float32) / 255.0
 
             # 创建EVM实例
+            from core import EulerianVideoMagnification
             evm = EulerianVideoMagnification(self.video_path)
             evm.fps = self.fps
 